@@ -1,41 +1,150 @@
-from flask import Flask, request, redirect, url_for, send_file, abort, render_template, send_from_directory
+from flask import Flask, request, redirect, url_for, send_file, abort, render_template, send_from_directory, jsonify, make_response
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 import os
 import tempfile
+import shutil
 import uuid
 import time
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
-from main import analyze, export_html, export_csv
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from main import collect_stats, collect_line_stats, iter_lines, summarize_stats, export_html, export_csv
+from count_cube import CountCube, CubeCache
+from downsample import downsample_days
+from message_store import StoreWriter, open_store
+from report_cache import ReportCache, cache_key, hash_and_save
+from retention import Retention
+from upload_stream import MultipartStream, UploadError
+from jobs import JobQueue, QueueFull, DONE, FAILED
+from profiling import MetricsRegistry, Profile, NULL_PROFILE
 
-ALLOWED_EXTENSIONS = {'txt', 'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+ALLOWED_EXTENSIONS = {'txt', 'zip', 'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50 MB (for images)
+# Upload size limits. Screenshots and .zip exports (which with media can be
+# hundreds of MB) are saved to disk before they are analyzed; a chat .txt
+# is parsed while it is being received, so it is neither saved nor held
+# in memory and can be much larger.
+app.config.setdefault('MAX_UPLOAD_MB', int(os.environ.get('MAX_UPLOAD_MB', 1024)))
+app.config.setdefault('MAX_TEXT_UPLOAD_MB', int(os.environ.get('MAX_TEXT_UPLOAD_MB', 4096)))
+# Whole-request cap (plus room for the form around the files); the limits
+# above are checked per kind of file as the body arrives
+app.config['MAX_CONTENT_LENGTH'] = (max(app.config['MAX_UPLOAD_MB'], app.config['MAX_TEXT_UPLOAD_MB']) + 1) * 1024 * 1024
 
 # Directory to store generated reports for download
 REPORTS_DIR = os.path.join(os.path.dirname(__file__), 'reports')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-# How long to keep generated reports (hours)
-REPORT_RETENTION_HOURS = 24
+# Parsed-message stores of uploaded chats, keyed by content hash
+STORES_DIR = os.path.join(os.path.dirname(__file__), 'stores')
+os.makedirs(STORES_DIR, exist_ok=True)
 
+# Generated reports are removed by a background sweep (see retention) once
+# they are older than REPORT_RETENTION_HOURS, and oldest first while all of
+# them together take more than REPORT_MAX_MB
+app.config.setdefault('REPORT_RETENTION_HOURS', float(os.environ.get('REPORT_RETENTION_HOURS', 24)))
+app.config.setdefault('REPORT_MAX_MB', int(os.environ.get('REPORT_MAX_MB', 1024)))
+app.config.setdefault('REPORT_SWEEP_SECONDS', int(os.environ.get('REPORT_SWEEP_SECONDS', 60)))
+# The same goes for the message stores of uploaded chats (their full text;
+# /api/summary and /api/per_day answer 404 once a chat's store is gone) and
+# for the OCR texts cached by screenshot content
+app.config.setdefault('STORE_RETENTION_HOURS', float(os.environ.get('STORE_RETENTION_HOURS', 24)))
+app.config.setdefault('STORE_MAX_MB', int(os.environ.get('STORE_MAX_MB', 4096)))
+app.config.setdefault('OCR_CACHE_RETENTION_HOURS', float(os.environ.get('OCR_CACHE_RETENTION_HOURS', 24 * 7)))
+app.config.setdefault('OCR_CACHE_MAX_MB', int(os.environ.get('OCR_CACHE_MAX_MB', 256)))
 
-def clean_reports(retention_hours=REPORT_RETENTION_HOURS):
-    """Remove files in REPORTS_DIR older than retention_hours."""
-    now = time.time()
-    cutoff = now - (retention_hours * 3600)
-    for name in os.listdir(REPORTS_DIR):
-        full = os.path.join(REPORTS_DIR, name)
-        try:
-            if os.path.isfile(full):
-                mtime = os.path.getmtime(full)
-                if mtime < cutoff:
-                    os.remove(full)
-        except Exception:
-            # ignore deletion errors
-            pass
+# Cache of analysis results keyed by upload content hash + top_n
+app.config.setdefault('REPORT_CACHE_ENTRIES', 64)
+app.config.setdefault('REPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+report_cache = ReportCache(
+    os.path.join(REPORTS_DIR, 'cache'),
+    REPORTS_DIR,
+    max_entries=app.config['REPORT_CACHE_ENTRIES'],
+    max_disk_bytes=app.config['REPORT_CACHE_MAX_BYTES'],
+)
+
+# Background analysis jobs (see /jobs): worker threads, waiting-job limit,
+# and how long finished jobs stay pollable
+app.config.setdefault('JOB_WORKERS', int(os.environ.get('JOB_WORKERS', 2)))
+app.config.setdefault('JOB_QUEUE_DEPTH', int(os.environ.get('JOB_QUEUE_DEPTH', 16)))
+app.config.setdefault('JOB_RETENTION_SECONDS', int(os.environ.get('JOB_RETENTION_SECONDS', 3600)))
+
+# Stage timings of every analysis are exported on /metrics. PROFILE_LINES
+# additionally splits reading from parsing and counts pattern hits, at a
+# small per-line cost.
+app.config.setdefault('PROFILE_LINES', os.environ.get('PROFILE_LINES', '') == '1')
+metrics = MetricsRegistry()
+
+# Screenshot uploads: OCR worker processes per upload, and where OCR text is
+# cached by image content so re-uploaded screenshots skip Tesseract
+app.config.setdefault('OCR_WORKERS', int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1)))
+app.config.setdefault('OCR_CACHE_DIR', os.environ.get('OCR_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'ocr_cache')))
+
+# Bound on distinct words tracked per analysis (approximate top words), or
+# None to count every word exactly
+app.config.setdefault('WORD_CAPACITY', int(os.environ['WORD_CAPACITY']) if os.environ.get('WORD_CAPACITY') else None)
+
+
+def word_capacity():
+    """The WORD_CAPACITY setting; ValueError unless it is None or a positive int"""
+    capacity = app.config['WORD_CAPACITY']
+    if capacity is not None and (type(capacity) is not int or capacity < 1):
+        raise ValueError(f'WORD_CAPACITY must be a positive number of words, not {capacity!r}')
+    return capacity
+
+
+# Checked at startup as well, so a bad WORD_CAPACITY stops the app instead of every upload
+word_capacity()
+
+
+def _make_job_queue():
+    return JobQueue(
+        workers=app.config['JOB_WORKERS'],
+        max_queued=app.config['JOB_QUEUE_DEPTH'],
+        retention_seconds=app.config['JOB_RETENTION_SECONDS'],
+        error_formatter=friendly_error,
+    )
+
+
+def _make_retention(name, directory, hours, max_mb, on_evict=None, **options):
+    os.makedirs(directory, exist_ok=True)
+
+    def count_eviction(entry, reason, size):
+        metrics.inc(f'{name}_evicted_total', reason=reason)
+        metrics.inc(f'{name}_reclaimed_bytes_total', size, reason=reason)
+        if on_evict is not None:
+            on_evict(entry)
+
+    retention = Retention(
+        directory,
+        ttl_seconds=hours * 3600,
+        max_bytes=max_mb * 1024 * 1024,
+        interval=app.config['REPORT_SWEEP_SECONDS'],
+        on_evict=count_eviction,
+        **options,
+    )
+    retention.scan()
+    retention.start()
+    return retention
+
+
+def _make_retentions():
+    """Retention of generated reports, message stores and cached OCR texts, by name"""
+    return {
+        'reports': _make_retention('reports', REPORTS_DIR, app.config['REPORT_RETENTION_HOURS'],
+                                   app.config['REPORT_MAX_MB']),
+        'stores': _make_retention('stores', STORES_DIR, app.config['STORE_RETENTION_HOURS'],
+                                  app.config['STORE_MAX_MB'], on_evict=forget_chat, directories=True),
+        # OCR texts are written by ocr.OcrCache, which doesn't report them
+        'ocr_cache': _make_retention('ocr_cache', app.config['OCR_CACHE_DIR'],
+                                     app.config['OCR_CACHE_RETENTION_HOURS'], app.config['OCR_CACHE_MAX_MB'],
+                                     rescan=True),
+    }
 
 
 def allowed_file(filename):
@@ -50,111 +159,583 @@ def index():
     return render_template('index.html')
 
 
+def check_ocr_available():
+    """Abort with setup instructions if screenshots were uploaded but OCR isn't installed"""
+    try:
+        from main import OCR_AVAILABLE
+        if not OCR_AVAILABLE:
+            error_msg = (
+                "Image processing requires OCR libraries. "
+                "Please install: pip install Pillow pytesseract\n\n"
+                "Also install Tesseract OCR engine:\n"
+                "• Windows: Download from https://github.com/UB-Mannheim/tesseract/wiki\n"
+                "• After installation, add Tesseract to your system PATH\n"
+                "• Or restart your terminal/IDE after installation\n\n"
+                "Note: Text file (.txt) uploads work without OCR!"
+            )
+            abort(make_response(render_template('error.html', error_message=error_msg), 400))
+    except ImportError:
+        pass
+
+
+def receive_upload(tmpdir, stream_text=None, profile=NULL_PROFILE):
+    """Read the multipart upload as it arrives, aborting with an error page if it can't be analyzed.
+
+    Each file is checked as soon as its headers arrive, and its SHA-256 is
+    computed as it is read. Several files may be uploaded at once if they
+    are all screenshots (in chat order). Screenshots and .zip exports are
+    saved into tmpdir; a chat .txt is passed to ``stream_text(part)`` while
+    it is being received if given (see upload_stream.UploadPart), and saved
+    too otherwise.
+
+    Returns (path, digest, is_image, top_n, streamed): the file's path and
+    SHA-256 for a single upload, or the list of screenshot paths and a
+    digest over all of them (in order) for several. ``streamed`` is what
+    stream_text returned, and ``path`` is None then.
+    """
+    if request.mimetype != 'multipart/form-data' or not request.mimetype_params.get('boundary'):
+        abort(400, 'No file part')
+    form = MultipartStream(request.stream, request.mimetype_params['boundary'].encode('latin-1'),
+                           max_form_memory_size=request.max_form_memory_size, max_parts=request.max_form_parts)
+    mb = 1024 * 1024
+    saved_budget = app.config['MAX_UPLOAD_MB'] * mb
+    filenames, paths, digests, streamed = [], [], [], None
+    try:
+        for part in form:
+            if part.name != 'file' or not part.filename:
+                continue
+            if not allowed_file(part.filename):
+                abort(400, 'Only .txt files, .zip exports and images (png, jpg, jpeg, gif, bmp, webp) are allowed')
+            filename = secure_filename(part.filename)
+            filenames.append(filename)
+            if len(filenames) > 1 and not all(is_image_file(name) for name in filenames):
+                abort(400, 'Multiple files can only be uploaded as screenshots (png, jpg, jpeg, gif, bmp, webp)')
+            if is_image_file(filename):
+                check_ocr_available()
+            if filename.lower().endswith('.txt'):
+                part.max_size = app.config['MAX_TEXT_UPLOAD_MB'] * mb
+                if stream_text is not None:
+                    streamed = stream_text(part)
+                    digests.append(part.hexdigest())
+                    continue
+            else:
+                part.max_size = saved_budget
+            path = os.path.join(tmpdir, f'{len(paths):03d}_{filename}')
+            with profile.stage('save'):
+                digests.append(hash_and_save(part, path))
+            paths.append(path)
+            if not filename.lower().endswith('.txt'):
+                saved_budget -= part.size
+    except UploadError as e:
+        abort(400, str(e))
+    if not filenames:
+        abort(400, 'No selected file')
+    is_image = all(is_image_file(name) for name in filenames)
+
+    try:
+        top_n = int(form.fields.get('top', 20))
+    except Exception:
+        top_n = 20
+    if streamed is not None:
+        return None, digests[0], is_image, top_n, streamed
+    if len(paths) == 1:
+        return paths[0], digests[0], is_image, top_n, None
+    return paths, hashlib.sha256('\n'.join(digests).encode()).hexdigest(), is_image, top_n, None
+
+
+def friendly_error(e):
+    """Error message for a failed analysis, with setup help for OCR problems"""
+    error_msg = str(e)
+    # Provide helpful installation instructions for OCR errors
+    if 'OCR' in error_msg or 'tesseract' in error_msg.lower():
+        error_msg += (
+            "\n\n📥 Installation Instructions:\n"
+            "1. Install Python packages: pip install Pillow pytesseract\n"
+            "2. Download Tesseract OCR for Windows: https://github.com/UB-Mannheim/tesseract/wiki\n"
+            "3. Install Tesseract (use default installation path)\n"
+            "4. Restart your terminal/IDE\n"
+            "5. Try uploading again\n\n"
+            "💡 Tip: Text file (.txt) uploads work immediately without OCR!"
+        )
+    return error_msg
+
+
+def cached_analysis(key, profile=NULL_PROFILE):
+    """(summary, html_name, csv_name) cached under key, or None"""
+    with profile.stage('cache_lookup'):
+        cached = report_cache.get(key)
+    if cached is None:
+        profile.count('cache_misses')
+        return None
+    profile.count('cache_hits')
+    summary = cached['summary']
+    if cached['reports_ok']:
+        return summary, cached['html_name'], cached['csv_name']
+    # Reports were cleaned up since; regenerate them without re-parsing
+    html_name, csv_name = export_reports(summary, profile)
+    report_cache.update_reports(key, html_name, csv_name)
+    return summary, html_name, csv_name
+
+
+def report_analysis(key, stats, top_n, unparsed_lines, profile=NULL_PROFILE):
+    """Summarize stats, write the reports and cache the result under key"""
+    with profile.stage('summarize'):
+        summary = summarize_stats(stats, top_n, unparsed_lines)
+    html_name, csv_name = export_reports(summary, profile)
+    report_cache.put(key, stats, top_n, summary, html_name, csv_name)
+    return summary, html_name, csv_name
+
+
+def analyze_upload(path, digest, is_image, top_n, profile=NULL_PROFILE):
+    """Analyze a saved upload, or reuse the cached result for the same content.
+
+    ``path`` is a list of paths for a multi-screenshot upload, which is
+    OCR'd in parallel with texts cached under OCR_CACHE_DIR.
+    ``digest`` is the SHA-256 of the upload. Parsed messages are kept in a
+    message store under STORES_DIR, so asking for a different top_n later
+    rebuilds the summary without parsing the export again.
+    Stage timings are recorded in ``profile``.
+    Returns (summary, html_name, csv_name).
+    """
+    key = cache_key(digest, top_n, word_capacity())
+    cached = cached_analysis(key, profile)
+    if cached is not None:
+        return cached
+    unparsed_lines = []
+    store_dir = os.path.join(STORES_DIR, digest)
+    stats = collect_stats(path, is_image=is_image, workers=app.config['OCR_WORKERS'] if is_image else 1,
+                          unparsed_lines=unparsed_lines,
+                          store_dir=store_dir, store_source={'sha256': digest},
+                          profile=profile, word_capacity=word_capacity(),
+                          ocr_cache_dir=app.config['OCR_CACHE_DIR'])
+    # No store is written for some uploads (.zip exports, chats without messages)
+    if os.path.isdir(store_dir):
+        retentions['stores'].add(digest)
+    return report_analysis(key, stats, top_n, unparsed_lines, profile)
+
+
+def parse_streamed_text(part, profile=NULL_PROFILE):
+    """Parse a chat .txt while it is being received, writing its message store as it goes.
+
+    Returns (stats, unparsed_lines, writer); the store's directory is the
+    digest of the content, only known once the whole file has arrived, so
+    the caller finishes the writer (see finish_streamed_store()).
+    """
+    unparsed_lines = []
+    writer = StoreWriter(os.path.join(STORES_DIR, 'incoming'))
+    try:
+        stats = collect_line_stats(iter_lines(part), unparsed_lines, profile=profile,
+                                   word_capacity=word_capacity(), writer=writer)
+    except BaseException:
+        writer.abort()
+        raise
+    return stats, unparsed_lines, writer
+
+
+def finish_streamed_store(stats, writer, digest):
+    """Keep the message store of a streamed upload, unless it is empty or the same content is stored already"""
+    store_dir = os.path.join(STORES_DIR, digest)
+    if not stats.total:
+        writer.abort()
+        return
+    if os.path.isdir(store_dir):
+        writer.abort()
+    else:
+        writer.finish(store_dir, {'sha256': digest}).close()
+    retentions['stores'].add(digest)
+
+
+def analyze_streamed(streamed, digest, top_n, profile=NULL_PROFILE):
+    """Report for a .txt upload parsed by parse_streamed_text(), from the cache if it has one"""
+    stats, unparsed_lines, writer = streamed
+    finish_streamed_store(stats, writer, digest)
+    key = cache_key(digest, top_n, word_capacity())
+    cached = cached_analysis(key, profile)
+    if cached is not None:
+        return cached
+    return report_analysis(key, stats, top_n, unparsed_lines, profile)
+
+
 @app.route('/upload', methods=['POST'])
 def upload():
-    if 'file' not in request.files:
-        return abort(400, 'No file part')
-    file = request.files['file']
-    if file.filename == '':
-        return abort(400, 'No selected file')
-    if not allowed_file(file.filename):
-        return abort(400, 'Only .txt files and images (png, jpg, jpeg, gif, bmp, webp) are allowed')
-    filename = secure_filename(file.filename)
-    is_image = is_image_file(filename)
-    
-    # Check if image upload is attempted but OCR is not available
-    if is_image:
-        try:
-            from main import OCR_AVAILABLE
-            if not OCR_AVAILABLE:
-                error_msg = (
-                    "Image processing requires OCR libraries. "
-                    "Please install: pip install Pillow pytesseract\n\n"
-                    "Also install Tesseract OCR engine:\n"
-                    "• Windows: Download from https://github.com/UB-Mannheim/tesseract/wiki\n"
-                    "• After installation, add Tesseract to your system PATH\n"
-                    "• Or restart your terminal/IDE after installation\n\n"
-                    "Note: Text file (.txt) uploads work without OCR!"
-                )
-                return render_template('error.html', error_message=error_msg), 400
-        except ImportError:
-            pass
-    
-    # Save to a temporary file then persist generated reports in REPORTS_DIR
+    start = time.perf_counter()
+    profile = Profile(detailed=app.config['PROFILE_LINES'])
+
+    # A chat .txt is parsed as it arrives and its digest checked against the
+    # report cache at the end; screenshots and .zip exports are saved to a
+    # temporary directory while they are hashed, so a cached result is found
+    # before they are parsed. Generated reports persist in REPORTS_DIR.
     with tempfile.TemporaryDirectory() as tmpdir:
-        path = os.path.join(tmpdir, filename)
-        file.save(path)
         try:
-            top_n = int(request.form.get('top', 20))
-        except Exception:
-            top_n = 20
-        try:
-            summary = analyze(path, top_n=top_n, is_image=is_image)
+            path, digest, is_image, top_n, streamed = receive_upload(
+                tmpdir, lambda part: parse_streamed_text(part, profile), profile)
+            if streamed is not None:
+                summary, html_name, csv_name = analyze_streamed(streamed, digest, top_n, profile)
+            else:
+                summary, html_name, csv_name = analyze_upload(path, digest, is_image, top_n, profile)
+        except HTTPException:
+            raise
         except Exception as e:
-            error_msg = str(e)
-            # Provide helpful installation instructions for OCR errors
-            if 'OCR' in error_msg or 'tesseract' in error_msg.lower():
-                error_msg += (
-                    "\n\n📥 Installation Instructions:\n"
-                    "1. Install Python packages: pip install Pillow pytesseract\n"
-                    "2. Download Tesseract OCR for Windows: https://github.com/UB-Mannheim/tesseract/wiki\n"
-                    "3. Install Tesseract (use default installation path)\n"
-                    "4. Restart your terminal/IDE\n"
-                    "5. Try uploading again\n\n"
-                    "💡 Tip: Text file (.txt) uploads work immediately without OCR!"
-                )
-            return render_template('error.html', error_message=error_msg), 400
-        
-        # generate a unique base name for reports
-        base = uuid.uuid4().hex
-        html_name = f'report_{base}.html'
-        csv_name = f'summary_{base}.csv'
-        html_path = os.path.join(REPORTS_DIR, html_name)
-        csv_path = os.path.join(REPORTS_DIR, csv_name)
-        export_html(summary, html_path)
-        export_csv(summary, csv_path)
-        # run cleanup of old reports (best-effort)
-        try:
-            clean_reports()
-        except Exception:
-            pass
-
-        # Prepare per-day series for chart (sorted by date)
-        per_day_items = sorted(summary.get('per_day', {}).items())
-        per_day_dates = [d for d, c in per_day_items]
-        per_day_counts = [c for d, c in per_day_items]
-        
-        # Prepare per-hour data for chart
-        per_hour_items = sorted(summary.get('per_hour', {}).items())
-        per_hour_hours = [f"{h:02d}:00" for h, c in per_hour_items]
-        per_hour_counts = [c for h, c in per_hour_items]
-        
-        # Prepare per-weekday data
-        weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        per_weekday_dict = summary.get('per_weekday', {})
-        per_weekday_labels = [day for day in weekday_order if day in per_weekday_dict]
-        per_weekday_counts = [per_weekday_dict[day] for day in per_weekday_labels]
-        
-        # Prepare active periods data
-        active_periods = summary.get('active_periods', {})
-        period_labels = ['Morning', 'Afternoon', 'Evening', 'Night']
-        period_counts = [active_periods.get(period, 0) for period in period_labels]
-
-        # render a nicer results page with download links and chart data
-        return render_template(
-            'report.html',
-            summary=summary,
-            report_url=url_for('reports', filename=html_name),
-            csv_url=url_for('reports', filename=csv_name),
-            per_day_dates=per_day_dates,
-            per_day_counts=per_day_counts,
-            per_hour_hours=per_hour_hours,
-            per_hour_counts=per_hour_counts,
-            per_weekday_labels=per_weekday_labels,
-            per_weekday_counts=per_weekday_counts,
-            period_labels=period_labels,
-            period_counts=period_counts,
-        )
+            metrics.inc('uploads_total', status='error')
+            return render_template('error.html', error_message=friendly_error(e)), 400
+    with profile.stage('render'):
+        response = render_report(summary, html_name, csv_name, digest)
+    metrics.record_profile(profile)
+    metrics.observe('upload_seconds', time.perf_counter() - start)
+    metrics.inc('uploads_total', status='ok')
+    return response
+
+
+def _run_job(tmpdir, path, digest, is_image, top_n):
+    """Job body: analyze a saved upload, then remove its temporary directory"""
+    profile = Profile(detailed=app.config['PROFILE_LINES'])
+    try:
+        result = analyze_upload(path, digest, is_image, top_n, profile)
+    except Exception:
+        metrics.inc('jobs_total', status='error')
+        raise
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    metrics.record_profile(profile)
+    metrics.inc('jobs_total', status='ok')
+    return result + (digest,)
+
+
+def job_payload(job):
+    payload = job.to_dict()
+    payload['status_url'] = url_for('job_status', job_id=job.id)
+    payload['result_url'] = url_for('job_result', job_id=job.id)
+    return payload
+
+
+job_queue = _make_job_queue()
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an upload for background analysis and return its job id right away"""
+    tmpdir = tempfile.mkdtemp(prefix='chatjob_')
+    try:
+        # The job outlives the request, so its files live in a directory it removes
+        path, digest, is_image, top_n, _ = receive_upload(tmpdir)
+    except BaseException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+    try:
+        job = job_queue.submit(_run_job, tmpdir, path, digest, is_image, top_n)
+    except QueueFull:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return jsonify(error='Too many analyses in progress, please retry shortly'), 503
+    return jsonify(job_payload(job)), 202
+
+
+@app.route('/jobs', methods=['GET'])
+def job_metrics():
+    """Queue depth, concurrency and job-duration metrics"""
+    return jsonify(job_queue.metrics())
+
+
+@app.route('/retention', methods=['GET'])
+def retention_metrics():
+    """Stored reports, message stores and OCR texts (count and bytes of each), and what sweeps have reclaimed"""
+    return jsonify({name: retention.metrics() for name, retention in retentions.items()})
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage latency histograms, counters and current gauges in the Prometheus text format"""
+    queue = job_queue.metrics()
+    gauges = {'jobs_queued': queue['queued'], 'jobs_running': queue['running']}
+    # What retention holds now; evictions are counters the sweeps increment (see _make_retention)
+    for name, retention in retentions.items():
+        stored = retention.metrics()
+        gauges[f'{name}_stored'] = stored['entries']
+        gauges[f'{name}_stored_bytes'] = stored['bytes']
+    response = make_response(metrics.render(gauges))
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return abort(404)
+    return jsonify(job_payload(job))
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return abort(404)
+    if job.status == FAILED:
+        return render_template('error.html', error_message=job.error), 400
+    if job.status != DONE:
+        return jsonify(job_payload(job)), 202
+    summary, html_name, csv_name, digest = job.result
+    return render_report(summary, html_name, csv_name, digest)
+
+
+def export_reports(summary, profile=NULL_PROFILE):
+    """Write the HTML and CSV reports for a summary into REPORTS_DIR, returning their names"""
+    # generate a unique base name for reports
+    base = uuid.uuid4().hex
+    html_name = f'report_{base}.html'
+    csv_name = f'summary_{base}.csv'
+    with profile.stage('export_html'):
+        export_html(summary, os.path.join(REPORTS_DIR, html_name))
+    with profile.stage('export_csv'):
+        export_csv(summary, os.path.join(REPORTS_DIR, csv_name))
+    retentions['reports'].add(html_name, csv_name)
+    return html_name, csv_name
+
+
+# Points in the messages-per-day chart. Longer series are downsampled (see
+# downsample); the page asks /api/per_day for about one point per two pixels
+# of chart width, capped at MAX_CHART_POINTS
+app.config.setdefault('CHART_POINTS', int(os.environ.get('CHART_POINTS', 400)))
+MAX_CHART_POINTS = 5000
+
+# Users shown in the report's activity heatmaps, most active first (the
+# CSV export has all of them)
+HEATMAP_USERS = 30
+
+
+def _shade_rows(users, matrix):
+    """Heatmap rows of (count, shade) cells, shaded relative to each user's busiest cell"""
+    rows = []
+    for user, counts in zip(users, matrix):
+        peak = max(counts, default=0) or 1
+        rows.append((user, [(count, round(count / peak, 2)) for count in counts]))
+    return rows
+
+
+def activity_heatmaps(summary, max_users=HEATMAP_USERS):
+    """User x hour, user x weekday and user x month heatmaps for the results page"""
+    users = [user for user, _ in summary['per_user'].most_common(max_users)]
+    if not users or not summary.get('hours_per_user'):
+        return []
+    weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    heatmaps = [
+        {'title': 'By hour', 'columns': [f'{hour:02d}' for hour in range(24)],
+         'rows': _shade_rows(users, [summary['hours_per_user'][user] for user in users])},
+        {'title': 'By day of week', 'columns': [day[:3] for day in weekday_order],
+         'rows': _shade_rows(users, [summary['weekdays_per_user'][user] for user in users])},
+    ]
+    if summary.get('first_date') and summary.get('last_date'):
+        # The sparse user x day matrix, binned into every month of the chat
+        first, last = date.fromisoformat(summary['first_date']), date.fromisoformat(summary['last_date'])
+        months = [f'{year:04d}-{month:02d}'
+                  for year in range(first.year, last.year + 1)
+                  for month in range(1, 13)
+                  if (year, month) >= (first.year, first.month) and (year, month) <= (last.year, last.month)]
+        column = {month: i for i, month in enumerate(months)}
+        matrix = []
+        for user in users:
+            counts = [0] * len(months)
+            for day, count in summary['days_per_user'].get(user, {}).items():
+                counts[column[day[:7]]] += count
+            matrix.append(counts)
+        heatmaps.append({'title': 'By month', 'columns': months, 'rows': _shade_rows(users, matrix)})
+    return heatmaps
+
+
+def render_report(summary, html_name, csv_name, digest=None):
+    """Render the results page with download links and chart data.
+
+    If the chat's messages are stored (``digest`` is the upload's SHA-256),
+    the page can re-query its charts for a date range or user through
+    /api/summary, and loads the messages-per-day series from /api/per_day
+    once the chart is scrolled into view instead of having it inlined.
+    Otherwise the series is inlined, downsampled to CHART_POINTS.
+    """
+    stored = digest is not None and os.path.isdir(os.path.join(STORES_DIR, digest))
+    if stored:
+        per_day_dates, per_day_counts = [], []
+    else:
+        per_day_dates, per_day_counts = downsample_days(summary.get('per_day', {}), app.config['CHART_POINTS'])
+    
+    # Prepare per-hour data for chart
+    per_hour_items = sorted(summary.get('per_hour', {}).items())
+    per_hour_hours = [f"{h:02d}:00" for h, c in per_hour_items]
+    per_hour_counts = [c for h, c in per_hour_items]
+    
+    # Prepare per-weekday data
+    weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    per_weekday_dict = summary.get('per_weekday', {})
+    per_weekday_labels = [day for day in weekday_order if day in per_weekday_dict]
+    per_weekday_counts = [per_weekday_dict[day] for day in per_weekday_labels]
+    
+    # Prepare active periods data
+    active_periods = summary.get('active_periods', {})
+    period_labels = ['Morning', 'Afternoon', 'Evening', 'Night']
+    period_counts = [active_periods.get(period, 0) for period in period_labels]
+
+    # render a nicer results page with download links and chart data
+    return render_template(
+        'report.html',
+        summary=summary,
+        report_url=url_for('reports', filename=html_name),
+        csv_url=url_for('reports', filename=csv_name),
+        per_day_dates=per_day_dates,
+        per_day_counts=per_day_counts,
+        per_day_url=url_for('api_per_day', chat=digest) if stored else None,
+        chart_points=app.config['CHART_POINTS'],
+        per_hour_hours=per_hour_hours,
+        per_hour_counts=per_hour_counts,
+        per_weekday_labels=per_weekday_labels,
+        per_weekday_counts=per_weekday_counts,
+        period_labels=period_labels,
+        period_counts=period_counts,
+        summary_api_url=url_for('api_summary', chat=digest) if stored else None,
+        users=list(summary.get('per_user', {})),
+        heatmaps=activity_heatmaps(summary),
+        heatmap_users=min(HEATMAP_USERS, len(summary.get('per_user', {}))),
+    )
+
+
+_DIGEST_RE = re.compile(r'[0-9a-f]{64}')
+
+# Count cubes of stored chats (see count_cube) kept in memory for
+# /api/summary and /api/per_day, least recently used dropped first once
+# together they take more than CUBE_CACHE_MB
+app.config.setdefault('CUBE_CACHE_MB', int(os.environ.get('CUBE_CACHE_MB', 64)))
+cube_cache = CubeCache(app.config['CUBE_CACHE_MB'] * 1024 * 1024)
+
+
+def _build_cube(digest):
+    store = open_store(os.path.join(STORES_DIR, digest), {'sha256': digest})
+    if store is None:
+        raise LookupError(digest)
+    with store:
+        return CountCube.from_store(store)
+
+
+def chat_cube(digest):
+    """Count cube of a stored chat, built on first use; LookupError if it has no message store.
+
+    The store may have been removed by another process's retention sweep,
+    so a cached cube is only used while the store's directory exists.
+    """
+    if not os.path.isdir(os.path.join(STORES_DIR, digest)):
+        forget_chat(digest)
+        raise LookupError(digest)
+    return cube_cache.get(digest, lambda: _build_cube(digest))
+
+
+# Downsampled /api/per_day series by (chat, from, to, user, points), least
+# recently used dropped first
+PER_DAY_CACHE_SIZE = 256
+_per_day_cache = OrderedDict()
+_per_day_lock = threading.Lock()
+
+
+def forget_chat(digest):
+    """Drop what is cached from a chat's message store, once the store is gone"""
+    cube_cache.discard(digest)
+    with _per_day_lock:
+        for key in [key for key in _per_day_cache if key[0] == digest]:
+            del _per_day_cache[key]
+
+
+# Started once forget_chat exists; the stores' retention calls it on eviction
+retentions = _make_retentions()
+
+
+def _chat_query_args():
+    """(cube, start, end, user) for the ``chat``, ``from``, ``to`` and ``user`` query parameters.
+
+    Raises LookupError for a chat without a message store and ValueError
+    for malformed dates.
+    """
+    chat = request.args.get('chat', '')
+    if not _DIGEST_RE.fullmatch(chat):
+        raise LookupError(chat)
+    cube = chat_cube(chat)
+    start, end = (date.fromisoformat(request.args[name]) if request.args.get(name) else None
+                  for name in ('from', 'to'))
+    return cube, start, end, request.args.get('user') or None
+
+
+def per_day_series(digest, start, end, user, points):
+    """Messages per day of a stored chat for /api/per_day, downsampled to ``points``.
+
+    Served from memory while the chat's store exists; LookupError once it
+    is gone, KeyError for an unknown user.
+    """
+    cube = chat_cube(digest)
+    key = (digest, start, end, user, points)
+    with _per_day_lock:
+        series = _per_day_cache.get(key)
+        if series is not None:
+            _per_day_cache.move_to_end(key)
+            return series
+    result = cube.query(start, end, user)
+    dates, counts = downsample_days(result['per_day'], points)
+    series = {
+        'from': result['from'],
+        'to': result['to'],
+        'user': user,
+        'dates': dates,
+        'counts': counts,
+        'days': len(result['per_day']),
+        'downsampled': len(dates) < len(result['per_day']),
+    }
+    with _per_day_lock:
+        _per_day_cache[key] = series
+        while len(_per_day_cache) > PER_DAY_CACHE_SIZE:
+            _per_day_cache.popitem(last=False)
+    return series
+
+
+@app.route('/api/summary', methods=['GET'])
+def api_summary():
+    """Message counts of an analyzed chat for a date range and/or one user.
+
+    Query parameters: ``chat`` (the upload's SHA-256, as linked from the
+    results page), ``from`` and ``to`` (inclusive dates, YYYY-MM-DD) and
+    ``user``. Answered from the chat's count cube (see count_cube) without
+    reading the messages again.
+    """
+    try:
+        cube, start, end, user = _chat_query_args()
+    except LookupError:
+        return jsonify(error='Unknown chat, or its messages are no longer stored'), 404
+    except ValueError:
+        return jsonify(error="'from' and 'to' must be dates like 2024-01-31"), 400
+    try:
+        return jsonify(cube.query(start, end, user))
+    except KeyError:
+        return jsonify(error='No such user in this chat'), 404
+
+
+@app.route('/api/per_day', methods=['GET'])
+def api_per_day():
+    """Messages-per-day chart series of an analyzed chat, downsampled with LTTB.
+
+    Takes the parameters of /api/summary plus ``points``, the most points
+    to return (default CHART_POINTS). A narrower date range is downsampled
+    less, down to one point per day. Responses are cached in the process
+    until the chat's store is evicted. Browsers keep them too, but
+    revalidate with the ETag, so a chat whose store is gone answers 404.
+    """
+    try:
+        cube, start, end, user = _chat_query_args()
+        points = int(request.args.get('points') or app.config['CHART_POINTS'])
+    except LookupError:
+        return jsonify(error='Unknown chat, or its messages are no longer stored'), 404
+    except ValueError:
+        return jsonify(error="'from' and 'to' must be dates like 2024-01-31, 'points' a number"), 400
+    try:
+        series = per_day_series(request.args['chat'], start, end, user, min(max(points, 3), MAX_CHART_POINTS))
+    except KeyError:
+        return jsonify(error='No such user in this chat'), 404
+    response = jsonify(series)
+    # A chat's stored messages never change, so its query identifies the series
+    response.set_etag(hashlib.sha256(request.query_string).hexdigest()[:32])
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 
 @app.route('/reports/<path:filename>')
@@ -0,0 +1,147 @@
+"""Batch mode: analyze many chat exports concurrently.
+
+    python batch.py exports/ 'archive/2024-*.txt' --workers 8 -o summaries.jsonl
+
+Sources are directories (every .txt file below them), glob patterns or
+single files. The files are spread across a process pool, one file per
+task, and a JSON line is written for each chat as soon as it finishes:
+
+    {"file": ..., "ok": true, "seconds": ..., "bytes": ..., "summary": {...}}
+    {"file": ..., "ok": false, "error": "..."}
+
+A failing file is reported on its own line and does not stop the run. The
+last line is the combined aggregate over every chat that succeeded
+(``{"combined": true, ...}``), merged in file order. Progress and
+throughput go to stderr.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+from main import collect_stats, export_csv, summarize_stats
+from stats import ChatStats
+
+
+def find_exports(sources):
+    """Sorted, de-duplicated .txt files named by directories, globs or paths"""
+    found = set()
+    for source in sources:
+        if os.path.isdir(source):
+            found.update(glob.glob(os.path.join(glob.escape(source), '**', '*.txt'), recursive=True))
+        elif os.path.isfile(source):
+            found.add(source)
+        else:
+            found.update(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return sorted(found)
+
+
+def analyze_file(path, top_n=20, backend='python', word_capacity=None):
+    """Worker: analyze one export, returning (record, stats blob or None).
+
+    Any error is caught and returned in the record, so one bad file only
+    fails its own line.
+    """
+    start = perf_counter()
+    try:
+        unparsed_lines = []
+        stats = collect_stats(path, unparsed_lines=unparsed_lines, backend=backend, word_capacity=word_capacity)
+        summary = summarize_stats(stats, top_n, unparsed_lines)
+    except Exception as e:
+        return {'file': path, 'ok': False, 'error': str(e)}, None
+    record = {
+        'file': path,
+        'ok': True,
+        'seconds': round(perf_counter() - start, 4),
+        'bytes': os.path.getsize(path),
+        'summary': summary,
+    }
+    return record, stats.to_bytes()
+
+
+def run_batch(paths, out, workers=None, top_n=20, backend='python', word_capacity=None, progress=None):
+    """Analyze paths in a process pool, writing one JSON line per chat to out.
+
+    Returns (combined ChatStats, counts dict). ``progress`` is a text stream
+    for progress lines, or None.
+    """
+    start = perf_counter()
+    blobs = {}  # index -> stats blob of each successful chat
+    counts = {'files': len(paths), 'ok': 0, 'failed': 0, 'messages': 0, 'bytes': 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyze_file, path, top_n, backend, word_capacity): i
+                   for i, path in enumerate(paths)}
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            try:
+                record, blob = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. killed for running out of memory)
+                record, blob = {'file': paths[index], 'ok': False, 'error': f'worker failed: {e!r}'}, None
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            out.flush()
+            if blob is None:
+                counts['failed'] += 1
+            else:
+                blobs[index] = blob
+                counts['ok'] += 1
+                counts['messages'] += record['summary']['total_messages']
+                counts['bytes'] += record['bytes']
+            if progress is not None:
+                elapsed = perf_counter() - start
+                status = 'ok' if blob is not None else 'FAILED'
+                progress.write(f"[{done}/{len(paths)}] {status} {record['file']}  "
+                               f"({counts['messages'] / elapsed:,.0f} msgs/s, "
+                               f"{counts['bytes'] / elapsed / 1e6:.1f} MB/s)\n")
+                progress.flush()
+
+    # Merge in file order, so the combined result doesn't depend on scheduling;
+    # merge_chat() keeps one chat's messages from answering another's
+    combined = ChatStats(word_capacity)
+    for index in sorted(blobs):
+        combined.merge_chat(ChatStats.from_bytes(blobs.pop(index)))
+    counts['seconds'] = round(perf_counter() - start, 3)
+    return combined, counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze a batch of WhatsApp chat exports')
+    parser.add_argument('sources', nargs='+', help='Directories, glob patterns or .txt files')
+    parser.add_argument('--output', '-o', help='JSON-lines output path (default: stdout)')
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes (0 = all cores)')
+    parser.add_argument('--top', type=int, default=20, help='Top N words')
+    parser.add_argument('--backend', choices=['python', 'pandas'], default='python', help='Aggregation backend')
+    parser.add_argument('--approx-words', type=int, metavar='N',
+                        help='Track at most ~2N distinct words per chat (approximate top words)')
+    parser.add_argument('--export', help='Also export the combined summary as CSV')
+    parser.add_argument('--quiet', '-q', action='store_true', help='No progress output')
+    args = parser.parse_args(argv)
+
+    paths = find_exports(args.sources)
+    if not paths:
+        parser.error('no .txt exports found')
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        combined, counts = run_batch(paths, out, workers=min(workers, len(paths)), top_n=args.top,
+                                     backend=args.backend, word_capacity=args.approx_words,
+                                     progress=None if args.quiet else sys.stderr)
+        summary = summarize_stats(combined, args.top) if combined.total else None
+        out.write(json.dumps({'combined': True, **counts, 'summary': summary}, ensure_ascii=False, default=str) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if summary is not None and args.export:
+        export_csv(summary, args.export)
+    if not args.quiet:
+        print(f"{counts['ok']} of {counts['files']} chats analyzed, {counts['failed']} failed, "
+              f"{counts['messages']:,} messages in {counts['seconds']:.1f}s "
+              f"({counts['messages'] / max(counts['seconds'], 1e-9):,.0f} msgs/s)", file=sys.stderr)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
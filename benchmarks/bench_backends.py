@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""Pure-Python vs vectorized (NumPy/pandas) analysis backend benchmark.
+
+For each size, messages are parsed once into memory and then aggregated by
+each backend, so the numbers isolate the aggregation cost; the end-to-end
+analyze() time per backend is reported alongside.
+
+    python -m benchmarks.bench_backends --sizes 100000 1000000 10000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synth import write_export
+from main import analyze, aggregate, iter_lines, iter_messages, compile_line_parser, detect_format, SNIFF_LINES
+from itertools import islice
+
+import vectorized  # noqa: F401  (keep the pandas import out of the timings)
+
+
+def parse_all(path):
+    parse = compile_line_parser(detect_format(islice(iter_lines(path), SNIFF_LINES)))
+    return list(iter_messages(iter_lines(path), parse=parse))
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analysis backend benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--end-to-end', action='store_true', help='Also time the full analyze() per backend')
+    args = parser.parse_args()
+    print(f"{'messages':>12} {'backend':>8} {'aggregate s':>12} {'msgs/s':>12} {'analyze s':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in args.sizes:
+            path = write_export(os.path.join(tmpdir, f'chat_{n}.txt'), n)
+            messages = parse_all(path)
+            summaries = {}
+            for backend in ('python', 'pandas'):
+                seconds, stats = timed(aggregate, iter(messages), backend)
+                summaries[backend] = stats.to_summary()
+                full = f'{timed(analyze, path, backend=backend)[0]:10.2f}' if args.end_to_end else f"{'-':>10}"
+                print(f'{n:>12,} {backend:>8} {seconds:>12.2f} {n / seconds:>12,.0f} {full}')
+            assert summaries['python'] == summaries['pandas'], 'backends disagree'
+            del messages
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Emoji counting benchmark: the old per-character loop vs emojis.EMOJI_RE.
+
+The corpus is the message text of a realistic synthetic export mixed with
+multilingual (Cyrillic, CJK, accented Latin) messages, which the old
+ord(ch) > 1000 loop miscounts as emoji.
+
+Most of count_emojis()'s lead over the old loop comes from skipping
+ASCII-only messages with str.isascii(), not from the regex, so the regex is
+also timed on its own against the old loop, over every message and over the
+non-ASCII ones only, and the old loop with the same skip.
+
+    python -m benchmarks.bench_emoji --messages 200000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.synth import REALISTIC, generate_lines
+from emojis import EMOJI_RE, count_emojis, emoji_counter
+
+MULTILINGUAL = [
+    'Привет, как дела? Увидимся завтра',
+    '今天晚上一起吃饭吗',
+    'こんにちは、元気ですか',
+    'naïve café crème brûlée',
+    'Ελπίζω να είσαι καλά',
+    'मैं ठीक हूँ, धन्यवाद',
+]
+
+
+def legacy_count(text):
+    return sum(1 for ch in text if ord(ch) > 1000)
+
+
+def legacy_count_skipping_ascii(text):
+    return 0 if text.isascii() else legacy_count(text)
+
+
+def regex_count(text):
+    return len(EMOJI_RE.findall(text))
+
+
+def corpus(n_messages, seed=1):
+    rng = random.Random(seed)
+    texts = []
+    for line in generate_lines(n_messages, seed=seed, **REALISTIC):
+        _, sep, body = line.partition(': ')
+        text = (body if sep else line).rstrip('\n')
+        if rng.random() < 0.1:
+            text = rng.choice(MULTILINGUAL)
+        texts.append(text)
+    return texts
+
+
+def bench(name, func, texts):
+    start = time.perf_counter()
+    total = sum(func(text) for text in texts)
+    elapsed = time.perf_counter() - start
+    print(f'{name:<26} {len(texts) / elapsed:>14,.0f} msgs/sec   {total:>10,} emojis')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Emoji counting benchmark')
+    parser.add_argument('--messages', type=int, default=200000)
+    args = parser.parse_args()
+    texts = corpus(args.messages)
+    print(f'All {len(texts):,} messages:')
+    loop = bench('ord(ch) > 1000 loop', legacy_count, texts)
+    regex = bench('EMOJI_RE alone', regex_count, texts)
+    skipping_loop = bench('loop, ASCII skipped', legacy_count_skipping_ascii, texts)
+    skipping_regex = bench('count_emojis', count_emojis, texts)
+    start = time.perf_counter()
+    counts = emoji_counter(texts)
+    print(f"{'emoji_counter (top table)':<26} {len(texts) / (time.perf_counter() - start):>14,.0f} msgs/sec")
+
+    non_ascii = [text for text in texts if not text.isascii()]
+    print(f'\nThe {len(non_ascii):,} non-ASCII messages:')
+    non_ascii_loop = bench('ord(ch) > 1000 loop', legacy_count, non_ascii)
+    non_ascii_regex = bench('EMOJI_RE alone', regex_count, non_ascii)
+
+    print(f'\nEMOJI_RE vs the loop: {loop / regex:.2f}x on all messages, '
+          f'{non_ascii_loop / non_ascii_regex:.2f}x on non-ASCII ones')
+    print(f'count_emojis vs the loop: {loop / skipping_regex:.1f}x '
+          f'(the loop with the same ASCII skip: {loop / skipping_loop:.1f}x)')
+    print('top: ' + ' '.join(f'{e} {c}' for e, c in counts.most_common(5)))
+
+
+if __name__ == '__main__':
+    main()
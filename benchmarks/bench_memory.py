@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Peak-RSS benchmark for main.analyze on growing synthetic exports.
+
+Each size is analyzed in a fresh subprocess per reader so ru_maxrss
+reflects only that run: 'mmap' is analyze()'s path for a plain .txt (the
+mmapped bytes reader), 'lines' the line-by-line reader uploads are
+streamed through. With either, peak RSS should stay roughly flat as the export
+grows.
+
+    python -m benchmarks.bench_memory --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synth import write_export
+
+READERS = ('mmap', 'lines')
+
+CHILD = r'''
+import json, resource, sys, time
+from main import collect_line_stats, collect_stats, iter_lines, summarize_stats
+start = time.perf_counter()
+if sys.argv[2] == "mmap":
+    stats = collect_stats(sys.argv[1])
+else:
+    stats = collect_line_stats(iter_lines(sys.argv[1]))
+messages = summarize_stats(stats)["total_messages"]
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "messages": messages,
+    "seconds": round(elapsed, 3),
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+'''
+
+
+def run(sizes):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in sizes:
+            path = write_export(os.path.join(tmpdir, f'chat_{n}.txt'), n)
+            for reader in READERS:
+                out = subprocess.run([sys.executable, '-c', CHILD, path, reader], cwd=root,
+                                     capture_output=True, text=True, check=True)
+                result = json.loads(out.stdout)
+                result['reader'] = reader
+                result['file_mb'] = round(os.path.getsize(path) / 1e6, 1)
+                results.append(result)
+                print(f"{n:>10,} msgs  {result['file_mb']:>8} MB  {reader:>5}  "
+                      f"{result['seconds']:>8}s  peak RSS {result['max_rss_kb'] / 1024:.1f} MB")
+            os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory benchmark for analyze()')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    run(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
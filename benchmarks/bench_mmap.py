@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Line-by-line text reader vs the mmapped bytes-level reader on a large export.
+
+Writes a realistic synthetic export of at least --gigabytes (default 1 GB)
+unless --path names an existing one, then times message iteration with
+each reader. Both readers must yield the same number of messages.
+
+    python -m benchmarks.bench_mmap --gigabytes 1 --path /tmp/chat_1g.txt --keep
+"""
+import argparse
+import os
+import tempfile
+import time
+from itertools import islice
+
+from benchmarks.synth import REALISTIC, generate_lines, write_export
+from main import SNIFF_LINES, compile_line_parser, detect_format, iter_lines, iter_messages, iter_messages_mmap
+
+
+def make_export(path, gigabytes):
+    sample = sum(len(line.encode('utf-8')) for line in generate_lines(20000, **REALISTIC)) / 20000
+    n_messages = int(gigabytes * 1e9 / sample * 1.01)
+    start = time.perf_counter()
+    write_export(path, n_messages, **REALISTIC)
+    print(f'wrote {n_messages:,} messages ({os.path.getsize(path) / 1e9:.2f} GB) in {time.perf_counter() - start:.0f}s')
+
+
+def count(messages):
+    n = 0
+    for _ in messages:
+        n += 1
+    return n
+
+
+def bench(name, func, size):
+    start = time.perf_counter()
+    n = func()
+    elapsed = time.perf_counter() - start
+    print(f'{name:<28} {elapsed:>8.1f}s {n / elapsed:>12,.0f} msgs/s {size / elapsed / 1e6:>8.1f} MB/s')
+    return elapsed, n
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mmap reader benchmark')
+    parser.add_argument('--gigabytes', type=float, default=1.0)
+    parser.add_argument('--path', help='Export to use (written first if missing)')
+    parser.add_argument('--keep', action='store_true', help='Keep a generated export')
+    args = parser.parse_args()
+    tmpdir = None
+    path = args.path
+    if path is None:
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, 'chat.txt')
+    if not os.path.exists(path):
+        make_export(path, args.gigabytes)
+    size = os.path.getsize(path)
+    fmt = detect_format(islice(iter_lines(path), SNIFF_LINES))
+    try:
+        lines_s, lines_n = bench('text lines + line parser',
+                                 lambda: count(iter_messages(iter_lines(path), parse=compile_line_parser(fmt))), size)
+        mmap_s, mmap_n = bench('mmap bytes reader', lambda: count(iter_messages_mmap(path, fmt)), size)
+        assert lines_n == mmap_n, 'readers disagree'
+        print(f'reader speedup {lines_s / mmap_s:.2f}x')
+    finally:
+        if tmpdir and not args.keep:
+            os.remove(path)
+            os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Lines/sec microbenchmark for timestamp parsing.
+
+Compares the old dateutil-per-line approach ("before") with parse_line on
+the cached timestamp engine and the per-file specialised parser ("after").
+
+    python -m benchmarks.bench_timestamps --lines 200000
+"""
+import argparse
+import re
+import time
+
+from benchmarks.synth import generate_lines
+from main import TIMESTAMP_PATTERNS, parse_line, split_author, detect_format, compile_line_parser
+
+try:
+    from dateutil import parser as dtparser
+except Exception:
+    dtparser = None
+
+
+def legacy_parse_line(line):
+    """The pre-engine parse_line: every pattern, re.sub, then dateutil"""
+    for pattern in TIMESTAMP_PATTERNS:
+        m = pattern.match(line)
+        if m:
+            date = m.group('date')
+            time_ = m.group('time').strip()
+            rest = m.group('rest').strip()
+            if not rest:
+                continue
+            author, message = split_author(rest)
+            time_upper = time_.upper()
+            time_clean = re.sub(r'\s*(AM|PM)\s*', '', time_, flags=re.IGNORECASE).strip()
+            is_pm = 'PM' in time_upper
+            is_am = 'AM' in time_upper
+            try:
+                dt = dtparser.parse(f"{date} {time_clean}", dayfirst=True)
+            except Exception:
+                try:
+                    dt = dtparser.parse(f"{date} {time_clean}")
+                except Exception:
+                    dt = None
+            if dt is not None:
+                if is_pm and dt.hour < 12:
+                    dt = dt.replace(hour=dt.hour + 12)
+                elif is_am and dt.hour == 12:
+                    dt = dt.replace(hour=0)
+            return dt, author, message
+    return None
+
+
+def bench(name, func, lines, baseline=None):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    elapsed = time.perf_counter() - start
+    rate = len(lines) / elapsed
+    speedup = f'  ({rate / baseline:.1f}x)' if baseline else ''
+    print(f'{name:<28} {rate:>12,.0f} lines/sec{speedup}')
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Timestamp parsing microbenchmark')
+    parser.add_argument('--lines', type=int, default=200000)
+    args = parser.parse_args()
+    lines = [line.rstrip() for line in generate_lines(args.lines)]
+    baseline = None
+    if dtparser:
+        baseline = bench('before: dateutil per line', legacy_parse_line, lines)
+    else:
+        print('dateutil not installed, skipping the "before" baseline')
+    bench('after: parse_line', parse_line, lines, baseline)
+    bench('after: specialised parser', compile_line_parser(detect_format(lines[:200])), lines, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""Compare two benchmark.suite JSON result files.
+
+Cases are matched by name and parameters. A case whose time grew by more
+than ``--threshold`` (default 10%) is reported as a regression and the
+exit status is 1, so the comparison can gate CI.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    return report, {(r['name'], json.dumps(r['params'], sort_keys=True)): r for r in report['results']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare benchmark results')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown as a fraction')
+    args = parser.parse_args()
+
+    base_report, baseline = load(args.baseline)
+    cur_report, current = load(args.current)
+    print(f"baseline {base_report['environment'].get('commit')}  vs  current {cur_report['environment'].get('commit')}\n")
+    regressions = 0
+    for key, entry in current.items():
+        name, params = key
+        label = f"{name} {' '.join(f'{k}={v}' for k, v in json.loads(params).items())}"
+        old = baseline.get(key)
+        if old is None:
+            print(f'{label:<56} {"new":>8}')
+            continue
+        change = entry['seconds'] / old['seconds'] - 1 if old['seconds'] else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{label:<56} {old['seconds']:>10.4f}s -> {entry['seconds']:>10.4f}s {change:>+8.1%}{flag}")
+    for key in baseline.keys() - current.keys():
+        print(f'{key[0]} {key[1]:<48} {"missing":>8}')
+    if regressions:
+        print(f'\n{regressions} regression(s) above {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
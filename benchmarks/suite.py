@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""End-to-end benchmark suite with JSON results for regression tracking.
+
+Cases:
+
+    parse_line   lines/sec for every export layout (generic and specialised parser)
+    analyze      analyze() on exports of each size
+    export       export_csv() and export_html() of the resulting summary
+    upload       POST /upload through the Flask test client, cold and cached
+
+Each case runs ``--repeat`` times and the best time is kept. Results are
+written as JSON together with the git commit, so two runs can be checked
+with benchmarks.compare:
+
+    python -m benchmarks.suite --sizes 10000 100000 --out before.json
+    python -m benchmarks.suite --sizes 10000 100000 --out after.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synth import FORMATS, REALISTIC, generate_lines, write_export
+from main import analyze, compile_line_parser, detect_format, export_csv, export_html, parse_line, SNIFF_LINES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def best_of(repeat, func, *args, **kwargs):
+    """Best wall-clock seconds of repeat calls"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def result(name, seconds, items=None, unit='messages', **params):
+    entry = {'name': name, 'params': params, 'seconds': round(seconds, 6)}
+    if items:
+        entry['rate'] = round(items / seconds, 1)
+        entry['unit'] = f'{unit}/s'
+    return entry
+
+
+def bench_parse_line(lines_per_format, repeat, options):
+    def run(parse, lines):
+        for line in lines:
+            parse(line)
+
+    results = []
+    for fmt in FORMATS:
+        lines = list(generate_lines(lines_per_format, fmt=fmt, **options))
+        specialised = compile_line_parser(detect_format(lines[:SNIFF_LINES]))
+        for parser_name, parse in (('generic', parse_line), ('specialised', specialised)):
+            seconds = best_of(repeat, run, parse, lines)
+            results.append(result('parse_line', seconds, len(lines), 'lines', fmt=fmt, parser=parser_name))
+    return results
+
+
+def bench_analyze(path, n, repeat):
+    seconds = best_of(repeat, analyze, path)
+    return [result('analyze', seconds, n, messages=n)]
+
+
+def bench_exports(path, n, repeat, tmpdir):
+    summary = analyze(path)
+    csv_path = os.path.join(tmpdir, 'summary.csv')
+    html_path = os.path.join(tmpdir, 'summary.html')
+    return [result('export_csv', best_of(repeat, export_csv, summary, csv_path), messages=n),
+            result('export_html', best_of(repeat, export_html, summary, html_path), messages=n)]
+
+
+def bench_upload(path, n, repeat, tmpdir):
+    """POST /upload with report output, cache and stores redirected to tmpdir"""
+    import app as webapp
+    from report_cache import ReportCache
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    client = webapp.app.test_client()
+    webapp.REPORTS_DIR = os.path.join(tmpdir, 'reports')
+    os.makedirs(webapp.REPORTS_DIR, exist_ok=True)
+
+    def post():
+        response = client.post('/upload', data={'file': (io.BytesIO(data), 'chat.txt'), 'top': '20'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200, response.status_code
+
+    def cold():
+        # Fresh cache and store directory: the upload is parsed from scratch
+        scratch = tempfile.mkdtemp(dir=tmpdir)
+        webapp.report_cache = ReportCache(os.path.join(scratch, 'cache'), webapp.REPORTS_DIR)
+        webapp.STORES_DIR = os.path.join(scratch, 'stores')
+        post()
+
+    results = [result('upload', best_of(repeat, cold), n, messages=n, cache='cold')]
+    post()
+    results.append(result('upload', best_of(repeat, post), n, messages=n, cache='hit'))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='Export sizes (messages) for analyze/export/upload')
+    parser.add_argument('--parse-lines', type=int, default=50000, help='Lines per format for parse_line')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--vocabulary', type=int, default=2000)
+    parser.add_argument('--cases', nargs='+', default=['parse_line', 'analyze', 'export', 'upload'],
+                        choices=['parse_line', 'analyze', 'export', 'upload'])
+    parser.add_argument('--upload-max', type=int, default=100000,
+                        help='Skip /upload for exports larger than this many messages')
+    parser.add_argument('--out', help='Write JSON results to this path')
+    args = parser.parse_args()
+
+    options = dict(REALISTIC, users=args.users, vocabulary=args.vocabulary)
+    results = []
+    if 'parse_line' in args.cases:
+        results += bench_parse_line(args.parse_lines, args.repeat, options)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in args.sizes:
+            path = write_export(os.path.join(tmpdir, f'chat_{n}.txt'), n, **options)
+            if 'analyze' in args.cases:
+                results += bench_analyze(path, n, args.repeat)
+            if 'export' in args.cases:
+                results += bench_exports(path, n, args.repeat, tmpdir)
+            if 'upload' in args.cases and n <= args.upload_max:
+                results += bench_upload(path, n, args.repeat, tmpdir)
+            os.remove(path)
+
+    for entry in results:
+        params = ' '.join(f'{k}={v}' for k, v in entry['params'].items())
+        rate = f"{entry['rate']:>14,.0f} {entry['unit']}" if 'rate' in entry else ''
+        print(f"{entry['name']:<12} {params:<40} {entry['seconds']:>10.4f}s {rate}")
+
+    report = {'environment': environment(), 'options': vars(args), 'results': results}
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print('\nWrote', args.out, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
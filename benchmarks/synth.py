@@ -0,0 +1,138 @@
+"""Deterministic synthetic WhatsApp export generator for benchmarks.
+
+Exports are generated line by line, so any size (10k to 10M+ messages) can
+be written without holding it in memory. Every TIMESTAMP_PATTERNS layout is
+available through ``fmt``; the user list, vocabulary and the share of
+multi-line, media, link and emoji messages are configurable. The same
+arguments and seed always produce the same bytes.
+
+    python -m benchmarks.synth chat.txt --messages 1000000 --fmt ios --realistic
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+USERS = ['Alice', 'Bob', 'Charlie', 'Dave', 'Eve', 'Frank', 'Grace', 'Heidi']
+WORDS = ("hello how are you doing today good morning see the news check this out "
+         "meeting tomorrow dinner tonight great thanks lol okay sure where when why").split()
+EMOJIS = ['😂', '❤️', '👍', '🎉', '🙏', '😍', '🔥', '👍🏽', '👨‍👩‍👧', '🇮🇳', '1️⃣']
+MEDIA = ['<Media omitted>', 'image omitted', '<Media omitted>']
+
+
+def _twelve_hour(dt):
+    return dt.hour % 12 or 12, 'am' if dt.hour < 12 else 'pm'
+
+
+def _android_12h(dt):
+    hour, suffix = _twelve_hour(dt)
+    return f"{dt.day}/{dt.month}/{dt:%y}, {hour}:{dt:%M} {suffix} - "
+
+
+def _ios(dt):
+    hour, suffix = _twelve_hour(dt)
+    return f"[{dt:%d/%m/%Y}, {hour}:{dt:%M:%S} {suffix.upper()}] "
+
+
+# Line prefix per layout, in TIMESTAMP_PATTERNS order
+FORMATS = {
+    'android_12h': _android_12h,
+    'android': lambda dt: f"{dt:%d/%m/%Y}, {dt:%H:%M} - ",
+    'ios': _ios,
+    'us': lambda dt: f"{dt:%m/%d/%Y}, {dt:%H:%M} - ",
+    'no_separator': lambda dt: f"{dt:%d/%m/%Y} {dt:%H:%M} ",
+    'dotted': lambda dt: f"{dt:%d.%m.%Y}, {dt:%H:%M} - ",
+}
+
+# Content mix close to real group chats; the defaults of generate_lines()
+# produce plain text only so older benchmark numbers stay comparable
+REALISTIC = {'media_rate': 0.05, 'link_rate': 0.02, 'emoji_rate': 0.15}
+
+
+def make_users(count):
+    """count user names: USERS first, then User9, User10, ..."""
+    return (USERS + [f'User{i}' for i in range(len(USERS) + 1, count + 1)])[:count]
+
+
+def make_vocabulary(size, seed=0):
+    """size distinct lowercase words: WORDS first, then random pseudo-words"""
+    rng = random.Random(seed)
+    words = list(WORDS[:size])
+    seen = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def generate_lines(n_messages, seed=42, start=datetime(2020, 1, 1, 8, 0), fmt='android',
+                   users=USERS, vocabulary=WORDS, multiline_rate=0.05,
+                   media_rate=0.0, link_rate=0.0, emoji_rate=0.0, word_skew=0.0):
+    """Yield export lines (with trailing newline) for n_messages messages.
+
+    ``users`` and ``vocabulary`` may be lists or sizes (see make_users() and
+    make_vocabulary()). Rates are per-message probabilities. Words are drawn
+    uniformly, or Zipf-like with exponent ``word_skew`` when it is > 0.
+    """
+    if isinstance(users, int):
+        users = make_users(users)
+    if isinstance(vocabulary, int):
+        vocabulary = make_vocabulary(vocabulary, seed)
+    prefix = FORMATS[fmt]
+    rng = random.Random(seed)
+    if word_skew > 0:
+        cum_weights = list(accumulate(1 / rank ** word_skew for rank in range(1, len(vocabulary) + 1)))
+
+        def words(k):
+            return rng.choices(vocabulary, cum_weights=cum_weights, k=k)
+    else:
+        def words(k):
+            return [rng.choice(vocabulary) for _ in range(k)]
+    dt = start
+    for _ in range(n_messages):
+        dt += timedelta(minutes=rng.randint(0, 90))
+        user = rng.choice(users)
+        body = ' '.join(words(rng.randint(1, 15)))
+        # Rates of 0 draw nothing from rng, keeping the plain-text stream stable
+        if media_rate and rng.random() < media_rate:
+            body = rng.choice(MEDIA)
+        else:
+            if link_rate and rng.random() < link_rate:
+                body += f' https://example.com/{rng.choice(vocabulary)}'
+            if emoji_rate and rng.random() < emoji_rate:
+                body += ' ' + ''.join(rng.choice(EMOJIS) for _ in range(rng.randint(1, 3)))
+        if fmt == 'ios' and dt.second == 0:
+            dt += timedelta(seconds=rng.randint(1, 59))
+        yield f"{prefix(dt)}{user}: {body}\n"
+        if rng.random() < multiline_rate:
+            # multi-line message continuation
+            yield ' '.join(words(rng.randint(1, 8))) + '\n'
+
+
+def write_export(path, n_messages, seed=42, **options):
+    """Write a synthetic export with n_messages messages to path"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(generate_lines(n_messages, seed=seed, **options))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic WhatsApp export')
+    parser.add_argument('path')
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--fmt', choices=list(FORMATS), default='android')
+    parser.add_argument('--users', type=int, default=len(USERS))
+    parser.add_argument('--vocabulary', type=int, default=len(WORDS))
+    parser.add_argument('--word-skew', type=float, default=0.0, help='Zipf exponent for word choice (0 = uniform)')
+    parser.add_argument('--realistic', action='store_true', help='Add media, link and emoji messages')
+    args = parser.parse_args()
+    options = REALISTIC if args.realistic else {}
+    write_export(args.path, args.messages, seed=args.seed, fmt=args.fmt,
+                 users=args.users, vocabulary=args.vocabulary, word_skew=args.word_skew, **options)
+
+
+if __name__ == '__main__':
+    main()
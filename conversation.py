@@ -0,0 +1,200 @@
+"""Single-pass conversation sessions and reply latencies.
+
+ConversationStats follows the timed messages of authors in chat order and
+keeps only per-author (and per replying pair) state, never the messages:
+
+* a session ends after more than SESSION_GAP seconds without a message;
+  whoever writes the next one starts a new session;
+* within a session, a message from a different author than the previous
+  one is a reply to that author, after the time between the two.
+
+Replies never take longer than SESSION_GAP, so each replying author keeps
+exact latency -> count histograms (a few dozen keys for minute-resolution
+exports), which give exact medians and percentiles, and each (replier,
+replied-to) pair a small fixed histogram of coarser buckets. System
+messages and messages without a date are skipped.
+
+A chunk cannot know whether its first message starts a session or answers
+the end of the previous chunk, so that message is kept aside as ``head``
+and settled by merge() against the previous chunk's last message. Merging
+chunks in chat order therefore gives exactly the serial result. Separate
+chats are combined with merge_chat() instead, which never links messages
+across them.
+"""
+import math
+from array import array
+
+# Seconds of silence after which the next message starts a new session
+SESSION_GAP = 60 * 60
+
+# Upper bounds (seconds) of the per-pair reply latency buckets; the last
+# bucket holds everything slower, up to SESSION_GAP
+REPLY_BUCKETS = (60, 5 * 60, 15 * 60, 30 * 60)
+REPLY_BUCKET_NAMES = ('1m', '5m', '15m', '30m', f'{SESSION_GAP // 60}m')
+
+# Layout of a pair record: replies, total latency, then the bucket counts
+PAIR_SIZE = 2 + len(REPLY_BUCKET_NAMES)
+
+# Pair record slot for every possible latency, 0 to SESSION_GAP seconds
+_PAIR_SLOTS = bytes(2 + sum(seconds > bound for bound in REPLY_BUCKETS) for seconds in range(SESSION_GAP + 1))
+
+
+def _percentile(latencies, count, q):
+    """Nearest-rank q-th percentile of a sorted [(seconds, count)] histogram"""
+    rank = max(1, math.ceil(q / 100 * count))
+    seen = 0
+    for seconds, n in latencies:
+        seen += n
+        if seen >= rank:
+            return seconds
+    return 0
+
+
+class ConversationStats:
+    """Sessions, conversation starters and reply latencies, keyed by author id"""
+
+    __slots__ = ('head', 'last_time', 'last_author', 'started', 'latencies', 'pairs')
+
+    def __init__(self):
+        self.head = None  # (timestamp, author id) of the first message, until merged after an earlier chunk
+        self.last_time = None  # timestamps are seconds (date ordinal * 86400 + time of day)
+        self.last_author = None
+        self.started = {}  # author id -> sessions started (the head's session not included)
+        self.latencies = {}  # replying author id -> {seconds: replies}
+        self.pairs = {}  # (replier id, replied-to id) -> array of PAIR_SIZE ints
+
+    def _reply(self, replier, replied_to, seconds):
+        # Exports are not always in time order; an out-of-order reply counts as immediate
+        if seconds < 0:
+            seconds = 0
+        latencies = self.latencies.get(replier)
+        if latencies is None:
+            latencies = self.latencies[replier] = {}
+        latencies[seconds] = latencies.get(seconds, 0) + 1
+        pair = self.pairs.get((replier, replied_to))
+        if pair is None:
+            pair = self.pairs[(replier, replied_to)] = array('q', bytes(8 * PAIR_SIZE))
+        pair[0] += 1
+        pair[1] += seconds
+        pair[_PAIR_SLOTS[seconds]] += 1
+
+    def _follow(self, timestamp, author_id):
+        """Account for a message that comes after last_time/last_author"""
+        gap = timestamp - self.last_time
+        if gap > SESSION_GAP:
+            self.started[author_id] = self.started.get(author_id, 0) + 1
+        elif author_id != self.last_author:
+            self._reply(author_id, self.last_author, gap)
+
+    def _start(self, timestamp, author_id):
+        """Account for a message with nothing before it to answer"""
+        if self.head is None:
+            self.head = (timestamp, author_id)
+        else:
+            # After merge_chat(): a session of its own
+            self.started[author_id] = self.started.get(author_id, 0) + 1
+
+    def add(self, timestamp, author_id):
+        """Add the next timed message of an author"""
+        # _follow() inlined: this runs for nearly every message
+        last_time = self.last_time
+        if last_time is None:
+            self._start(timestamp, author_id)
+        elif timestamp - last_time > SESSION_GAP:
+            started = self.started
+            started[author_id] = started.get(author_id, 0) + 1
+        elif author_id != self.last_author:
+            self._reply(author_id, self.last_author, timestamp - last_time)
+        self.last_time = timestamp
+        self.last_author = author_id
+
+    def merge(self, other, id_map):
+        """Fold in the ConversationStats of the chunk that follows this one.
+
+        ``id_map`` maps other's author ids to this one's.
+        """
+        if other.head is not None:
+            timestamp, author_id = other.head
+            if self.last_time is None:
+                self._start(timestamp, id_map[author_id])
+            else:
+                self._follow(timestamp, id_map[author_id])
+        self._fold(other, id_map)
+        if other.last_time is not None:
+            self.last_time = other.last_time
+            self.last_author = id_map[other.last_author]
+        return self
+
+    def merge_chat(self, other, id_map):
+        """Fold in the ConversationStats of another, unrelated chat.
+
+        Its first message starts a session rather than answering this one's
+        last message, and nothing added afterwards is a reply to either chat.
+        """
+        if other.head is not None:
+            timestamp, author_id = other.head
+            self._start(timestamp, id_map[author_id])
+        self._fold(other, id_map)
+        self.last_time = None
+        self.last_author = None
+        return self
+
+    def _fold(self, other, id_map):
+        """Add other's session starts, latencies and pair records"""
+        for author_id, count in other.started.items():
+            author_id = id_map[author_id]
+            self.started[author_id] = self.started.get(author_id, 0) + count
+        for author_id, other_latencies in other.latencies.items():
+            latencies = self.latencies.setdefault(id_map[author_id], {})
+            for seconds, n in other_latencies.items():
+                latencies[seconds] = latencies.get(seconds, 0) + n
+        for (replier, replied_to), counts in other.pairs.items():
+            key = (id_map[replier], id_map[replied_to])
+            pair = self.pairs.get(key)
+            if pair is None:
+                self.pairs[key] = array('q', counts)
+            else:
+                for i, n in enumerate(counts):
+                    pair[i] += n
+
+    def sessions_started(self):
+        """author id -> sessions started, the chat's first session included"""
+        started = dict(self.started)
+        if self.head is not None:
+            author_id = self.head[1]
+            started[author_id] = started.get(author_id, 0) + 1
+        return started
+
+    def to_summary(self, authors):
+        """Summary entries, with author ids resolved through ``authors``"""
+        started = self.sessions_started()
+        response_time = {}
+        for author_id, latencies in self.latencies.items():
+            count = sum(latencies.values())
+            latencies = sorted(latencies.items())
+            response_time[authors[author_id]] = {
+                'replies': count,
+                'median_seconds': _percentile(latencies, count, 50),
+                'p90_seconds': _percentile(latencies, count, 90),
+                'mean_seconds': round(sum(seconds * n for seconds, n in latencies) / count, 1),
+            }
+        # Ties are broken by name so that merged and serial runs list authors alike
+        response_time = dict(sorted(response_time.items(), key=lambda x: (-x[1]['replies'], x[0])))
+        replies = []
+        for (replier, replied_to), pair in sorted(self.pairs.items(),
+                                                  key=lambda x: (-x[1][0], authors[x[0][0]], authors[x[0][1]])):
+            replies.append({
+                'from': authors[replier],
+                'to': authors[replied_to],
+                'count': pair[0],
+                'mean_seconds': round(pair[1] / pair[0], 1),
+                'within': dict(zip(REPLY_BUCKET_NAMES, pair[2:])),
+            })
+        return {
+            'sessions': sum(started.values()),
+            'session_gap_minutes': SESSION_GAP // 60,
+            'sessions_started_per_user': {authors[author_id]: count for author_id, count
+                                          in sorted(started.items(), key=lambda x: (-x[1], authors[x[0]]))},
+            'response_time_per_user': response_time,
+            'replies_per_pair': replies,
+        }
@@ -0,0 +1,172 @@
+"""Per-day x per-hour message counts with prefix sums over days.
+
+A CountCube is built once from a message store's timestamp and author
+columns (no message text is decoded) with NumPy, and then answers "how many
+messages, when and by whom" for any date range and user without going back
+to the messages. It holds:
+
+    hours   (days + 1) x 24 prefix sums for everyone (system messages
+            included), row d = counts of all days before d
+    totals  days + 1 prefix sums of the same over the hours
+    cells   the sparse (author, day, hour) cells that have messages, sorted,
+            with a running sum of their counts
+
+so everyone's totals for a range are two lookups and the hourly profile one
+row subtraction. An author's messages are a contiguous run of cells, and a
+date range within it is found by binary search; its total is again two
+lookups, and its day and hour series come from the cells in the range
+only. Memory grows with the messages' distinct (author, day, hour) cells,
+not with authors x days.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+from message_store import NO_AUTHOR, NO_TIME
+from stats import HOUR_PERIODS, PERIOD_NAMES, WEEKDAY_NAMES
+
+_HOUR_PERIODS = np.asarray(HOUR_PERIODS)
+
+
+class CountCube:
+    """Prefix-summed message counts of one chat"""
+
+    def __init__(self, first_day, n_days, authors, hours, totals, cell_keys, cell_sums):
+        self.first_day = first_day
+        self.n_days = n_days
+        self.authors = authors
+        self._author_codes = {author: i for i, author in enumerate(authors)}
+        self._hours = hours
+        self._totals = totals
+        # Cell key: (author code * n_days + day index) * 24 + hour
+        self._cell_keys = cell_keys
+        self._cell_sums = cell_sums  # len(cell_keys) + 1 running sums of cell counts
+
+    @classmethod
+    def from_store(cls, store):
+        # Masking copies the columns, so no array keeps the store's mapping open
+        timestamps = np.asarray(store.timestamps, dtype=np.int64)
+        timed = timestamps != NO_TIME
+        timestamps, codes = timestamps[timed], np.asarray(store.author_codes, dtype=np.int64)[timed]
+        days = timestamps // 86400
+        first_day = int(days.min()) if days.size else 0
+        n_days = int(days.max()) - first_day + 1 if days.size else 0
+        days -= first_day
+        hour = timestamps % 86400 // 3600
+
+        # Counts of day d go in row d + 1, so row 0 stays all zeros
+        hours = np.zeros((n_days + 1) * 24, dtype=np.int64)
+        hours[24:] = np.bincount(days * 24 + hour, minlength=n_days * 24)
+        hours = hours.reshape(n_days + 1, 24).cumsum(axis=0)
+        totals = hours.sum(axis=1)
+
+        attributed = codes != NO_AUTHOR
+        cell_keys, counts = np.unique((codes[attributed] * n_days + days[attributed]) * 24 + hour[attributed],
+                                      return_counts=True)
+        cell_sums = np.zeros(cell_keys.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=cell_sums[1:])
+        return cls(first_day, n_days, list(store.authors), hours, totals, cell_keys, cell_sums)
+
+    @property
+    def nbytes(self):
+        """Memory held by the count arrays"""
+        return self._hours.nbytes + self._totals.nbytes + self._cell_keys.nbytes + self._cell_sums.nbytes
+
+    def _rows(self, start, end):
+        """Prefix rows (lo, hi) covering the inclusive date range, clamped to the chat"""
+        lo = 0 if start is None else min(max(start.toordinal() - self.first_day, 0), self.n_days)
+        hi = self.n_days if end is None else min(max(end.toordinal() - self.first_day + 1, 0), self.n_days)
+        return lo, max(lo, hi)
+
+    def _cells(self, code, lo, hi):
+        """Index range of an author's cells on days lo to hi - 1"""
+        base = code * self.n_days
+        return np.searchsorted(self._cell_keys, [(base + lo) * 24, (base + hi) * 24]).tolist()
+
+    def query(self, start=None, end=None, author=None):
+        """Counts for messages from ``start`` to ``end`` (inclusive dates, None for open), optionally by one author.
+
+        Returns a dict shaped like the matching keys of the analysis
+        summary: total_messages, per_user, per_day, per_hour, per_weekday
+        and active_periods. Raises KeyError for an unknown author.
+        """
+        lo, hi = self._rows(start, end)
+        sums = self._cell_sums
+        if author is None:
+            per_user = {}
+            for code, name in enumerate(self.authors):
+                i, j = self._cells(code, lo, hi)
+                per_user[name] = int(sums[j] - sums[i])
+            hour_counts = self._hours[hi] - self._hours[lo]
+            day_counts = np.diff(self._totals[lo:hi + 1])
+            total = int(self._totals[hi] - self._totals[lo])
+        else:
+            code = self._author_codes[author]
+            i, j = self._cells(code, lo, hi)
+            total = int(sums[j] - sums[i])
+            per_user = {author: total}
+            keys = self._cell_keys[i:j]
+            counts = np.diff(sums[i:j + 1])
+            hour_counts = np.bincount(keys % 24, weights=counts, minlength=24).astype(np.int64)
+            day_counts = np.bincount(keys // 24 - code * self.n_days - lo, weights=counts,
+                                     minlength=hi - lo).astype(np.int64)
+
+        active = np.flatnonzero(day_counts)
+        per_day = {}
+        weekday_counts = [0] * 7
+        for offset, count in zip(active.tolist(), day_counts[active].tolist()):
+            day = date.fromordinal(self.first_day + lo + offset)
+            per_day[day.isoformat()] = count
+            weekday_counts[day.weekday()] += count
+        period_counts = np.bincount(_HOUR_PERIODS, weights=hour_counts, minlength=4).astype(np.int64).tolist()
+
+        return {
+            'from': date.fromordinal(self.first_day + lo).isoformat() if hi > lo else None,
+            'to': date.fromordinal(self.first_day + hi - 1).isoformat() if hi > lo else None,
+            'user': author,
+            'total_messages': total,
+            'per_user': {name: count for name, count in sorted(per_user.items(), key=lambda x: -x[1]) if count},
+            'per_day': per_day,
+            'per_hour': {h: count for h, count in enumerate(hour_counts.tolist()) if count},
+            'per_weekday': {WEEKDAY_NAMES[d]: count for d, count in enumerate(weekday_counts) if count},
+            'active_periods': {PERIOD_NAMES[p]: count for p, count in enumerate(period_counts) if count},
+        }
+
+
+class CubeCache:
+    """LRU of count cubes by key, bounded by the bytes their arrays take"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._cubes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """The cube cached under key, or ``build()``'s result, cached if it fits"""
+        with self._lock:
+            cube = self._cubes.get(key)
+            if cube is not None:
+                self._cubes.move_to_end(key)
+                return cube
+        # Built outside the lock; a concurrent build of the same key is only wasted work
+        cube = build()
+        if cube.nbytes > self.max_bytes:
+            return cube
+        with self._lock:
+            if key not in self._cubes:
+                self._cubes[key] = cube
+                self.nbytes += cube.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._cubes.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return cube
+
+    def discard(self, key):
+        """Drop the cube cached under key, if any"""
+        with self._lock:
+            cube = self._cubes.pop(key, None)
+            if cube is not None:
+                self.nbytes -= cube.nbytes
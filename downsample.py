@@ -0,0 +1,59 @@
+"""Downsampling of chart series with Largest-Triangle-Three-Buckets (LTTB).
+
+A daily message series of a chat spanning years has thousands of points,
+more than a chart a few hundred pixels wide can show. LTTB keeps the first
+and last point and, from each of ``threshold - 2`` equal buckets in
+between, the one point that forms the largest triangle with the point kept
+from the previous bucket and the average of the next bucket. Spikes and
+dips survive, so the chart keeps its shape, and every kept point is a real
+day with its real count.
+"""
+from datetime import date
+
+
+def lttb(xs, ys, threshold):
+    """Indices of at most ``threshold`` points of (xs, ys) that LTTB keeps.
+
+    xs must be increasing. Series that already fit are returned whole; a
+    threshold below 3 is taken as 3 (the first, last and one point between).
+    """
+    n = len(xs)
+    threshold = max(threshold, 3)
+    if threshold >= n:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # The next bucket's average; after the last bucket that is the last point
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            # Twice the triangle's area; the factor doesn't change which is largest
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def downsample_days(per_day, threshold):
+    """Downsample a {ISO date: count} series to at most ``threshold`` points.
+
+    Returns (dates, counts) in date order.
+    """
+    dates = sorted(per_day)
+    counts = [per_day[day] for day in dates]
+    if len(dates) <= threshold:
+        return dates, counts
+    xs = [date.fromisoformat(day).toordinal() for day in dates]
+    kept = lttb(xs, counts, threshold)
+    return [dates[i] for i in kept], [counts[i] for i in kept]
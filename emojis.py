@@ -0,0 +1,99 @@
+"""Emoji matching and counting.
+
+Counting code points above U+03E8 (the old heuristic) counts Cyrillic, CJK
+and other scripts as emoji and counts a single family, flag or
+skin-toned emoji as several. EMOJI_RE instead matches whole emoji
+sequences, each of which is counted as one emoji:
+
+* ZWJ sequences (👨‍👩‍👧, 🏳️‍🌈, ❤️‍🔥), each element optionally with U+FE0F
+  and a skin-tone modifier (👍🏽)
+* regional-indicator pairs (flags, 🇮🇳) and tag sequences (🏴 subdivision flags)
+* keycaps (1️⃣, #️⃣)
+* symbols that default to text presentation (©, ™, ↔, ▶, ...) only when
+  followed by the emoji variation selector U+FE0F
+
+Only the standard library ``re`` is used; the character classes follow the
+Unicode Extended_Pictographic property for the blocks chats actually use.
+"""
+import re
+from collections import Counter
+
+# Pictographs that are emoji without a variation selector
+_PICTOGRAPHIC = (
+    # watch, hourglass, keyboard, media controls, alarm clock
+    '⌚⌛⌨⏏⏩-⏳⏸-⏺'
+    # miscellaneous symbols and dingbats (sun, umbrella, heart, check mark, sparkles, ...)
+    '☀-★☇-☒☔-⚅⚐-✅✈-✒✔✖'
+    '✝✡✨✳✴❄❇❌❎❓-❕❗'
+    '❣-❧➕-➗➡➰➿'
+    # arrows, squares, star, circle, wavy dash, ideographs
+    '⬅-⬇⬛⬜⭐⭕〰〽㊗㊙'
+    # supplementary planes: everything pictographic except regional indicators
+    '\U0001f000-\U0001f0ff\U0001f10d-\U0001f10f\U0001f12f\U0001f16c-\U0001f171'
+    '\U0001f17e\U0001f17f\U0001f18e\U0001f191-\U0001f19a\U0001f1ad-\U0001f1e5'
+    '\U0001f201-\U0001f20f\U0001f21a\U0001f22f\U0001f232-\U0001f23a\U0001f23c-\U0001f23f'
+    '\U0001f249-\U0001f53d\U0001f546-\U0001f64f'
+    '\U0001f680-\U0001f6ff\U0001f774-\U0001f77f\U0001f7d5-\U0001f7ff'
+    '\U0001f80c-\U0001f80f\U0001f848-\U0001f84f\U0001f85a-\U0001f85f\U0001f888-\U0001f88f'
+    '\U0001f8ae-\U0001f8ff\U0001f90c-\U0001f93a\U0001f93c-\U0001f945\U0001f947-\U0001faff'
+    '\U0001fc00-\U0001fffd'
+)
+
+# Symbols shown as text unless followed by U+FE0F: (c), (r), !!, ?!, TM, info,
+# arrows, circled M, small squares and triangles
+_TEXT_DEFAULT = (
+    '©®‼⁉™ℹ↔-↙↩↪Ⓜ'
+    '▪▫▶◀◻-◾⤴⤵'
+)
+
+_VS16 = '\ufe0f'  # emoji presentation selector
+_ZWJ = '\u200d'  # zero-width joiner
+_KEYCAP = '\u20e3'
+_SKIN_TONE = '[\U0001f3fb-\U0001f3ff]'
+
+_ELEMENT = f'(?:[{_PICTOGRAPHIC}]|[{_TEXT_DEFAULT}](?={_VS16})){_VS16}?{_SKIN_TONE}?'
+
+EMOJI_RE = re.compile(
+    # Leading lookahead on a coarse superset of the possible first characters
+    # (few ranges, so cheap to test): the regex engine skips ordinary text,
+    # Cyrillic and CJK included, with a fast character-set scan
+    '(?=[0-9#*\xa9\xae\u203c\u2049\u2122-\u2bff\u3030\u303d\u3297\u3299\U0001f000-\U0001fffd])(?:'
+    # subdivision flag: black flag, tag characters, cancel tag
+    '\U0001f3f4[\U000e0020-\U000e007e]+\U000e007f'
+    # keycap: digit, # or *, optional selector, combining enclosing keycap
+    f'|[0-9#*]{_VS16}?{_KEYCAP}'
+    # country flag: a pair of regional indicators
+    '|[\U0001f1e6-\U0001f1ff]{2}'
+    # pictograph with optional selector and skin tone, joined into ZWJ sequences
+    f'|{_ELEMENT}(?:{_ZWJ}{_ELEMENT})*'
+    ')'
+)
+
+
+def normalize(emoji):
+    """Canonical key for an emoji sequence: variation selectors removed (kept on keycaps)"""
+    if emoji.endswith(_KEYCAP):
+        return emoji[0] + _VS16 + _KEYCAP
+    return emoji.replace(_VS16, '')
+
+
+def find_emojis(text):
+    """All emoji sequences in text, in order (as written, not normalized)"""
+    if text.isascii():
+        # Every emoji sequence, keycaps included, has a non-ASCII code point
+        return []
+    return EMOJI_RE.findall(text)
+
+
+def count_emojis(text):
+    """Number of emoji sequences in text"""
+    return len(find_emojis(text))
+
+
+def emoji_counter(texts):
+    """Counter of normalized emoji over an iterable of texts"""
+    counts = Counter()
+    for text in texts:
+        if not text.isascii():
+            counts.update(map(normalize, EMOJI_RE.findall(text)))
+    return counts
@@ -0,0 +1,167 @@
+"""Incremental analysis of growing exports.
+
+Re-exporting a long-running chat produces the previous export plus a tail
+of new messages. analyze_incremental() keeps the aggregated ChatStats in a
+state file together with a fingerprint of the bytes already processed and
+the time of the last message. When a new export comes in, it finds where
+the old content ends, parses only the new tail and merges the delta into
+the stored stats, so the cost is proportional to the new messages.
+
+The overlap point is found in two steps:
+
+1. fast path: the new file still starts with the same head bytes, and the
+   anchor (the last ANCHOR_BYTES of the old export) is found at the old
+   end offset;
+2. otherwise the new file is scanned (no parsing) for the anchor, and
+   analysis resumes right after it.
+
+If neither works, the export is analyzed from scratch.
+"""
+import hashlib
+import json
+import os
+import struct
+from itertools import islice
+
+from main import (
+    LineFormat, SNIFF_LINES, aggregate, detect_format, iter_lines, iter_messages_mmap, summarize_stats,
+)
+from stats import ChatStats
+
+STATE_VERSION = 1
+HEAD_BYTES = 64 * 1024
+ANCHOR_BYTES = 4096
+SCAN_BLOCK = 1024 * 1024
+
+
+def _read_range(f, start, length):
+    f.seek(start)
+    return f.read(length)
+
+
+def _fingerprint(filepath):
+    """Head hash, size and anchor bytes of a file as processed so far"""
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        head = hashlib.sha256(_read_range(f, 0, HEAD_BYTES)).hexdigest()
+        anchor = _read_range(f, max(0, size - ANCHOR_BYTES), ANCHOR_BYTES)
+    return {'offset': size, 'head_sha256': head, 'anchor': anchor}
+
+
+def _find_anchor(filepath, anchor):
+    """Byte offset just after the first occurrence of anchor in the file, or None"""
+    if not anchor:
+        return None
+    overlap = len(anchor) - 1
+    pos = 0
+    carry = b''
+    with open(filepath, 'rb') as f:
+        while True:
+            block = f.read(SCAN_BLOCK)
+            if not block:
+                return None
+            data = carry + block
+            found = data.find(anchor)
+            if found != -1:
+                return pos - len(carry) + found + len(anchor)
+            pos += len(block)
+            carry = data[-overlap:] if overlap else b''
+
+
+def find_resume_offset(filepath, state):
+    """Where new content starts in filepath, and how it was found.
+
+    Returns (offset, mode) with mode 'append' (fast path), 'anchor'
+    (found by scanning) or 'full' (no overlap found, offset 0).
+    """
+    size = os.path.getsize(filepath)
+    offset = state['offset']
+    anchor = state['anchor']
+    if size >= offset:
+        with open(filepath, 'rb') as f:
+            head = hashlib.sha256(_read_range(f, 0, min(offset, HEAD_BYTES))).hexdigest()
+            window = _read_range(f, offset - len(anchor), len(anchor))
+        if window == anchor and head == state['head_sha256']:
+            return offset, 'append'
+    found = _find_anchor(filepath, anchor)
+    if found is not None:
+        return found, 'anchor'
+    return 0, 'full'
+
+
+def load_state(state_path):
+    """Read a state file written by save_state(), or None if missing/invalid"""
+    try:
+        with open(state_path, 'rb') as f:
+            (meta_len,) = struct.unpack('<I', f.read(4))
+            meta = json.loads(f.read(meta_len).decode('utf-8'))
+            if meta.get('version') != STATE_VERSION:
+                return None
+            meta['stats'] = ChatStats.from_bytes(f.read())
+    except (OSError, ValueError, struct.error):
+        return None
+    meta['anchor'] = bytes.fromhex(meta['anchor'])
+    meta['format'] = LineFormat(*meta['format']) if meta['format'] else None
+    return meta
+
+
+def save_state(state_path, state):
+    meta = {
+        'version': STATE_VERSION,
+        'offset': state['offset'],
+        'head_sha256': state['head_sha256'],
+        'anchor': state['anchor'].hex(),
+        'format': list(state['format']) if state['format'] else None,
+        'last_timestamp': state['last_timestamp'],
+    }
+    encoded = json.dumps(meta).encode('utf-8')
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack('<I', len(encoded)))
+        f.write(encoded)
+        f.write(state['stats'].to_bytes())
+    os.replace(tmp_path, state_path)
+
+
+def analyze_incremental(filepath, state_path, top_n=20, backend='python'):
+    """Analyze filepath, reusing the aggregate stored in state_path if possible.
+
+    Returns (summary, info) where info describes what was done: ``mode``
+    ('full', 'append', 'anchor' or 'unchanged'), ``resume_offset`` and
+    ``new_messages``.
+    """
+    state = load_state(state_path)
+    offset, mode = (0, 'full') if state is None else find_resume_offset(filepath, state)
+
+    unparsed_lines = []
+    last_dt = [state['last_timestamp'] if state else None]
+
+    def track_last(messages):
+        for message in messages:
+            if message[0]:
+                last_dt[0] = message[0].isoformat()
+            yield message
+
+    if mode == 'full':
+        lines = iter_lines(filepath)
+        fmt = detect_format(list(islice(lines, SNIFF_LINES)))
+        lines.close()
+        stats = ChatStats()
+    else:
+        fmt = state['format']
+        stats = state['stats']
+    size = os.path.getsize(filepath)
+    new_messages = 0
+    if offset < size:
+        messages = track_last(iter_messages_mmap(filepath, fmt, unparsed_lines, offset))
+        delta = aggregate(messages, backend)
+        new_messages = delta.total
+        stats.merge(delta)
+    elif mode != 'full':
+        mode = 'unchanged'
+
+    fingerprint = _fingerprint(filepath)
+    save_state(state_path, dict(fingerprint, stats=stats, format=fmt, last_timestamp=last_dt[0]))
+    info = {'mode': mode, 'resume_offset': offset, 'new_messages': new_messages, 'last_timestamp': last_dt[0]}
+    return summarize_stats(stats, top_n, unparsed_lines), info
+
@@ -0,0 +1,158 @@
+"""Background job queue for chat analyses.
+
+Uploads submitted through /jobs are analyzed on a bounded pool of worker
+threads instead of inside the request handler. Each job gets an id that
+clients poll for its status and result. The number of waiting jobs is
+capped; when the queue is full, submit() raises QueueFull so the app can
+answer 503 instead of piling up work.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    """Raised when the job queue already holds max_queued waiting jobs"""
+
+
+class Job:
+    """One submitted analysis and its outcome"""
+
+    __slots__ = ('id', 'status', 'submitted_at', 'started_at', 'finished_at', 'result', 'error')
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def duration(self):
+        """Seconds spent running (so far, if still running)"""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'duration': round(self.duration, 3) if self.duration is not None else None,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """Bounded worker pool with job status tracking and duration metrics"""
+
+    def __init__(self, workers=2, max_queued=16, retention_seconds=3600, error_formatter=str):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.error_formatter = error_formatter
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        # Recent run and wait times (seconds) for the metrics summary
+        self._run_times = deque(maxlen=1000)
+        self._wait_times = deque(maxlen=1000)
+
+    def submit(self, func, *args):
+        """Queue func(*args) and return its Job, or raise QueueFull"""
+        with self._lock:
+            self._expire()
+            if self._queued >= self.max_queued:
+                self._rejected += 1
+                raise QueueFull(f'{self._queued} jobs already waiting')
+            job = Job(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+            self._queued += 1
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def _run(self, job, func, args):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            job.result = func(*args)
+            job.status = DONE
+        except Exception as e:
+            job.error = self.error_formatter(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                if job.status == DONE:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                self._run_times.append(job.finished_at - job.started_at)
+                self._wait_times.append(job.started_at - job.submitted_at)
+
+    def _expire(self):
+        """Forget finished jobs older than retention_seconds (caller holds the lock)"""
+        cutoff = time.time() - self.retention_seconds
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return the Job with this id, or None if unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def metrics(self):
+        """Queue depth, concurrency and job-duration statistics"""
+        with self._lock:
+            run_times = sorted(self._run_times)
+            wait_times = sorted(self._wait_times)
+            return {
+                'workers': self.workers,
+                'max_queued': self.max_queued,
+                'queued': self._queued,
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'run_seconds': _describe(run_times),
+                'wait_seconds': _describe(wait_times),
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def _describe(sorted_values):
+    if not sorted_values:
+        return {'count': 0}
+    n = len(sorted_values)
+    return {
+        'count': n,
+        'mean': round(sum(sorted_values) / n, 3),
+        'p50': round(sorted_values[n // 2], 3),
+        'p95': round(sorted_values[min(n - 1, int(n * 0.95))], 3),
+        'max': round(sorted_values[-1], 3),
+    }
@@ -0,0 +1,138 @@
+"""Constant-memory, mergeable message-length statistics.
+
+LengthStats keeps exact integer power sums (count, sum, sum of squares),
+so mean and variance are exact and merging is plain addition, plus a
+fixed-size log-linear histogram for percentiles:
+
+* lengths below EXACT_LIMIT (128) get one bucket each, so the median and
+  percentiles of ordinary chat messages are exact;
+* longer lengths share 32 buckets per power of two, so a reported
+  percentile is within about 3% of the true value.
+
+The histogram has at most N_BUCKETS counters however many messages are
+added, and two histograms merge by adding counts bucket by bucket.
+"""
+import math
+import sys
+from array import array
+
+EXACT_LIMIT = 128
+SUB_BITS = 5
+SUB_BUCKETS = 1 << SUB_BITS
+_EXACT_BITS = EXACT_LIMIT.bit_length() - 1  # 7
+MAX_BITS = 24  # lengths of 2**24 characters and more share the last bucket
+N_BUCKETS = EXACT_LIMIT + (MAX_BITS - _EXACT_BITS) * SUB_BUCKETS
+
+
+def bucket_index(length):
+    """Histogram bucket for a length"""
+    if length < EXACT_LIMIT:
+        return length
+    k = length.bit_length() - 1
+    if k >= MAX_BITS:
+        return N_BUCKETS - 1
+    return EXACT_LIMIT + (k - _EXACT_BITS) * SUB_BUCKETS + ((length >> (k - SUB_BITS)) & (SUB_BUCKETS - 1))
+
+
+def bucket_bounds(index):
+    """Smallest and largest length that fall into bucket index"""
+    if index < EXACT_LIMIT:
+        return index, index
+    k, sub = divmod(index - EXACT_LIMIT, SUB_BUCKETS)
+    k += _EXACT_BITS
+    width = 1 << (k - SUB_BITS)
+    low = (1 << k) + sub * width
+    return low, low + width - 1
+
+
+class LengthStats:
+    """Running count/mean/variance/min/max and percentile histogram of lengths"""
+
+    __slots__ = ('count', 'total', 'total_sq', 'min', 'max', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.min = sys.maxsize  # only meaningful once count > 0
+        self.max = 0
+        self.histogram = array('q', bytes(8 * N_BUCKETS))
+
+    def add(self, length):
+        self.count += 1
+        self.total += length
+        self.total_sq += length * length
+        if length < self.min:
+            self.min = length
+        if length > self.max:
+            self.max = length
+        self.histogram[length if length < EXACT_LIMIT else bucket_index(length)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        histogram = self.histogram
+        for i, n in enumerate(other.histogram):
+            if n:
+                histogram[i] += n
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stdev(self):
+        """Population standard deviation"""
+        if not self.count:
+            return 0.0
+        # Exact integer arithmetic up to the final division
+        return math.sqrt((self.count * self.total_sq - self.total * self.total) / self.count ** 2)
+
+    def percentile(self, q):
+        """Nearest-rank q-th percentile (0 < q <= 100)"""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for index, n in enumerate(self.histogram):
+            seen += n
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                if low == high:
+                    return low
+                # Middle of the bucket, clamped to what was actually observed
+                return min(max((low + high) // 2, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': round(self.mean, 1),
+            'stdev': round(self.stdev, 1),
+            'min': self.min if self.count else 0,
+            'median': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+    # -- serialization helpers for ChatStats.to_bytes() ------------------
+
+    def to_state(self):
+        """(header ints, sums, sparse histogram); sums are decimal strings as they can exceed 64 bits"""
+        used = [i for i, n in enumerate(self.histogram) if n]
+        return ([self.count, self.min, self.max], [str(self.total), str(self.total_sq)],
+                used, [self.histogram[i] for i in used])
+
+    @classmethod
+    def from_state(cls, header, sums, used, counts):
+        stats = cls()
+        stats.count, stats.min, stats.max = header
+        stats.total, stats.total_sq = int(sums[0]), int(sums[1])
+        for i, n in zip(used, counts):
+            stats.histogram[i] = n
+        return stats
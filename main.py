@@ -1,41 +1,23 @@
 # WhatsApp Chat Analyzer - main.py
 import re
 import argparse
-from collections import Counter, defaultdict
+from collections import Counter, namedtuple
 from datetime import datetime, timedelta
 import csv
+import io
+import mmap
 import os
-try:
-    from dateutil import parser as dtparser
-except Exception:
-    dtparser = None
-
-# OCR support for image processing
-try:
-    from PIL import Image
-    import pytesseract
-    import os
-    
-    # Try to auto-detect Tesseract on Windows if not in PATH
-    if os.name == 'nt':  # Windows
-        tesseract_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            r'C:\Tesseract-OCR\tesseract.exe',
-        ]
-        for path in tesseract_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                break
-    
-    # Test if Tesseract is available
-    try:
-        pytesseract.get_tesseract_version()
-        OCR_AVAILABLE = True
-    except Exception:
-        OCR_AVAILABLE = False
-except Exception:
-    OCR_AVAILABLE = False
+from itertools import chain, islice, repeat
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from conversation import REPLY_BUCKET_NAMES
+from stats import ChatStats, WEEKDAY_NAMES
+from message_store import StoreWriter, open_store, stats_from_store, file_fingerprint
+from timestamps import ascii_digits, to_datetime, parse_date_dayfirst, parse_date_monthfirst, parse_time
+from profiling import NULL_PROFILE, Profile
+
+from ocr import OCR_AVAILABLE, OcrCache, ocr_images, stitch_texts
+from zip_export import is_zip_export, iter_zip_lines, media_sizes, track_attachments
 
 # Multiple regex patterns for different WhatsApp formats
 TIMESTAMP_PATTERNS = [
@@ -53,6 +35,25 @@ TIMESTAMP_PATTERNS = [
     re.compile(r'^(?P<date>\d{1,2}\.\d{1,2}\.\d{2,4}),?\s+(?P<time>\d{1,2}:\d{2}(?::\d{2})?)\s*[-\u2013\u2014]\s+(?P<rest>.*)$'),
 ]
 
+def split_author(rest):
+    """Split the text after the timestamp into (author, message)"""
+    # Look for ": " but handle cases where colon might be in message
+    # WhatsApp format is typically "Name: Message" or system messages without author
+    # System messages usually don't have ": " separator
+    if ': ' in rest:
+        parts = rest.split(': ', 1)
+        author = parts[0].strip()
+        message = parts[1].strip() if len(parts) > 1 else ""
+        # If author looks like a system message (very long or contains special patterns), treat as no author
+        if len(author) > 100 or author.startswith('Messages and calls') or author.startswith('You '):
+            author = None
+            message = rest
+    else:
+        # No author found, might be system message
+        author = None
+        message = rest
+    return author, message
+
 def parse_line(line):
     """Attempts to parse a line and return (datetime, author, message) or None"""
     # Try each pattern
@@ -67,96 +68,138 @@ def parse_line(line):
             if not rest:
                 continue
                 
-            # Split author and message
-            # Look for ": " but handle cases where colon might be in message
-            # WhatsApp format is typically "Name: Message" or system messages without author
-            # System messages usually don't have ": " separator
-            if ': ' in rest:
-                parts = rest.split(': ', 1)
-                author = parts[0].strip()
-                message = parts[1].strip() if len(parts) > 1 else ""
-                # If author looks like a system message (very long or contains special patterns), treat as no author
-                if len(author) > 100 or author.startswith('Messages and calls') or author.startswith('You '):
-                    author = None
-                    message = rest
-            else:
-                # No author found, might be system message
-                author = None
-                message = rest
-            
-            # Parse datetime with multiple format attempts
-            dt = None
+            author, message = split_author(rest)
             
-            # Clean up time (remove AM/PM if present for parsing)
-            time_upper = time.upper()
-            time_clean = re.sub(r'\s*(AM|PM)\s*', '', time, flags=re.IGNORECASE).strip()
-            is_pm = 'PM' in time_upper
-            is_am = 'AM' in time_upper
-            
-            if dtparser:
-                try:
-                    # Try parsing with dayfirst (dd/mm/yyyy format)
-                    dt = dtparser.parse(f"{date} {time_clean}", dayfirst=True)
-                    # Convert to 24-hour format if needed
-                    if is_pm and dt.hour < 12:
-                        dt = dt.replace(hour=dt.hour + 12)
-                    elif is_am and dt.hour == 12:
-                        dt = dt.replace(hour=0)
-                except Exception:
-                    try:
-                        # Try without dayfirst (mm/dd/yyyy format)
-                        dt = dtparser.parse(f"{date} {time_clean}")
-                        if is_pm and dt.hour < 12:
-                            dt = dt.replace(hour=dt.hour + 12)
-                        elif is_am and dt.hour == 12:
-                            dt = dt.replace(hour=0)
-                    except Exception:
-                        dt = None
-            else:
-                # Best-effort parse with multiple formats
-                date_formats = [
-                    ("%d/%m/%Y", "%H:%M"),
-                    ("%d/%m/%y", "%H:%M"),
-                    ("%d-%m-%Y", "%H:%M"),
-                    ("%d-%m-%y", "%H:%M"),
-                    ("%m/%d/%Y", "%H:%M"),
-                    ("%m/%d/%y", "%H:%M"),
-                    ("%Y-%m-%d", "%H:%M"),
-                    ("%d.%m.%Y", "%H:%M"),
-                    ("%d.%m.%y", "%H:%M"),
-                ]
-                
-                for date_fmt, time_fmt in date_formats:
-                    try:
-                        time_part = time_clean
-                        if ':' in time_part:
-                            if time_part.count(':') == 1:
-                                dt = datetime.strptime(f"{date} {time_part}", f"{date_fmt} {time_fmt}")
-                            else:
-                                # Has seconds
-                                dt = datetime.strptime(f"{date} {time_part}", f"{date_fmt} %H:%M:%S")
-                        
-                        if dt:
-                            # Convert to 24-hour format if needed
-                            if is_pm and dt.hour < 12:
-                                dt = dt.replace(hour=dt.hour + 12)
-                            elif is_am and dt.hour == 12:
-                                dt = dt.replace(hour=0)
-                            break
-                    except Exception:
-                        continue
+            # Day-first unless the date only makes sense month-first
+            dt = to_datetime(date, time)
             
             return dt, author, message
     
     return None
 
-def extract_text_from_image(image_path):
-    """Extract text from image using OCR"""
-    if not OCR_AVAILABLE:
-        raise Exception("OCR libraries not available. Please install: pip install Pillow pytesseract. Also install Tesseract OCR from https://github.com/tesseract-ocr/tesseract")
+def matching_pattern(line):
+    """Index of the TIMESTAMP_PATTERNS entry parse_line() uses for line, or None"""
+    for index, pattern in enumerate(TIMESTAMP_PATTERNS):
+        m = pattern.match(line)
+        if m and m.group('rest').strip():
+            return index
+    return None
+
+def profile_parser(parse, profile):
+    """Wrap a line parser to record parse time, line counts and pattern hits"""
+    counters = profile.counters
+    add = profile.add
+
+    def parse_profiled(line):
+        start = perf_counter()
+        parsed = parse(line)
+        add('parse', perf_counter() - start)
+        counters['lines'] += 1
+        if parsed is None:
+            counters['lines_without_timestamp'] += 1
+        else:
+            counters[f'pattern_{matching_pattern(line)}'] += 1
+        return parsed
+
+    return parse_profiled
+
+# Number of lines sampled from the head of a file to detect its timestamp layout
+SNIFF_LINES = 200
+
+# Patterns that an earlier entry in TIMESTAMP_PATTERNS can also match, so a
+# specialised parser must defer to parse_line when one of those matches first
+_SHADOWED_PATTERNS = {3, 4}
+
+_DATE_SEP = re.compile(r'[\/\-.]')
+
+# Detected per-file timestamp layout (picklable, so it can be shipped to workers)
+LineFormat = namedtuple('LineFormat', ['pattern_index', 'dayfirst', 'twelve_hour', 'seconds'])
+
+def detect_format(lines):
+    """Sniff the timestamp layout of an export from a sample of its lines.
+
+    Picks the TIMESTAMP_PATTERNS entry that matches most sample lines and
+    works out whether dates are dd/mm or mm/dd, whether times are 12h and
+    whether they carry seconds. Returns a LineFormat, or None when no line
+    in the sample looks like a message.
+    """
+    pattern_hits = Counter()
+    samples = []
+    for raw in lines:
+        line = raw.rstrip()
+        if not line.strip():
+            continue
+        for index, pattern in enumerate(TIMESTAMP_PATTERNS):
+            m = pattern.match(line)
+            if m and m.group('rest').strip():
+                pattern_hits[index] += 1
+                samples.append((index, m.group('date'), m.group('time').strip()))
+                break
+    if not pattern_hits:
+        return None
+
+    pattern_index = pattern_hits.most_common(1)[0][0]
+    dates = []
+    times = []
+    for index, date, time in samples:
+        date = ascii_digits(date)
+        if index == pattern_index and date.isascii():
+            dates.append([int(part) for part in _DATE_SEP.split(date)])
+            times.append(time.upper())
+
+    # Default to day-first like parse_line, unless the sample proves otherwise
+    dayfirst = True
+    if not any(first > 12 for first, _, _ in dates) and any(second > 12 for _, second, _ in dates):
+        dayfirst = False
+    twelve_hour = any(t.endswith(('AM', 'PM')) for t in times)
+    seconds = any(t.count(':') == 2 for t in times)
+    return LineFormat(pattern_index, dayfirst, twelve_hour, seconds)
+
+def compile_line_parser(fmt):
+    """Return a parse_line replacement specialised for a detected LineFormat.
+
+    Only the detected pattern is tried and timestamps are built for the known
+    layout by the cached timestamp engine. Lines the specialised parser
+    can't handle fall back to the generic parse_line, so the result is never
+    worse than parse_line. The one deliberate difference: in a file detected
+    as month-first, ambiguous dates such as 01/02/2025 are read month-first
+    (2 January), where parse_line reads every date day-first.
+    """
+    if fmt is None:
+        return parse_line
+    match = TIMESTAMP_PATTERNS[fmt.pattern_index].match
+    shadowing = TIMESTAMP_PATTERNS[:fmt.pattern_index] if fmt.pattern_index in _SHADOWED_PATTERNS else ()
+    parse_date = parse_date_dayfirst if fmt.dayfirst else parse_date_monthfirst
+
+    def parse(line):
+        # Every pattern starts with a digit or '[', anything else is a continuation line
+        if not line or not (line[0].isdigit() or line[0] == '['):
+            return None
+        m = match(line)
+        if m is None or any(p.match(line) for p in shadowing):
+            return parse_line(line)
+        rest = m.group('rest').strip()
+        if not rest:
+            return parse_line(line)
+        day = parse_date(m.group('date'))
+        clock = parse_time(m.group('time').strip()) if day is not None else None
+        if clock is None:
+            return parse_line(line)
+        dt = datetime(day.year, day.month, day.day, *clock)
+        author, message = split_author(rest)
+        return dt, author, message
+
+    return parse
+
+def extract_text_from_images(image_paths, workers=1, ocr_cache_dir=None):
+    """Extract chat text from screenshots using OCR, stitched in order (see ocr.py).
+
+    ``workers`` > 1 OCRs the images in a process pool; with ``ocr_cache_dir``
+    the text of each image is cached by content hash.
+    """
     try:
-        image = Image.open(image_path)
-        text = pytesseract.image_to_string(image)
+        cache = OcrCache(ocr_cache_dir) if ocr_cache_dir else None
+        text = stitch_texts(ocr_images(image_paths, workers=workers, cache=cache))
         if not text or len(text.strip()) < 10:
             raise Exception("Could not extract sufficient text from image. Please ensure the image is clear and contains readable WhatsApp chat text.")
         return text
@@ -169,151 +212,492 @@ def extract_text_from_image(image_path):
         else:
             raise Exception(f"Failed to process image: {str(e)}")
 
-def analyze(filepath, top_n=20, is_image=False):
-    total = 0
-    per_user = Counter()
-    per_day = Counter()
-    per_hour = Counter()
-    per_weekday = Counter()
-    word_counts = Counter()
-    media_count = 0
-    emoji_count = 0
-    link_count = 0
-    question_count = 0
-    longest_message = ""
-    longest_message_length = 0
-    message_lengths = []
-    first_date = None
-    last_date = None
-    active_periods = defaultdict(int)  # Morning, Afternoon, Evening, Night
-
-    # Extended stopwords list
-    stopwords = set(["the","and","to","a","of","in","is","it","you","i","for","on","that","this","with","are","was","as","but","be","have","has","not","we","they","what","when","where","who","why","how","can","will","would","should","could","may","might","must","shall"])
-
-    # Process file or image
+def extract_text_from_image(image_path):
+    """Extract text from image using OCR"""
+    return extract_text_from_images([image_path])
+
+def iter_lines(filepath, is_image=False, workers=1, ocr_cache_dir=None):
+    """Yield raw lines from a chat export (or OCR'd images) one at a time.
+
+    For images ``filepath`` is one image path or a list of screenshot paths
+    in chat order (see extract_text_from_images()). A .zip export is read
+    without extracting it (see zip_export). ``filepath`` may also be a
+    binary file object, such as an upload being received, which is decoded
+    as it is read.
+    """
     if is_image:
+        image_paths = [filepath] if isinstance(filepath, (str, os.PathLike)) else list(filepath)
         try:
-            text = extract_text_from_image(filepath)
-            lines = text.split('\n')
+            text = extract_text_from_images(image_paths, workers, ocr_cache_dir)
         except Exception as e:
             raise Exception(f"Failed to process image: {str(e)}")
-    else:
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
+        # OCR output is a few screenfuls of text, no need to stream it
+        yield from text.split('\n')
+        return
+    if is_zip_export(filepath):
+        yield from iter_zip_lines(filepath)
+        return
+    if hasattr(filepath, 'read'):
+        yield from io.TextIOWrapper(filepath, encoding='utf-8', errors='ignore')
+        return
+    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+        yield from f
 
-    # Track current message for multi-line messages
+def iter_messages(lines, unparsed_lines=None, max_unparsed=5, parse=parse_line):
+    """Assemble raw lines into complete (datetime, author, message) tuples.
+
+    Lines without a timestamp are joined onto the message before them, so
+    multi-line messages come out whole. Only the current message is held in
+    memory. The first ``max_unparsed`` orphan lines are collected into
+    ``unparsed_lines`` (if given) for error reporting. ``parse`` is the
+    line parser to use, e.g. one built by compile_line_parser().
+    """
     current_message_parts = []
     current_author = None
     current_dt = None
-    unparsed_lines = []
-    
-    def process_message(dt, author, message):
-        """Process a complete message"""
-        nonlocal total, per_user, per_day, per_hour, per_weekday
-        nonlocal word_counts, media_count, emoji_count, link_count, question_count
-        nonlocal longest_message, longest_message_length, message_lengths
-        nonlocal first_date, last_date, active_periods
-        
-        total += 1
-        if author:
-            per_user[author] += 1
-        if dt:
-            date_str = dt.date().isoformat()
-            per_day[date_str] += 1
-            per_hour[dt.hour] += 1
-            per_weekday[dt.strftime('%A')] += 1
-            
-            # Track date range
-            if first_date is None or dt.date() < first_date:
-                first_date = dt.date()
-            if last_date is None or dt.date() > last_date:
-                last_date = dt.date()
-            
-            # Categorize by time of day
-            hour = dt.hour
-            if 5 <= hour < 12:
-                active_periods['Morning'] += 1
-            elif 12 <= hour < 17:
-                active_periods['Afternoon'] += 1
-            elif 17 <= hour < 22:
-                active_periods['Evening'] += 1
-            else:
-                active_periods['Night'] += 1
-        
-        msg_lower = message.lower()
-        msg_length = len(message)
-        message_lengths.append(msg_length)
-        
-        # Track longest message
-        if msg_length > longest_message_length:
-            longest_message_length = msg_length
-            longest_message = message[:100] + "..." if len(message) > 100 else message
-        
-        # Media detection
-        if '<media omitted>' in msg_lower or 'media omitted' in msg_lower or '<image omitted>' in msg_lower or 'image omitted' in msg_lower:
-            media_count += 1
-        
-        # Link detection
-        if 'http://' in msg_lower or 'https://' in msg_lower or 'www.' in msg_lower:
-            link_count += 1
-        
-        # Question detection
-        if '?' in message:
-            question_count += 1
-        
-        # Emoji detection
-        emoji_count += sum(1 for ch in message if ord(ch) > 1000)
-        
-        # Word analysis
-        words = re.findall(r"\b\w+\b", msg_lower)
-        for w in words:
-            if w and w not in stopwords and len(w) > 1:
-                word_counts[w] += 1
-    
+
     for raw in lines:
         line = raw.rstrip()  # Keep right whitespace, remove trailing newline
         if not line.strip():
             # Empty line - finish current message if any
             if current_message_parts:
-                message = ' '.join(current_message_parts)
-                process_message(current_dt, current_author, message)
+                yield current_dt, current_author, ' '.join(current_message_parts)
                 current_message_parts = []
                 current_author = None
                 current_dt = None
             continue
             
-        parsed = parse_line(line)
+        parsed = parse(line)
         if parsed is None:
             # This line doesn't have a timestamp
             # It might be a continuation of the previous message
             if current_message_parts:
                 # Append to current message
                 current_message_parts.append(line.strip())
-                continue
-            else:
+            elif unparsed_lines is not None and len(unparsed_lines) < max_unparsed:
                 # First unparsed line - might be a format we don't recognize
                 unparsed_lines.append(line)
-                continue
+            continue
         
-        # We have a new message line - process previous message first
+        # We have a new message line - emit previous message first
         if current_message_parts:
-            message = ' '.join(current_message_parts)
-            process_message(current_dt, current_author, message)
-            current_message_parts = []
+            yield current_dt, current_author, ' '.join(current_message_parts)
         
         # Start new message
-        dt, author, message = parsed
-        current_dt = dt
-        current_author = author
+        current_dt, current_author, message = parsed
         current_message_parts = [message] if message else []
     
     # Don't forget the last message
     if current_message_parts:
-        message = ' '.join(current_message_parts)
-        process_message(current_dt, current_author, message)
+        yield current_dt, current_author, ' '.join(current_message_parts)
+
+def iter_file_range(filepath, start=0, end=None):
+    """Yield decoded lines from the byte range [start, end) of a text file.
 
+    ``start`` and ``end`` must fall on line starts. Newlines are translated
+    the same way as text-mode reading, so a file read in ranges yields the
+    same lines as iter_lines().
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        for raw in f:
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                remaining -= len(raw)
+            line = raw.decode('utf-8', 'ignore')
+            if '\r' in line:
+                # Universal newlines: a lone \r also ends a line in text mode
+                parts = line.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+                if parts[-1] == '':
+                    parts.pop()
+                for part in parts:
+                    yield part + '\n'
+            else:
+                yield line
+
+def bytes_pattern(pattern):
+    """Bytes version of a TIMESTAMP_PATTERNS entry for matching a whole mmapped file.
+
+    Non-ASCII separators become their UTF-8 byte sequences, and whitespace
+    excludes newlines so a match never runs past the end of its line.
+    """
+    source = pattern.pattern.replace(r'[-\u2013\u2014]', '(?:-|\u2013|\u2014)').replace(r'\s', r'[^\S\n]')
+    return re.compile(source.encode('utf-8'), (pattern.flags & re.IGNORECASE) | re.MULTILINE)
+
+_BYTES_PATTERNS = [bytes_pattern(pattern) for pattern in TIMESTAMP_PATTERNS]
+
+# A carriage return that isn't part of \r\n (an old-style line break)
+_LONE_CR = re.compile(rb'\r(?!\n)')
+
+# Bytes of a mapped file read before their pages are released again. Mapped
+# pages count toward RSS, so without this peak memory would grow with the file.
+RELEASE_EVERY = 2 * 1024 * 1024
+_MADV_DONTNEED = getattr(mmap, 'MADV_DONTNEED', None)
+
+def _release(buf, start, end):
+    """Drop the pages of buf[start:end] from the resident set; returns the new release point.
+
+    The file stays in the page cache and the pages are mapped again if
+    they are read later, so this only bounds RSS. A no-op where madvise
+    isn't available.
+    """
+    start -= start % mmap.PAGESIZE
+    end -= end % mmap.PAGESIZE
+    if _MADV_DONTNEED is not None and end > start:
+        buf.madvise(_MADV_DONTNEED, start, end - start)
+    return end
+
+def _has_lone_cr(buf, start, end):
+    """Whether buf[start:end] has a lone \\r, scanned a window at a time to keep RSS bounded"""
+    for lo in range(start, end, RELEASE_EVERY):
+        hi = min(lo + RELEASE_EVERY, end)
+        # One byte past the window, so a \r\n across its end isn't taken for a lone \r
+        if buf.find(b'\r', lo, hi) >= 0:
+            m = _LONE_CR.search(buf, lo, min(hi + 1, end))
+            if m is not None and m.start() < hi:
+                _release(buf, start, hi)
+                return True
+        _release(buf, lo, hi)
+    return False
+
+def iter_messages_mmap(filepath, fmt, unparsed_lines=None, start=0, end=None, max_unparsed=5):
+    """Bytes-level equivalent of iter_messages(iter_file_range(...), parse=compile_line_parser(fmt)).
+
+    The file is memory-mapped and the detected pattern, compiled for bytes,
+    is run over the buffer to find message lines, so no per-line str is
+    built for them: only the message text is decoded, and date and time
+    fields are converted once per distinct byte string. Lines between
+    matches (continuations, system lines, other layouts) and any match the
+    fast path can't handle go through the regular line parser, so the
+    messages are exactly those of the line-based reader. Falls back to it
+    for layouts with shadowing patterns and for files with lone \r line
+    breaks. Pages already parsed are released every RELEASE_EVERY bytes, so
+    peak RSS doesn't grow with the file.
+    """
+    parse = compile_line_parser(fmt)
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if fmt is None or fmt.pattern_index in _SHADOWED_PATTERNS or _has_lone_cr(buf, start, end):
+                yield from iter_messages(iter_file_range(filepath, start, end), unparsed_lines, max_unparsed, parse)
+                return
+            regex = _BYTES_PATTERNS[fmt.pattern_index]
+            parse_date = parse_date_dayfirst if fmt.dayfirst else parse_date_monthfirst
+            dates, clocks = {}, {}
+            current_dt = current_author = None
+            current_message_parts = []
+
+            def feed(line):
+                """iter_messages() state machine for one decoded line; returns a finished message or None"""
+                nonlocal current_dt, current_author, current_message_parts
+                finished = None
+                if not line.strip():
+                    if current_message_parts:
+                        finished = current_dt, current_author, ' '.join(current_message_parts)
+                        current_message_parts = []
+                        current_author = current_dt = None
+                    return finished
+                parsed = parse(line)
+                if parsed is None:
+                    if current_message_parts:
+                        current_message_parts.append(line.strip())
+                    elif unparsed_lines is not None and len(unparsed_lines) < max_unparsed:
+                        unparsed_lines.append(line)
+                    return None
+                if current_message_parts:
+                    finished = current_dt, current_author, ' '.join(current_message_parts)
+                current_dt, current_author, message = parsed
+                current_message_parts = [message] if message else []
+                return finished
+
+            def feed_region(lo, hi):
+                """Feed the lines of buf[lo:hi] to the line parser, at most about RELEASE_EVERY bytes at a time"""
+                nonlocal released
+                while lo < hi:
+                    cut = hi
+                    if hi - lo > RELEASE_EVERY:
+                        cut = buf.rfind(b'\n', lo, lo + RELEASE_EVERY) + 1
+                        if cut <= lo:
+                            cut = buf.find(b'\n', lo + RELEASE_EVERY, hi) + 1 or hi
+                    region = buf[lo:cut]
+                    lines = region.split(b'\n')
+                    if region.endswith(b'\n'):
+                        lines.pop()
+                    for raw in lines:
+                        finished = feed(raw.decode('utf-8', 'ignore').rstrip())
+                        if finished:
+                            yield finished
+                    lo = cut
+                    if lo - released >= RELEASE_EVERY:
+                        released = _release(buf, released, lo)
+
+            pos = released = start
+            for m in regex.finditer(buf, start, end):
+                line_start = m.start()
+                if line_start - released >= RELEASE_EVERY:
+                    released = _release(buf, released, line_start)
+                if line_start != pos:
+                    yield from feed_region(pos, line_start)
+                pos = m.end() + 1
+                date_bytes, time_bytes, rest_bytes = m.group('date', 'time', 'rest')
+                day = dates.get(date_bytes, False)
+                if day is False:
+                    day = dates[date_bytes] = parse_date(date_bytes.decode('ascii'))
+                clock = clocks.get(time_bytes, False)
+                if clock is False:
+                    clock = clocks[time_bytes] = parse_time(time_bytes.decode('ascii').strip())
+                try:
+                    rest = rest_bytes.decode('utf-8').strip()
+                except UnicodeDecodeError:
+                    # Dropping the bad bytes could join text across them into a
+                    # different match, so the line parser gets the decoded line
+                    rest = None
+                if day is None or clock is None or not rest:
+                    # Let the line parser decide, exactly as for a line read as text
+                    finished = feed(buf[line_start:m.end()].decode('utf-8', 'ignore').rstrip())
+                    if finished:
+                        yield finished
+                    continue
+                if current_message_parts:
+                    parts = current_message_parts
+                    yield current_dt, current_author, parts[0] if len(parts) == 1 else ' '.join(parts)
+                current_dt = datetime(day.year, day.month, day.day, *clock)
+                current_author, message = split_author(rest)
+                current_message_parts = [message] if message else []
+            if pos < end:
+                yield from feed_region(pos, end)
+    if current_message_parts:
+        yield current_dt, current_author, ' '.join(current_message_parts)
+
+def find_chunk_boundaries(filepath, n_chunks, parse=parse_line):
+    """Split a file into up to n_chunks byte ranges that start on message lines.
+
+    Each split point is moved forward to the next line that starts a new
+    message, so multi-line messages are never cut between chunks. Returns
+    a sorted list of offsets beginning with 0 and ending with the file size.
+    """
+    size = os.path.getsize(filepath)
+    boundaries = [0]
+    with open(filepath, 'rb') as f:
+        for i in range(1, n_chunks):
+            target = max(size * i // n_chunks, boundaries[-1] + 1)
+            if target >= size:
+                break
+            # Skip to the start of the first whole line at or after target
+            f.seek(target - 1)
+            f.readline()
+            while True:
+                offset = f.tell()
+                raw = f.readline()
+                if not raw:
+                    offset = size
+                    break
+                line = raw.decode('utf-8', 'ignore').rstrip()
+                if line.strip() and parse(line) is not None:
+                    break
+            if offset >= size:
+                break
+            if offset > boundaries[-1]:
+                boundaries.append(offset)
+    boundaries.append(size)
+    return boundaries
+
+def aggregate(messages, backend='python', word_capacity=None):
+    """Aggregate (datetime, author, message) tuples into a ChatStats with the chosen backend.
+
+    ``word_capacity`` bounds the number of distinct words tracked (approximate
+    top words, see sketch.HeavyHitters); None counts every word exactly.
+    """
+    if backend == 'pandas':
+        from vectorized import collect_stats_vectorized
+        return collect_stats_vectorized(messages, ChatStats(word_capacity))
+    if backend != 'python':
+        raise ValueError(f"Unknown analysis backend: {backend!r} (expected 'python' or 'pandas')")
+    return ChatStats(word_capacity).update(messages)
+
+def _aggregate_profiled(messages, backend, profile, word_capacity=None):
+    """aggregate(), charging its own time (without reading and parsing) to 'aggregate'"""
+    if not profile.detailed:
+        return aggregate(messages, backend, word_capacity)
+    before = profile.seconds('read') + profile.seconds('parse')
+    start = perf_counter()
+    stats = aggregate(messages, backend, word_capacity)
+    elapsed = perf_counter() - start
+    profile.add('aggregate', elapsed - (profile.seconds('read') + profile.seconds('parse') - before))
+    profile.count('messages', stats.total)
+    return stats
+
+def _analyze_chunk(filepath, start, end, fmt, backend='python', detailed=False, word_capacity=None):
+    """Worker entry point: parse and aggregate one byte range of a file"""
+    unparsed_lines = []
+    profile = Profile(detailed=True) if detailed else NULL_PROFILE
+    if detailed:
+        # Line by line, so reading and per-pattern parsing can be timed
+        lines = profile.timed_iter('read', iter_file_range(filepath, start, end))
+        messages = iter_messages(lines, unparsed_lines, parse=profile_parser(compile_line_parser(fmt), profile))
+    else:
+        messages = iter_messages_mmap(filepath, fmt, unparsed_lines, start, end)
+    stats = _aggregate_profiled(messages, backend, profile, word_capacity)
+    return stats, unparsed_lines, profile if detailed else None
+
+def collect_stats(filepath, is_image=False, workers=1, unparsed_lines=None, backend='python',
+                  store_dir=None, store_source=None, profile=NULL_PROFILE, word_capacity=None,
+                  ocr_cache_dir=None):
+    """Parse an export into a ChatStats accumulator.
+
+    With ``workers`` > 1 a text export is split into byte ranges aligned to
+    message starts and parsed by a process pool; the partial results are
+    merged in file order, so the result is identical to a serial run. The
+    first few unparsed lines are appended to ``unparsed_lines`` if given.
+    ``backend`` is 'python' (default) or 'pandas' for the vectorized backend.
+
+    With ``store_dir`` the parsed messages are kept in a message store
+    (see message_store). If a store built from the same source already
+    exists there, it is loaded instead of parsing the export again.
+    ``store_source`` identifies the source, by default the file's path,
+    size and mtime.
+
+    Stage timings go to ``profile`` (see profiling); a detailed profile
+    also splits reading, parsing and aggregation and counts pattern hits.
+    ``word_capacity`` switches top words to the bounded approximate sketch.
+
+    With ``is_image`` ``filepath`` may be a list of screenshots; they are
+    OCR'd by ``workers`` processes, with texts cached in ``ocr_cache_dir``.
+    A .zip export is parsed straight from the archive, adding the sizes of
+    attached media files.
+    """
+    if unparsed_lines is None:
+        unparsed_lines = []
+    archive = not is_image and is_zip_export(filepath)
+    if archive:
+        # The chat is a compressed stream, so there are no byte ranges to
+        # split; and media sizes come from the archive, not from a store
+        workers = 1
+        store_dir = None
+    if store_dir is not None:
+        store_source = store_source or file_fingerprint(filepath)
+        store = open_store(store_dir, store_source)
+        if store is not None:
+            with store, profile.stage('store_load'):
+                return stats_from_store(store, backend, word_capacity)
+        # The store is written by a single sequential pass
+        workers = 1
+    # Sniff the timestamp layout from the head of the file, then stream the
+    # rest through the message assembler so memory stays flat
+    if is_image:
+        with profile.stage('ocr'):
+            lines = iter(list(iter_lines(filepath, is_image, workers, ocr_cache_dir)))
+    else:
+        lines = iter_lines(filepath)
+    with profile.stage('sniff'):
+        head = list(islice(lines, SNIFF_LINES))
+        fmt = detect_format(head)
+    line_parser = compile_line_parser(fmt)
+
+    boundaries = [0]
+    if workers > 1 and not is_image:
+        lines.close()
+        boundaries = find_chunk_boundaries(filepath, workers, parse=line_parser)
+    if len(boundaries) > 2:
+        starts, ends = boundaries[:-1], boundaries[1:]
+        with profile.stage('collect'):
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_analyze_chunk, repeat(filepath), starts, ends, repeat(fmt),
+                                        repeat(backend), repeat(profile.detailed), repeat(word_capacity)))
+            stats = ChatStats(word_capacity)
+            for chunk_stats, _, _ in results:
+                stats.merge(chunk_stats)
+        for _, chunk_unparsed, chunk_profile in results:
+            unparsed_lines.extend(chunk_unparsed[:5 - len(unparsed_lines)])
+            if chunk_profile is not None:
+                profile.merge(chunk_profile)
+    else:
+        if is_image or archive or profile.detailed:
+            if workers > 1 and not is_image:
+                # Too small to split, read it again serially
+                lines = iter_lines(filepath)
+                head = []
+            lines = profile.timed_iter('read', chain(head, lines))
+            if profile.detailed:
+                line_parser = profile_parser(line_parser, profile)
+            messages = iter_messages(lines, unparsed_lines, parse=line_parser)
+        else:
+            # Plain text file: parse the mmapped bytes from the start instead
+            lines.close()
+            messages = iter_messages_mmap(filepath, fmt, unparsed_lines)
+        attachments = []
+        if archive:
+            messages = track_attachments(messages, media_sizes(filepath), attachments)
+        writer = None
+        if store_dir is not None:
+            writer = StoreWriter(store_dir, store_source)
+            messages = writer.capture(messages)
+        try:
+            with profile.stage('collect'):
+                stats = _aggregate_profiled(messages, backend, profile, word_capacity)
+        except Exception:
+            if writer:
+                writer.abort()
+            raise
+        if writer:
+            if stats.total:
+                writer.finish().close()
+            else:
+                writer.abort()
+        for author, nbytes in attachments:
+            stats.add_media_bytes(author, nbytes)
+    return stats
+
+def collect_line_stats(lines, unparsed_lines=None, backend='python', profile=NULL_PROFILE, word_capacity=None,
+                       writer=None):
+    """Parse an iterable of raw lines into a ChatStats accumulator in one pass.
+
+    This is collect_stats() for input that can only be read once, front to
+    back, such as an upload that is still being received. The parsed
+    messages are also recorded by ``writer`` (a message_store.StoreWriter)
+    if given; the caller finishes or aborts it.
+    """
+    lines = iter(lines)
+    with profile.stage('sniff'):
+        head = list(islice(lines, SNIFF_LINES))
+        fmt = detect_format(head)
+    line_parser = compile_line_parser(fmt)
+    if profile.detailed:
+        line_parser = profile_parser(line_parser, profile)
+    messages = iter_messages(profile.timed_iter('read', chain(head, lines)), unparsed_lines, parse=line_parser)
+    if writer is not None:
+        messages = writer.capture(messages)
+    with profile.stage('collect'):
+        return _aggregate_profiled(messages, backend, profile, word_capacity)
+
+def analyze(filepath, top_n=20, is_image=False, workers=1, backend='python', store_dir=None, profile=False,
+            word_capacity=None, ocr_cache_dir=None):
+    """Analyze a WhatsApp export and return the summary dict (see collect_stats).
+
+    With ``profile=True`` the summary gets a ``profile`` entry with per-stage
+    timings, line counts and per-pattern hit counts. With ``word_capacity``
+    top words are approximate (``top_words_error`` bounds each count).
+    """
+    unparsed_lines = []
+    stage_profile = Profile(detailed=True) if profile else NULL_PROFILE
+    stats = collect_stats(filepath, is_image=is_image, workers=workers, unparsed_lines=unparsed_lines,
+                          backend=backend, store_dir=store_dir, profile=stage_profile,
+                          word_capacity=word_capacity, ocr_cache_dir=ocr_cache_dir)
+    with stage_profile.stage('summarize'):
+        summary = summarize_stats(stats, top_n, unparsed_lines)
+    if profile:
+        summary['profile'] = stage_profile.to_dict()
+    return summary
+
+def summarize_stats(stats, top_n=20, unparsed_lines=None):
+    """Turn aggregated ChatStats into the summary dict returned by analyze()"""
     # If no messages were parsed, provide helpful error
-    if total == 0:
+    if stats.total == 0:
         error_lines_sample = '\n'.join(unparsed_lines[:5]) if unparsed_lines else "No lines found"
         raise Exception(
             f"No messages could be parsed from the file. This might be due to:\n"
@@ -325,73 +709,7 @@ def analyze(filepath, top_n=20, is_image=False):
             f"dd/mm/yyyy, hh:mm - Name: Message"
         )
     
-    # Calculate statistics
-    avg_message_length = sum(message_lengths) / len(message_lengths) if message_lengths else 0
-    total_days = (last_date - first_date).days + 1 if first_date and last_date else 1
-    messages_per_day_avg = total / total_days if total_days > 0 else 0
-    
-    # Determine most active user
-    most_active_user = per_user.most_common(1)[0] if per_user else (None, 0)
-    
-    # Calculate user participation percentage
-    user_percentages = {}
-    if total > 0:
-        for user, count in per_user.items():
-            user_percentages[user] = (count / total) * 100
-    
-    # Determine most active time period
-    most_active_period = max(active_periods.items(), key=lambda x: x[1]) if active_periods else (None, 0)
-    
-    # Determine most active day of week
-    most_active_day = max(per_weekday.items(), key=lambda x: x[1]) if per_weekday else (None, 0)
-    
-    # Generate insights
-    insights = []
-    if total > 0:
-        insights.append(f"📊 Analyzed {total:,} messages across {total_days} days")
-        insights.append(f"💬 Average of {messages_per_day_avg:.1f} messages per day")
-        if most_active_user[0]:
-            insights.append(f"🏆 {most_active_user[0]} is the most active with {most_active_user[1]:,} messages ({user_percentages.get(most_active_user[0], 0):.1f}%)")
-        if most_active_period[0]:
-            insights.append(f"⏰ Most active time: {most_active_period[0]} ({most_active_period[1]:,} messages)")
-        if most_active_day[0]:
-            insights.append(f"📅 Most active day: {most_active_day[0]} ({most_active_day[1]:,} messages)")
-        if media_count > 0:
-            insights.append(f"🖼️ {media_count:,} media files shared")
-        if link_count > 0:
-            insights.append(f"🔗 {link_count:,} links shared")
-        if question_count > 0:
-            insights.append(f"❓ {question_count:,} questions asked")
-        if emoji_count > 0:
-            insights.append(f"😊 {emoji_count:,} emojis used (approx)")
-        insights.append(f"📝 Average message length: {avg_message_length:.0f} characters")
-
-    summary = {
-        'total_messages': total,
-        'per_user': per_user,
-        'per_day': per_day,
-        'per_hour': per_hour,
-        'per_weekday': per_weekday,
-        'top_words': word_counts.most_common(top_n),
-        'media_count': media_count,
-        'emoji_count': emoji_count,
-        'link_count': link_count,
-        'question_count': question_count,
-        'avg_message_length': round(avg_message_length, 1),
-        'longest_message': longest_message,
-        'longest_message_length': longest_message_length,
-        'first_date': first_date.isoformat() if first_date else None,
-        'last_date': last_date.isoformat() if last_date else None,
-        'total_days': total_days,
-        'messages_per_day_avg': round(messages_per_day_avg, 2),
-        'user_percentages': user_percentages,
-        'active_periods': dict(active_periods),
-        'most_active_user': most_active_user[0] if most_active_user[0] else None,
-        'most_active_period': most_active_period[0] if most_active_period[0] else None,
-        'most_active_day': most_active_day[0] if most_active_day[0] else None,
-        'insights': insights
-    }
-    return summary
+    return stats.to_summary(top_n)
 
 def export_csv(summary, outpath):
     # Export comprehensive data to CSV
@@ -400,10 +718,14 @@ def export_csv(summary, outpath):
         writer.writerow(['metric','key','value'])
         writer.writerow(['total_messages','','%d' % summary['total_messages']])
         writer.writerow(['media_count','','%d' % summary['media_count']])
+        writer.writerow(['media_bytes','','%d' % summary.get('media_bytes', 0)])
         writer.writerow(['emoji_count','','%d' % summary['emoji_count']])
         writer.writerow(['link_count','','%d' % summary.get('link_count', 0)])
         writer.writerow(['question_count','','%d' % summary.get('question_count', 0)])
         writer.writerow(['avg_message_length','','%.1f' % summary.get('avg_message_length', 0)])
+        if 'message_length' in summary:
+            for key in ('median', 'p90', 'p99', 'stdev'):
+                writer.writerow(['message_length', key, summary['message_length'][key]])
         if summary.get('first_date'):
             writer.writerow(['first_date','',summary['first_date']])
         if summary.get('last_date'):
@@ -417,8 +739,64 @@ def export_csv(summary, outpath):
             writer.writerow(['per_user', user, cnt, '%.2f' % pct])
         writer.writerow([])
         writer.writerow(['top_words','word','count'])
+        if summary.get('top_words_approximate'):
+            writer.writerow(['top_words_error','','%d' % summary['top_words_error']])
         for word, cnt in summary['top_words']:
             writer.writerow(['top_words', word, cnt])
+        writer.writerow([])
+        writer.writerow(['top_emojis','emoji','count'])
+        for emoji, cnt in summary.get('top_emojis', []):
+            writer.writerow(['top_emojis', emoji, cnt])
+        writer.writerow([])
+        writer.writerow(['emojis_per_user','user','count'])
+        for user, cnt in summary.get('emojis_per_user', {}).items():
+            writer.writerow(['emojis_per_user', user, cnt])
+        writer.writerow([])
+        writer.writerow(['media_per_user','user','count','bytes'])
+        for user, media in summary.get('media_per_user', {}).items():
+            writer.writerow(['media_per_user', user, media['count'], media['bytes']])
+        writer.writerow([])
+        writer.writerow(['message_length_per_user','user','mean','median','p90','p99','max'])
+        for user, lengths in summary.get('message_length_per_user', {}).items():
+            writer.writerow(['message_length_per_user', user, lengths['mean'], lengths['median'],
+                             lengths['p90'], lengths['p99'], lengths['max']])
+        # Activity matrices, most active users first; days are sparse (one row per active day)
+        users = [user for user, _ in summary['per_user'].most_common()]
+        writer.writerow([])
+        writer.writerow(['hours_per_user', 'user'] + ['%02d' % hour for hour in range(24)])
+        for user in users:
+            if user in summary.get('hours_per_user', {}):
+                writer.writerow(['hours_per_user', user] + summary['hours_per_user'][user])
+        writer.writerow([])
+        writer.writerow(['weekdays_per_user', 'user'] + list(WEEKDAY_NAMES))
+        for user in users:
+            if user in summary.get('weekdays_per_user', {}):
+                writer.writerow(['weekdays_per_user', user] + summary['weekdays_per_user'][user])
+        writer.writerow([])
+        writer.writerow(['days_per_user', 'user', 'date', 'count'])
+        for user in users:
+            for day, cnt in summary.get('days_per_user', {}).get(user, {}).items():
+                writer.writerow(['days_per_user', user, day, cnt])
+        # Conversation sessions and reply latencies (see conversation.py)
+        if 'sessions' in summary:
+            writer.writerow([])
+            writer.writerow(['sessions', '', summary['sessions']])
+            writer.writerow(['session_gap_minutes', '', summary['session_gap_minutes']])
+            writer.writerow([])
+            writer.writerow(['sessions_started_per_user', 'user', 'count'])
+            for user, cnt in summary['sessions_started_per_user'].items():
+                writer.writerow(['sessions_started_per_user', user, cnt])
+            writer.writerow([])
+            writer.writerow(['response_time_per_user', 'user', 'replies', 'median_seconds', 'p90_seconds', 'mean_seconds'])
+            for user, times in summary['response_time_per_user'].items():
+                writer.writerow(['response_time_per_user', user, times['replies'], times['median_seconds'],
+                                 times['p90_seconds'], times['mean_seconds']])
+            writer.writerow([])
+            writer.writerow(['replies_per_pair', 'user', 'replied_to', 'count', 'mean_seconds']
+                            + ['within_' + bucket for bucket in REPLY_BUCKET_NAMES])
+            for pair in summary['replies_per_pair']:
+                writer.writerow(['replies_per_pair', pair['from'], pair['to'], pair['count'], pair['mean_seconds']]
+                                + [pair['within'][bucket] for bucket in REPLY_BUCKET_NAMES])
 
 def export_html(summary, outpath):
     # Very small HTML report
@@ -435,13 +813,21 @@ def export_html(summary, outpath):
     html.append('<h1>WhatsApp Chat Analysis</h1>')
     html.append(f'<p><strong>Total messages:</strong> {summary["total_messages"]}</p>')
     html.append(f'<p><strong>Media messages:</strong> {summary["media_count"]}</p>')
-    html.append(f'<p><strong>Emoji count (approx):</strong> {summary["emoji_count"]}</p>')
+    if summary.get('media_bytes'):
+        html.append(f'<p><strong>Media size:</strong> {summary["media_bytes"] / 1e6:.1f} MB</p>')
+    html.append(f'<p><strong>Emoji count:</strong> {summary["emoji_count"]}</p>')
+    if 'message_length' in summary:
+        lengths = summary['message_length']
+        html.append(f'<p><strong>Message length:</strong> median {lengths["median"]}, '
+                    f'p90 {lengths["p90"]}, p99 {lengths["p99"]} characters</p>')
 
     html.append('<h2>Messages per user</h2>')
     html.append('<table>')
-    html.append('<tr><th>User</th><th>Count</th></tr>')
+    html.append('<tr><th>User</th><th>Count</th><th>Median length</th><th>p90 length</th></tr>')
+    per_user_lengths = summary.get('message_length_per_user', {})
     for user, cnt in summary['per_user'].most_common():
-        html.append(f'<tr><td>{user}</td><td>{cnt}</td></tr>')
+        lengths = per_user_lengths.get(user, {})
+        html.append(f'<tr><td>{user}</td><td>{cnt}</td><td>{lengths.get("median", "")}</td><td>{lengths.get("p90", "")}</td></tr>')
     html.append('</table>')
 
     html.append('<h2>Top words</h2>')
@@ -451,34 +837,98 @@ def export_html(summary, outpath):
         html.append(f'<tr><td>{word}</td><td>{cnt}</td></tr>')
     html.append('</table>')
 
+    if summary.get('top_emojis'):
+        html.append('<h2>Top emojis</h2>')
+        html.append('<table>')
+        html.append('<tr><th>Emoji</th><th>Count</th></tr>')
+        for emoji, cnt in summary['top_emojis']:
+            html.append(f'<tr><td>{emoji}</td><td>{cnt}</td></tr>')
+        html.append('</table>')
+
     html.append('</body></html>')
     with open(outpath, 'w', encoding='utf-8') as f:
         f.write('\n'.join(html))
 
+def positive_int(value):
+    """argparse type for a count that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'expected a positive whole number, got {value!r}')
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(description='WhatsApp Chat Analyzer')
-    parser.add_argument('--file', '-f', required=True, help='Path to exported chat .txt file')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--file', '-f', help='Path to exported chat .txt file')
+    source.add_argument('--images', nargs='+', metavar='IMAGE', help='Chat screenshots to OCR, in chat order')
+    parser.add_argument('--ocr-cache', help='Directory caching OCR text by image content')
     parser.add_argument('--top', type=int, default=20, help='Top N words')
     parser.add_argument('--export', help='Export summary CSV path')
     parser.add_argument('--export-html', help='Export summary HTML path')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for large exports (0 = all cores)')
+    parser.add_argument('--backend', choices=['python', 'pandas'], default='python', help='Aggregation backend (pandas = vectorized NumPy/pandas)')
+    parser.add_argument('--store', help='Directory of a parsed-message store to reuse (created if missing or stale)')
+    parser.add_argument('--state', help='Incremental state file: only messages appended since the last run are parsed')
+    parser.add_argument('--profile', action='store_true', help='Print per-stage timings and pattern hit counts')
+    parser.add_argument('--approx-words', type=positive_int, metavar='N',
+                        help='Track at most ~2N distinct words (approximate top words in bounded memory)')
     args = parser.parse_args()
-    summary = analyze(args.file, top_n=args.top)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if args.images:
+        summary = analyze(args.images, top_n=args.top, is_image=True, workers=workers, backend=args.backend,
+                          profile=args.profile, word_capacity=args.approx_words, ocr_cache_dir=args.ocr_cache)
+    elif args.state:
+        from incremental import analyze_incremental
+        summary, info = analyze_incremental(args.file, args.state, top_n=args.top, backend=args.backend)
+        print(f"Incremental ({info['mode']}): {info['new_messages']} new messages from byte {info['resume_offset']}")
+    else:
+        summary = analyze(args.file, top_n=args.top, workers=workers, backend=args.backend, store_dir=args.store,
+                          profile=args.profile, word_capacity=args.approx_words)
     print('\n=== Summary ===')
     print('Total messages:', summary['total_messages'])
     print('Media messages:', summary['media_count'])
-    print('Emoji count (approx):', summary['emoji_count'])
+    if summary.get('media_bytes'):
+        print(f"Media size: {summary['media_bytes'] / 1e6:.1f} MB")
+    print('Emoji count:', summary['emoji_count'])
+    lengths = summary['message_length']
+    print(f"Message length: median {lengths['median']}, p90 {lengths['p90']}, p99 {lengths['p99']} characters")
+    if summary.get('top_emojis'):
+        print('Top emojis:', ' '.join(f'{emoji} {cnt}' for emoji, cnt in summary['top_emojis'][:10]))
     print('\nMessages per user:')
     for user, cnt in summary['per_user'].most_common():
         print(f'  {user}: {cnt}')
-    print('\nTop words:')
+    if summary.get('top_words_approximate'):
+        print(f"\nTop words (approximate, counts may be low by up to {summary['top_words_error']}):")
+    else:
+        print('\nTop words:')
     for w, cnt in summary['top_words']:
         print(f'  {w}: {cnt}')
+    export_profile = Profile() if args.profile else NULL_PROFILE
     if args.export:
-        export_csv(summary, args.export)
+        with export_profile.stage('export_csv'):
+            export_csv(summary, args.export)
         print('\nExported summary to', args.export)
     if getattr(args, 'export_html', None):
-        export_html(summary, args.export_html)
+        with export_profile.stage('export_html'):
+            export_html(summary, args.export_html)
         print('\nExported HTML report to', args.export_html)
+    if 'profile' in summary:
+        print_profile(summary['profile'], export_profile.to_dict())
+
+def print_profile(*profiles):
+    print('\n=== Profile ===')
+    for profile in profiles:
+        for stage, entry in profile.get('stages', {}).items():
+            print(f"  {stage:<24} {entry['seconds']:>10.4f}s  ({entry['calls']} calls)")
+    for profile in profiles:
+        for name, count in sorted(profile.get('counters', {}).items()):
+            print(f'  {name:<24} {count:>10}')
+        if 'lines_per_second' in profile:
+            print(f"  {'lines/sec':<24} {profile['lines_per_second']:>10,.0f}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,289 @@
+"""Persistent, columnar store of parsed messages.
+
+Parsing (regex matching and timestamp conversion) is the dominant cost of
+analyze(). A store keeps the parsed result of an export so that changing
+``top_n`` or running new queries doesn't go back to the raw text:
+
+    meta.json        counts, author names, source fingerprint
+    timestamps.i64   message time as seconds since 0001-01-01 (-1 = unknown)
+    authors.i32      interned author id per message (-1 = system message)
+    offsets.i64      n + 1 byte offsets of each message in messages.txt
+    messages.txt     UTF-8 message bodies, back to back
+
+The column files are memory-mapped and exposed as typed memoryviews, so
+opening a store is zero-copy; message text is decoded only when asked for.
+"""
+import json
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+from datetime import datetime
+from functools import lru_cache
+
+from stats import ChatStats
+
+STORE_VERSION = 1
+NO_TIME = -1
+NO_AUTHOR = -1
+
+_COLUMNS = (('timestamps', 'timestamps.i64', 'q'),
+            ('author_codes', 'authors.i32', 'i'),
+            ('offsets', 'offsets.i64', 'q'))
+
+# Column values StoreWriter buffers before appending them to their files
+FLUSH_EVERY = 64 * 1024
+
+
+class StoreWriter:
+    """Capture (datetime, author, message) tuples into a store directory.
+
+    Wrap the message stream with capture() and call finish() once it has
+    been consumed; the store appears atomically under ``store_dir``.
+    Columns are appended to their files every FLUSH_EVERY messages, so
+    memory use doesn't grow with the chat.
+    Where the store's directory and source are only known once the stream
+    has been consumed (the digest of an upload being received), pass them
+    to finish() instead; ``store_dir`` then only has to be a sibling.
+    """
+
+    def __init__(self, store_dir, source=None):
+        self.store_dir = store_dir
+        self.source = source or {}
+        parent = os.path.dirname(os.path.abspath(store_dir))
+        os.makedirs(parent, exist_ok=True)
+        self._tmpdir = tempfile.mkdtemp(prefix='.store_', dir=parent)
+        self._text = open(os.path.join(self._tmpdir, 'messages.txt'), 'wb')
+        self._files = {name: open(os.path.join(self._tmpdir, filename), 'wb') for name, filename, _ in _COLUMNS}
+        self._timestamps = array('q')
+        self._author_codes = array('i')
+        self._offsets = array('q', [0])
+        self._offset = 0
+        self._count = 0
+        self._author_ids = {}
+        self._authors = []
+
+    def _flush(self):
+        for name, _, _ in _COLUMNS:
+            column = getattr(self, '_' + name)
+            column.tofile(self._files[name])
+            del column[:]
+
+    def _close(self):
+        self._text.close()
+        for f in self._files.values():
+            f.close()
+
+    def add(self, dt, author, message):
+        if dt:
+            self._timestamps.append(dt.toordinal() * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second)
+        else:
+            self._timestamps.append(NO_TIME)
+        if author:
+            author_id = self._author_ids.get(author)
+            if author_id is None:
+                author_id = self._author_ids[author] = len(self._authors)
+                self._authors.append(author)
+            self._author_codes.append(author_id)
+        else:
+            self._author_codes.append(NO_AUTHOR)
+        data = message.encode('utf-8')
+        self._text.write(data)
+        self._offset += len(data)
+        self._offsets.append(self._offset)
+        self._count += 1
+        if len(self._timestamps) >= FLUSH_EVERY:
+            self._flush()
+
+    def capture(self, messages):
+        """Pass messages through unchanged while recording them"""
+        add = self.add
+        for dt, author, message in messages:
+            add(dt, author, message)
+            yield dt, author, message
+
+    def finish(self, store_dir=None, source=None):
+        if store_dir is not None:
+            self.store_dir = store_dir
+        if source is not None:
+            self.source = source
+        self._flush()
+        self._close()
+        meta = {
+            'version': STORE_VERSION,
+            'byteorder': sys.byteorder,
+            'count': self._count,
+            'authors': self._authors,
+            'source': self.source,
+        }
+        with open(os.path.join(self._tmpdir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        if os.path.isdir(self.store_dir):
+            shutil.rmtree(self.store_dir, ignore_errors=True)
+        os.replace(self._tmpdir, self.store_dir)
+        return MessageStore(self.store_dir)
+
+    def abort(self):
+        self._close()
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+def _map_column(path, typecode):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(array(typecode)), None
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast(typecode), mapped
+
+
+@lru_cache(maxsize=4096)
+def _ordinal_date(day):
+    return datetime.fromordinal(day)
+
+
+def to_datetime(timestamp):
+    """Inverse of the store's timestamp encoding (None for NO_TIME)"""
+    if timestamp == NO_TIME:
+        return None
+    day, seconds = divmod(timestamp, 86400)
+    base = _ordinal_date(day)
+    return datetime(base.year, base.month, base.day, seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def encode_datetime(dt):
+    return dt.toordinal() * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+
+class MessageStore:
+    """Read-only, memory-mapped view of a message store directory"""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != STORE_VERSION or self.meta.get('byteorder') != sys.byteorder:
+            raise ValueError(f"Incompatible message store: {store_dir}")
+        self.authors = self.meta['authors']
+        self._maps = []
+        for name, filename, typecode in _COLUMNS:
+            view, mapped = _map_column(os.path.join(store_dir, filename), typecode)
+            setattr(self, name, view)
+            if mapped is not None:
+                self._maps.append((view, mapped))
+        view, mapped = _map_column(os.path.join(store_dir, 'messages.txt'), 'B')
+        self._text = view
+        if mapped is not None:
+            self._maps.append((view, mapped))
+
+    def __len__(self):
+        return self.meta['count']
+
+    @property
+    def source(self):
+        return self.meta.get('source', {})
+
+    def message(self, i):
+        """Decoded text of message i"""
+        return str(self._text[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def author(self, i):
+        code = self.author_codes[i]
+        return self.authors[code] if code != NO_AUTHOR else None
+
+    def iter_messages(self, start=0, stop=None):
+        """Yield (datetime, author, message) tuples like main.iter_messages()"""
+        stop = len(self) if stop is None else stop
+        timestamps, codes, offsets, authors, text = self.timestamps, self.author_codes, self.offsets, self.authors, self._text
+        for i in range(start, stop):
+            code = codes[i]
+            yield (to_datetime(timestamps[i]),
+                   authors[code] if code != NO_AUTHOR else None,
+                   str(text[offsets[i]:offsets[i + 1]], 'utf-8'))
+
+    def close(self):
+        for view, mapped in self._maps:
+            view.release()
+            mapped.close()
+        self._maps = []
+        self._text.release()
+        for name, _, _ in _COLUMNS:
+            getattr(self, name).release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(store_dir, source=None):
+    """Open a store, or return None if it is missing, broken or built from a different source"""
+    try:
+        store = MessageStore(store_dir)
+    except (OSError, ValueError, KeyError):
+        return None
+    if source is not None and store.source != source:
+        store.close()
+        return None
+    return store
+
+
+def file_fingerprint(filepath):
+    """Cheap identity of a source file, used to tell whether a store is stale"""
+    st = os.stat(filepath)
+    return {'path': os.path.abspath(filepath), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def stats_from_store(store, backend='python', word_capacity=None):
+    """Rebuild a ChatStats from a store without touching the raw export"""
+    if backend == 'pandas':
+        from vectorized import BATCH_SIZE, _add_batch
+        stats = ChatStats(word_capacity)
+        # Store author ids are assigned in first-seen order, like ChatStats interning
+        for name in store.authors:
+            stats.intern_author(name)
+        n = len(store)
+        for start in range(0, n, BATCH_SIZE):
+            stop = min(n, start + BATCH_SIZE)
+            texts = [store.message(i) for i in range(start, stop)]
+            _add_batch(stats, store.timestamps[start:stop], store.author_codes[start:stop], texts)
+        return stats
+    return ChatStats(word_capacity).update(store.iter_messages())
+
+
+def messages_between(store, start=None, end=None, author=None):
+    """Yield stored messages with start <= time < end, optionally from one author.
+
+    Only the timestamp and author columns are scanned; text is decoded for
+    matching messages alone.
+    """
+    lo = encode_datetime(start) if start else None
+    hi = encode_datetime(end) if end else None
+    code = None
+    if author is not None:
+        if author not in store.authors:
+            return
+        code = store.authors.index(author)
+    timestamps, codes = store.timestamps, store.author_codes
+    for i in range(len(store)):
+        ts = timestamps[i]
+        if (lo is not None or hi is not None) and ts == NO_TIME:
+            continue
+        if lo is not None and ts < lo:
+            continue
+        if hi is not None and ts >= hi:
+            continue
+        if code is not None and codes[i] != code:
+            continue
+        yield to_datetime(ts), store.author(i), store.message(i)
+
+
+def author_message_counts(store):
+    """Messages per author using only the author column"""
+    counts = array('q', bytes(8 * len(store.authors)))
+    for code in store.author_codes:
+        if code != NO_AUTHOR:
+            counts[code] += 1
+    return dict(zip(store.authors, counts))
@@ -0,0 +1,196 @@
+"""OCR of chat screenshots: preprocessing, a process pool and a content cache.
+
+A multi-screenshot upload goes through ocr_images(): images whose text is
+already cached (keyed by the SHA-256 of the image bytes) are free, the rest
+are preprocessed and OCR'd in parallel worker processes, and the texts come
+back in upload order. stitch_texts() joins them into one export, dropping
+the messages that consecutive screenshots of a scrolled chat have in common.
+
+Preprocessing converts to grayscale, downscales wide screenshots (Tesseract
+time grows with pixel count; phone screenshots have far more resolution
+than the text needs) and binarizes with an Otsu threshold, inverting
+dark-mode screenshots so text is always dark on light.
+"""
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+# OCR support for image processing
+try:
+    from PIL import Image
+    import pytesseract
+
+    # Try to auto-detect Tesseract on Windows if not in PATH
+    if os.name == 'nt':  # Windows
+        tesseract_paths = [
+            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+            r'C:\Tesseract-OCR\tesseract.exe',
+        ]
+        for path in tesseract_paths:
+            if os.path.exists(path):
+                pytesseract.pytesseract.tesseract_cmd = path
+                break
+
+    # Test if Tesseract is available
+    try:
+        pytesseract.get_tesseract_version()
+        OCR_AVAILABLE = True
+    except Exception:
+        OCR_AVAILABLE = False
+except Exception:
+    OCR_AVAILABLE = False
+
+# Screenshots wider than this are downscaled before OCR
+MAX_WIDTH = 1080
+
+# Part of every cache key: bump when preprocessing or OCR settings change
+OCR_VERSION = b'ocr1'
+
+
+def otsu_threshold(histogram):
+    """Gray level that best separates a 256-bin histogram into two classes"""
+    total = sum(histogram)
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    best, threshold = -1.0, 127
+    weight_bg = sum_bg = 0
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if not weight_bg:
+            continue
+        weight_fg = total - weight_bg
+        if not weight_fg:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, level
+    return threshold
+
+
+def binarize_table(histogram):
+    """Lookup table mapping gray levels to black text on white"""
+    threshold = otsu_threshold(histogram)
+    # More dark than light pixels: a dark-mode screenshot, so invert
+    dark_mode = sum(histogram[:threshold + 1]) > sum(histogram[threshold + 1:])
+    if dark_mode:
+        return [0 if level > threshold else 255 for level in range(256)]
+    return [255 if level > threshold else 0 for level in range(256)]
+
+
+def preprocess(image, max_width=MAX_WIDTH):
+    """Grayscale, downscale and binarize a PIL image for OCR"""
+    image = image.convert('L')
+    if image.width > max_width:
+        height = max(1, round(image.height * max_width / image.width))
+        image = image.resize((max_width, height), Image.LANCZOS)
+    return image.point(binarize_table(image.histogram()))
+
+
+def tesseract_ocr(image_path):
+    """OCR one image file with Tesseract (the default engine)"""
+    if not OCR_AVAILABLE:
+        raise Exception("OCR libraries not available. Please install: pip install Pillow pytesseract. Also install Tesseract OCR from https://github.com/tesseract-ocr/tesseract")
+    with Image.open(image_path) as image:
+        return pytesseract.image_to_string(preprocess(image))
+
+
+# The engine ocr_images() uses by default: any picklable callable taking an
+# image path and returning its text
+ENGINE = tesseract_ocr
+
+
+def image_key(image_path):
+    """Cache key of an image: SHA-256 of the OCR version and the image bytes"""
+    digest = hashlib.sha256(OCR_VERSION)
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """OCR texts on disk, one file per image key"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.txt')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, text):
+        # Write then rename, so concurrent readers never see a partial file (and
+        # cache retention never indexes one: its name starts with '.')
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix='.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, self._path(key))
+
+
+def ocr_images(image_paths, workers=1, cache=None, engine=None):
+    """OCR texts of image_paths, in order.
+
+    Cached images are not OCR'd again, and identical images within one call
+    are OCR'd once. With ``workers`` > 1 the remaining images are processed
+    by a process pool. ``cache`` is an OcrCache (or None), ``engine``
+    defaults to ENGINE.
+    """
+    engine = engine or ENGINE
+    keys = [image_key(path) for path in image_paths]
+    texts = [cache.get(key) if cache else None for key in keys]
+    todo = {}  # key -> path, for the images still to OCR
+    for key, path, text in zip(keys, image_paths, texts):
+        if text is None:
+            todo.setdefault(key, path)
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            results = dict(zip(todo, pool.map(engine, todo.values())))
+    else:
+        results = {key: engine(path) for key, path in todo.items()}
+    if cache:
+        for key, text in results.items():
+            cache.put(key, text)
+    return [text if text is not None else results[key] for key, text in zip(keys, texts)]
+
+
+def _overlap(previous, lines, is_message):
+    """Length of the longest run of lines that both ends previous and starts lines.
+
+    Only runs with a timestamped message line in them count, so lines that
+    were really repeated (two "ok" replies, blank lines) are kept.
+    """
+    for n in range(min(len(previous), len(lines)), 0, -1):
+        if previous[-n:] == lines[:n] and any(is_message(line) for line in lines[:n]):
+            return n
+    return 0
+
+
+def stitch_texts(texts):
+    """Join the OCR texts of consecutive screenshots into one export.
+
+    Blank lines inside a screenshot are kept, as they end a message; those
+    at its top and bottom edges are not content and are dropped. Where a
+    screenshot starts with the messages the previous one ended with (the
+    scrolled-over part), they are kept once.
+    """
+    from main import parse_line  # main imports this module
+
+    def is_message(line):
+        return parse_line(line) is not None
+
+    stitched = []
+    for text in texts:
+        lines = [line.strip() for line in text.strip().splitlines()]
+        stitched.extend(lines[_overlap(stitched, lines, is_message):])
+    return '\n'.join(stitched)
@@ -0,0 +1,211 @@
+"""Per-stage timing and counters for analyses, plus Prometheus-style metrics.
+
+A Profile records wall time per named stage (read, parse, aggregate,
+summarize, export_csv, ...) and plain counters (lines, per-pattern hits,
+lines without a timestamp). Code under measurement takes a ``profile``
+argument that defaults to NULL_PROFILE, whose methods do nothing, so
+uninstrumented runs pay one attribute lookup per stage and nothing per line.
+
+Per-line instrumentation (splitting reading from parsing, pattern hit
+counts) wraps the line iterator and parser and costs a couple of timer
+calls per line; it is only switched on with Profile(detailed=True).
+
+MetricsRegistry folds finished profiles into latency histograms and
+counters and renders them in the Prometheus text exposition format for the
+app's /metrics endpoint.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Histogram buckets (seconds) for stage and request latencies
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Profile:
+    """Stage timings and counters of one analysis"""
+
+    enabled = True
+
+    def __init__(self, detailed=False):
+        self.detailed = detailed
+        self.stages = {}
+        self.counters = Counter()
+
+    def add(self, name, seconds, calls=1):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, calls]
+        else:
+            entry[0] += seconds
+            entry[1] += calls
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def seconds(self, name):
+        entry = self.stages.get(name)
+        return entry[0] if entry else 0.0
+
+    def timed_iter(self, name, iterable):
+        """Charge the time spent producing items of iterable to name (detailed profiles only)"""
+        if not self.detailed:
+            return iterable
+        return self._timed_iter(name, iterable)
+
+    def _timed_iter(self, name, iterable):
+        clock = time.perf_counter
+        iterator = iter(iterable)
+        total = 0.0
+        calls = 0
+        try:
+            while True:
+                start = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    total += clock() - start
+                    return
+                total += clock() - start
+                calls += 1
+                yield item
+        finally:
+            self.add(name, total, calls)
+
+    def merge(self, other):
+        """Add another profile's stages and counters (e.g. from a worker process)"""
+        for name, (seconds, calls) in other.stages.items():
+            self.add(name, seconds, calls)
+        self.counters.update(other.counters)
+        return self
+
+    def to_dict(self):
+        stages = {name: {'seconds': round(seconds, 6), 'calls': calls}
+                  for name, (seconds, calls) in self.stages.items()}
+        result = {'stages': stages, 'counters': dict(self.counters)}
+        lines = self.counters.get('lines')
+        elapsed = self.seconds('collect')
+        if lines and elapsed:
+            result['lines_per_second'] = round(lines / elapsed, 1)
+        return result
+
+
+class _NullProfile:
+    """Profile stand-in that records nothing"""
+
+    enabled = False
+    detailed = False
+
+    def add(self, name, seconds, calls=1):
+        pass
+
+    @contextmanager
+    def stage(self, name):
+        yield self
+
+    def count(self, name, n=1):
+        pass
+
+    def timed_iter(self, name, iterable):
+        return iterable
+
+    def to_dict(self):
+        return {}
+
+
+NULL_PROFILE = _NullProfile()
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class MetricsRegistry:
+    """Thread-safe store of stage histograms and counters for /metrics"""
+
+    def __init__(self, prefix='chat_analyzer'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = Counter()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, n=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += n
+
+    def record_profile(self, profile):
+        """Fold a finished Profile into the stage histogram and line counters"""
+        for stage, (seconds, _) in profile.stages.items():
+            self.observe('stage_seconds', seconds, stage=stage)
+        for name, n in profile.counters.items():
+            if name.startswith('pattern_'):
+                self.inc('pattern_hits_total', n, pattern=name[len('pattern_'):])
+            else:
+                self.inc(f'{name}_total', n)
+
+    def render(self, gauges=None):
+        """Prometheus text exposition of everything recorded, plus optional gauges"""
+        out = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        seen = set()
+        for (name, labels), histogram in histograms:
+            metric = f'{self.prefix}_{name}'
+            if metric not in seen:
+                seen.add(metric)
+                out.append(f'# TYPE {metric} histogram')
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                out.append(f'{metric}_bucket{_labels(labels + (("le", bound),))} {count}')
+            out.append(f'{metric}_bucket{_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+            out.append(f'{metric}_sum{_labels(labels)} {histogram.sum:.6f}')
+            out.append(f'{metric}_count{_labels(labels)} {histogram.count}')
+        for (name, labels), value in counters:
+            metric = f'{self.prefix}_{name}'
+            if metric not in seen:
+                seen.add(metric)
+                out.append(f'# TYPE {metric} counter')
+            out.append(f'{metric}{_labels(labels)} {value}')
+        for name, value in sorted((gauges or {}).items()):
+            metric = f'{self.prefix}_{name}'
+            out.append(f'# TYPE {metric} gauge')
+            out.append(f'{metric} {value}')
+        return '\n'.join(out) + '\n'
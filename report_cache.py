@@ -0,0 +1,190 @@
+"""Content-addressed cache of analysis results for the web app.
+
+Results are keyed by the SHA-256 of the uploaded bytes plus ``top_n`` (and
+the word capacity, if top words are approximate), so re-uploading the same
+export skips parsing entirely and reuses the report files generated the
+first time. There are two tiers:
+
+* an in-process LRU of summary dicts, and
+* an on-disk tier (one ``.stats`` blob plus a ``.json`` index entry per key)
+  that survives restarts and is trimmed to a byte budget, evicting the
+  least recently used entries first.
+
+The disk tier's sizes and use order are kept in memory: they are read from
+the cache directory once at startup (the ``.json`` file's mtime records
+when an entry was last used) and kept up to date by the cache itself, so
+storing a result doesn't list the directory.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from stats import ChatStats
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_and_save(stream, path):
+    """Copy a file-like stream to path, returning the SHA-256 hex digest of its bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'wb') as out:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(digest, top_n, word_capacity=None):
+    # Approximate top words (a word capacity) differ from exact ones
+    if word_capacity is None:
+        return f'{digest}_{top_n}'
+    return f'{digest}_{top_n}_w{word_capacity}'
+
+
+class ReportCache:
+    """Two-tier (memory LRU + disk) cache of analysis results"""
+
+    def __init__(self, cache_dir, reports_dir, max_entries=64, max_disk_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.reports_dir = reports_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        # Disk tier: key -> bytes of its two files, least recently used first
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Index the entries already on disk, in the order they were last used"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            index_path, stats_path = self._paths(name[:-5])
+            try:
+                size = os.path.getsize(index_path) + os.path.getsize(stats_path)
+                entries.append((os.path.getmtime(index_path), name[:-5], size))
+            except OSError:
+                continue
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _index(self, key, size=None):
+        """Mark a disk entry as most recently used, recording its new size if given"""
+        with self._lock:
+            if size is not None:
+                self._disk_bytes += size - self._disk.get(key, 0)
+                self._disk[key] = size
+            if key in self._disk:
+                self._disk.move_to_end(key)
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.stats'
+
+    def _reports_exist(self, entry):
+        return all(os.path.exists(os.path.join(self.reports_dir, entry[name]))
+                   for name in ('html_name', 'csv_name'))
+
+    def get(self, key):
+        """Return the cached entry dict (summary, html_name, csv_name) or None.
+
+        ``reports_ok`` in the entry says whether the report files referenced
+        by the entry still exist (they are subject to report retention).
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry is None:
+                return None
+            self._remember(key, entry)
+        return dict(entry, reports_ok=self._reports_exist(entry))
+
+    def _load(self, key):
+        index_path, stats_path = self._paths(key)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(stats_path, 'rb') as f:
+                stats = ChatStats.from_bytes(f.read())
+            # Mark as recently used for disk eviction, here and after a restart
+            os.utime(index_path)
+        except (OSError, ValueError):
+            return None
+        self._index(key)
+        return {
+            'summary': stats.to_summary(meta['top_n']),
+            'html_name': meta['html_name'],
+            'csv_name': meta['csv_name'],
+        }
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def put(self, key, stats, top_n, summary, html_name, csv_name):
+        """Store a result in both tiers"""
+        entry = {'summary': summary, 'html_name': html_name, 'csv_name': csv_name}
+        self._remember(key, entry)
+        index_path, stats_path = self._paths(key)
+        blob = stats.to_bytes()
+        meta = json.dumps({'top_n': top_n, 'html_name': html_name, 'csv_name': csv_name}).encode('utf-8')
+        try:
+            with open(stats_path, 'wb') as f:
+                f.write(blob)
+            with open(index_path, 'wb') as f:
+                f.write(meta)
+        except OSError:
+            return
+        self._index(key, len(blob) + len(meta))
+        self.evict()
+
+    def update_reports(self, key, html_name, csv_name):
+        """Point an entry at freshly regenerated report files"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                entry.update(html_name=html_name, csv_name=csv_name)
+        index_path, stats_path = self._paths(key)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            meta.update(html_name=html_name, csv_name=csv_name)
+            meta = json.dumps(meta).encode('utf-8')
+            with open(index_path, 'wb') as f:
+                f.write(meta)
+            size = len(meta) + os.path.getsize(stats_path)
+        except (OSError, ValueError):
+            return
+        self._index(key, size)
+
+    def evict(self):
+        """Trim the disk tier to max_disk_bytes, least recently used first"""
+        evicted = []
+        with self._lock:
+            while self._disk_bytes > self.max_disk_bytes and self._disk:
+                key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                self._memory.pop(key, None)
+                evicted.append(key)
+        for key in evicted:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,196 @@
+"""Retention of files the web app writes: reports, message stores, OCR texts.
+
+Entries of a directory are registered with a Retention index as they are
+written, instead of the directory being listed and stat'ed after every
+upload. An entry is a file, or with ``directories=True`` a subdirectory
+(such as a message store) counted by the total size of its files. The
+index is a heap ordered by creation time (every entry has the same TTL, so
+that is also expiry order) plus the size of each entry. A background
+thread wakes every ``interval`` seconds, removes entries older than
+``ttl_seconds`` and then, oldest first, whatever exceeds ``max_bytes``.
+Entries already in the directory at startup are indexed once by scan();
+with ``rescan=True`` every sweep also indexes entries written by code that
+doesn't report them (the OCR cache). Names starting with '.' are writes in
+progress and are never indexed. ``on_evict(name, reason, size)`` is
+called for every entry removed, e.g. to count evictions in a metrics
+registry or to drop what was cached from the entry.
+"""
+import heapq
+import os
+import shutil
+import threading
+import time
+
+EXPIRED = 'expired'
+QUOTA = 'quota'
+
+
+def _size(path, directory):
+    if not directory:
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class Retention:
+    """TTL and disk-quota eviction of the files (or subdirectories) of one directory"""
+
+    def __init__(self, directory, ttl_seconds=24 * 3600, max_bytes=None, interval=60,
+                 directories=False, rescan=False, on_evict=None):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.directories = directories
+        self.rescan = rescan
+        self.on_evict = on_evict
+        self._heap = []
+        # name -> (created, size); heap items no longer here are skipped
+        self._files = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._sweeps = 0
+        self._last_sweep_seconds = 0.0
+        self._evicted = {EXPIRED: 0, QUOTA: 0}
+        self._reclaimed = {EXPIRED: 0, QUOTA: 0}
+
+    def _track(self, name, created, size):
+        with self._lock:
+            previous = self._files.get(name)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._files[name] = (created, size)
+            self._bytes += size
+            heapq.heappush(self._heap, (created, name))
+
+    def add(self, *names):
+        """Index newly written entries (names relative to directory)"""
+        now = time.time()
+        for name in names:
+            try:
+                size = _size(os.path.join(self.directory, name), self.directories)
+            except OSError:
+                continue
+            self._track(name, now, size)
+
+    def scan(self):
+        """Index the entries in directory not indexed yet, by modification time"""
+        with self._lock:
+            known = set(self._files)
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or entry.name in known:
+                    continue
+                try:
+                    if entry.is_dir() if self.directories else entry.is_file():
+                        self._track(entry.name, entry.stat().st_mtime, _size(entry.path, self.directories))
+                except OSError:
+                    continue
+
+    def _pop_oldest(self, created_before=None):
+        """Unindex and return the oldest (name, size), or None"""
+        with self._lock:
+            while self._heap:
+                created, name = self._heap[0]
+                if self._files.get(name, (None,))[0] != created:
+                    # Superseded by a later add() of the same name
+                    heapq.heappop(self._heap)
+                    continue
+                if created_before is not None and created >= created_before:
+                    return None
+                heapq.heappop(self._heap)
+                _, size = self._files.pop(name)
+                self._bytes -= size
+                return name, size
+        return None
+
+    def _over_quota(self):
+        with self._lock:
+            return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _remove(self, name, size, reason):
+        path = os.path.join(self.directory, name)
+        try:
+            if self.directories:
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            # Already gone (or not removable); nothing was reclaimed
+            return
+        with self._lock:
+            self._evicted[reason] += 1
+            self._reclaimed[reason] += size
+        if self.on_evict is not None:
+            self.on_evict(name, reason, size)
+
+    def sweep(self, now=None):
+        """Evict expired entries, then the oldest ones while over quota.
+
+        Returns (entries, bytes) removed by this sweep.
+        """
+        start = time.perf_counter()
+        if self.rescan:
+            self.scan()
+        now = time.time() if now is None else now
+        removed = []
+        while True:
+            oldest = self._pop_oldest(created_before=now - self.ttl_seconds)
+            if oldest is None:
+                break
+            removed.append(oldest + (EXPIRED,))
+        while self._over_quota():
+            oldest = self._pop_oldest()
+            if oldest is None:
+                break
+            removed.append(oldest + (QUOTA,))
+        for name, size, reason in removed:
+            self._remove(name, size, reason)
+        with self._lock:
+            self._sweeps += 1
+            self._last_sweep_seconds = time.perf_counter() - start
+        return len(removed), sum(size for _, size, _ in removed)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                # Keep sweeping on the next tick
+                pass
+
+    def start(self):
+        """Sweep every ``interval`` seconds on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def metrics(self):
+        """Indexed entries and bytes, and what the sweeps have evicted so far"""
+        with self._lock:
+            return {
+                'entries': len(self._files),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'sweeps': self._sweeps,
+                'last_sweep_seconds': round(self._last_sweep_seconds, 6),
+                'evicted_expired': self._evicted[EXPIRED],
+                'evicted_quota': self._evicted[QUOTA],
+                'bytes_reclaimed_expired': self._reclaimed[EXPIRED],
+                'bytes_reclaimed_quota': self._reclaimed[QUOTA],
+            }
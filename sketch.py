@@ -0,0 +1,73 @@
+"""Bounded-memory heavy-hitters sketch for approximate top words.
+
+HeavyHitters is a Counter that never tracks more than ``2 * capacity``
+distinct keys. When it outgrows that, every count is lowered by the
+(capacity + 1)-th largest count and keys that drop to zero are forgotten
+(the batched Misra-Gries / Space-Saving scheme). The total amount
+subtracted from any key is kept in ``error``, which gives each reported
+count an error bound:
+
+    count <= true count <= count + error,    error <= N / (capacity + 1)
+
+where N is the number of tokens added. Any word whose true count exceeds
+``error`` is still tracked, so the top words of a chat are found exactly
+unless the vocabulary is both huge and flat. Until the first prune the
+sketch is exact and ``error`` is 0.
+
+Sketches merge by adding counts and errors and pruning again, so chunks
+processed in parallel combine into a sketch with the same guarantee.
+"""
+import heapq
+from collections import Counter
+
+# Default number of counters: a few MB of memory, exact for ordinary chats
+DEFAULT_CAPACITY = 50000
+
+
+class HeavyHitters(Counter):
+    """Counter with a bounded number of keys and a global error bound"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("HeavyHitters capacity must be at least 1")
+        self.capacity = capacity
+        self.error = 0
+        super().__init__()
+
+    def update(self, iterable=None, /, **kwds):
+        super().update(iterable, **kwds)
+        if len(self) > 2 * self.capacity:
+            self.prune()
+
+    def prune(self):
+        """Shrink to at most capacity keys, adding the decrement to error"""
+        if len(self) <= self.capacity:
+            return
+        decrement = heapq.nlargest(self.capacity + 1, self.values())[-1]
+        kept = {key: count - decrement for key, count in self.items() if count > decrement}
+        self.clear()
+        dict.update(self, kept)
+        self.error += decrement
+
+    def merge(self, other):
+        """Add another HeavyHitters (or an exact Counter) into this one"""
+        super().update(other)
+        self.error += getattr(other, 'error', 0)
+        if len(self) > 2 * self.capacity:
+            self.prune()
+        return self
+
+    def bounds(self, key):
+        """(lower, upper) bounds on the true count of key"""
+        count = self[key]
+        return count, count + self.error
+
+    def __reduce__(self):
+        return _restore, (self.capacity, self.error, dict(self))
+
+
+def _restore(capacity, error, counts):
+    sketch = HeavyHitters(capacity)
+    dict.update(sketch, counts)
+    sketch.error = error
+    return sketch
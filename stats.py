@@ -0,0 +1,625 @@
+"""Mergeable chat statistics accumulator.
+
+ChatStats holds everything analyze() aggregates about a chat in compact,
+slot-based form: hours, weekdays and time-of-day periods are fixed-size
+integer arrays, authors are interned to integer ids, and days are keyed by
+their ordinal. Per-author activity is a dense author x hour matrix (a flat
+array indexed by author id) plus one sparse day -> count dict per author,
+from which the author x weekday matrix is derived. Reply latencies and
+conversation sessions are followed in chat order by a ConversationStats
+(see conversation.py). Accumulators built from different chunks or files
+can be merged, turned into the summary dict, or serialized to a compact
+binary blob and loaded again later without re-parsing the chat.
+"""
+import re
+import struct
+import zlib
+from array import array
+from collections import Counter
+from datetime import date
+
+from conversation import ConversationStats
+from emojis import EMOJI_RE, normalize as normalize_emoji
+from length_stats import LengthStats
+from sketch import HeavyHitters
+
+# Extended stopwords list
+STOPWORDS = set(["the","and","to","a","of","in","is","it","you","i","for","on","that","this","with","are","was","as","but","be","have","has","not","we","they","what","when","where","who","why","how","can","will","would","should","could","may","might","must","shall"])
+
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+PERIOD_NAMES = ('Morning', 'Afternoon', 'Evening', 'Night')
+
+# Time-of-day period index for each hour: Morning 5-12, Afternoon 12-17, Evening 17-22
+HOUR_PERIODS = tuple(0 if 5 <= h < 12 else 1 if 12 <= h < 17 else 2 if 17 <= h < 22 else 3 for h in range(24))
+
+# Blob format version; older blobs are rejected (and re-analyzed by callers)
+_MAGIC = b'WCS6'
+
+# Words of two or more word characters. Equivalent to findall(r"\b\w+\b")
+# followed by a len(w) > 1 check, without the per-word Python filtering.
+WORD_RE = re.compile(r"\w\w+")
+
+
+def tokenize(text):
+    """Lowercase word tokens of text, including stopwords (see top_words())"""
+    return WORD_RE.findall(text.lower())
+
+
+def _zeros(n):
+    return array('q', bytes(8 * n))
+
+
+_HOURS_ROW = _zeros(24)
+
+
+class ChatStats:
+    """Aggregated statistics for one or more chunks of a chat.
+
+    ``word_counts`` holds raw token counts (stopwords included, they are
+    dropped when reporting). With ``word_capacity`` it is a bounded
+    HeavyHitters sketch instead of an exact Counter, and top words become
+    approximate with a reported error bound.
+    """
+
+    __slots__ = (
+        'total', 'total_length',
+        'media_count', 'emoji_count', 'link_count', 'question_count',
+        'longest_message', 'longest_message_length',
+        'first_day', 'last_day',
+        'author_ids', 'authors', 'author_counts', 'author_emoji_counts',
+        'day_counts',
+        'hour_counts', 'hour_order',
+        'weekday_counts', 'weekday_order',
+        'period_counts', 'period_order',
+        'word_counts', 'emoji_counts',
+        'author_lengths', 'unattributed_lengths',
+        'media_bytes', 'author_media_counts', 'author_media_bytes',
+        'author_hours', 'author_days',
+        'conversations',
+    )
+
+    def __init__(self, word_capacity=None):
+        self.total = 0
+        self.total_length = 0
+        self.media_count = 0
+        self.emoji_count = 0
+        self.link_count = 0
+        self.question_count = 0
+        self.longest_message = ""
+        self.longest_message_length = 0
+        self.first_day = None  # date ordinals
+        self.last_day = None
+        self.author_ids = {}  # author name -> id
+        self.authors = []  # id -> author name
+        self.author_counts = array('q')
+        self.author_emoji_counts = array('q')
+        self.day_counts = {}  # date ordinal -> count, in first-seen order
+        # Fixed-size counters plus the order each slot was first seen, so
+        # to_summary() reproduces Counter insertion order (and tie-breaking)
+        self.hour_counts = _zeros(24)
+        self.hour_order = []
+        self.weekday_counts = _zeros(7)
+        self.weekday_order = []
+        self.period_counts = _zeros(4)
+        self.period_order = []
+        self.word_counts = Counter() if word_capacity is None else HeavyHitters(word_capacity)
+        self.emoji_counts = Counter()  # normalized emoji sequence -> count
+        # Message length distributions per author id, and of messages without
+        # an author; message_lengths() combines them
+        self.author_lengths = []
+        self.unattributed_lengths = LengthStats()
+        # Size of attached media files; only known for .zip exports (see zip_export)
+        self.media_bytes = 0
+        self.author_media_counts = array('q')
+        self.author_media_bytes = array('q')
+        # Activity: author_id * 24 + hour -> count, and per author id a dict
+        # of date ordinal -> count
+        self.author_hours = array('q')
+        self.author_days = []
+        self.conversations = ConversationStats()
+
+    def intern_author(self, author):
+        """Return the integer id for an author, assigning one if needed"""
+        author_id = self.author_ids.get(author)
+        if author_id is None:
+            author_id = self.author_ids[author] = len(self.authors)
+            self.authors.append(author)
+            self.author_counts.append(0)
+            self.author_emoji_counts.append(0)
+            self.author_lengths.append(LengthStats())
+            self.author_media_counts.append(0)
+            self.author_media_bytes.append(0)
+            self.author_hours.extend(_HOURS_ROW)
+            self.author_days.append({})
+        return author_id
+
+    def add_message(self, dt, author, message):
+        """Add one complete message"""
+        self.total += 1
+        author_id = None
+        if author:
+            author_id = self.intern_author(author)
+            self.author_counts[author_id] += 1
+        if dt:
+            day = dt.toordinal()
+            day_counts = self.day_counts
+            day_counts[day] = day_counts.get(day, 0) + 1
+            hour = dt.hour
+            if not self.hour_counts[hour]:
+                self.hour_order.append(hour)
+            self.hour_counts[hour] += 1
+            weekday = dt.weekday()
+            if not self.weekday_counts[weekday]:
+                self.weekday_order.append(weekday)
+            self.weekday_counts[weekday] += 1
+            period = HOUR_PERIODS[hour]
+            if not self.period_counts[period]:
+                self.period_order.append(period)
+            self.period_counts[period] += 1
+
+            if author_id is not None:
+                self.author_hours[author_id * 24 + hour] += 1
+                author_days = self.author_days[author_id]
+                author_days[day] = author_days.get(day, 0) + 1
+                self.conversations.add(day * 86400 + hour * 3600 + dt.minute * 60 + dt.second, author_id)
+
+            # Track date range
+            if self.first_day is None or day < self.first_day:
+                self.first_day = day
+            if self.last_day is None or day > self.last_day:
+                self.last_day = day
+
+        msg_lower = message.lower()
+        msg_length = len(message)
+        self.total_length += msg_length
+        if author_id is not None:
+            self.author_lengths[author_id].add(msg_length)
+        else:
+            self.unattributed_lengths.add(msg_length)
+
+        # Track longest message
+        if msg_length > self.longest_message_length:
+            self.longest_message_length = msg_length
+            self.longest_message = message[:100] + "..." if len(message) > 100 else message
+
+        # Media detection (omitted media, or attachments in exports with media)
+        if ('<media omitted>' in msg_lower or 'media omitted' in msg_lower or '<image omitted>' in msg_lower or 'image omitted' in msg_lower
+                or '<attached: ' in msg_lower or '(file attached)' in msg_lower):
+            self.media_count += 1
+            if author_id is not None:
+                self.author_media_counts[author_id] += 1
+
+        # Link detection
+        if 'http://' in msg_lower or 'https://' in msg_lower or 'www.' in msg_lower:
+            self.link_count += 1
+
+        # Question detection
+        if '?' in message:
+            self.question_count += 1
+
+        # Emoji sequences (see emojis.py); ASCII-only messages can't contain any
+        if not message.isascii():
+            found = EMOJI_RE.findall(message)
+            if found:
+                self.emoji_count += len(found)
+                self.emoji_counts.update(map(normalize_emoji, found))
+                if author_id is not None:
+                    self.author_emoji_counts[author_id] += len(found)
+
+        # Word analysis (stopwords are filtered in top_words())
+        self.word_counts.update(WORD_RE.findall(msg_lower))
+
+    def add_media_bytes(self, author, nbytes):
+        """Add the size of one attached media file"""
+        self.media_bytes += nbytes
+        if author:
+            self.author_media_bytes[self.intern_author(author)] += nbytes
+
+    def update(self, messages):
+        """Add every (datetime, author, message) tuple from an iterable"""
+        add = self.add_message
+        for dt, author, message in messages:
+            add(dt, author, message)
+        return self
+
+    def merge(self, other):
+        """Fold another ChatStats into this one and return self.
+
+        Merge chunks in file order: first-seen ordering, the earliest longest
+        message and most_common() tie-breaking then match a single pass.
+        other must continue this chat (its first message is taken to follow
+        this one's last); use merge_chat() for separate chats.
+        """
+        return self._merge(other, separate_chat=False)
+
+    def merge_chat(self, other):
+        """Fold the ChatStats of another, unrelated chat into this one and return self.
+
+        Like merge(), except that no reply or session links the two chats.
+        """
+        return self._merge(other, separate_chat=True)
+
+    def _merge(self, other, separate_chat):
+        self.total += other.total
+        self.total_length += other.total_length
+        self.media_count += other.media_count
+        self.emoji_count += other.emoji_count
+        self.link_count += other.link_count
+        self.question_count += other.question_count
+        self.media_bytes += other.media_bytes
+        # Strictly greater, so the earliest longest message wins
+        if other.longest_message_length > self.longest_message_length:
+            self.longest_message_length = other.longest_message_length
+            self.longest_message = other.longest_message
+        if other.first_day is not None and (self.first_day is None or other.first_day < self.first_day):
+            self.first_day = other.first_day
+        if other.last_day is not None and (self.last_day is None or other.last_day > self.last_day):
+            self.last_day = other.last_day
+
+        self.unattributed_lengths.merge(other.unattributed_lengths)
+        id_map = []
+        for author_id, author in enumerate(other.authors):
+            self_id = self.intern_author(author)
+            id_map.append(self_id)
+            self.author_counts[self_id] += other.author_counts[author_id]
+            self.author_emoji_counts[self_id] += other.author_emoji_counts[author_id]
+            self.author_lengths[self_id].merge(other.author_lengths[author_id])
+            self.author_media_counts[self_id] += other.author_media_counts[author_id]
+            self.author_media_bytes[self_id] += other.author_media_bytes[author_id]
+            for slot in range(24):
+                self.author_hours[self_id * 24 + slot] += other.author_hours[author_id * 24 + slot]
+            author_days = self.author_days[self_id]
+            for day, count in other.author_days[author_id].items():
+                author_days[day] = author_days.get(day, 0) + count
+        day_counts = self.day_counts
+        for day, count in other.day_counts.items():
+            day_counts[day] = day_counts.get(day, 0) + count
+        for counts, order, other_counts, other_order in (
+            (self.hour_counts, self.hour_order, other.hour_counts, other.hour_order),
+            (self.weekday_counts, self.weekday_order, other.weekday_counts, other.weekday_order),
+            (self.period_counts, self.period_order, other.period_counts, other.period_order),
+        ):
+            for slot in other_order:
+                if not counts[slot]:
+                    order.append(slot)
+                counts[slot] += other_counts[slot]
+        if isinstance(other.word_counts, HeavyHitters) and not isinstance(self.word_counts, HeavyHitters):
+            # Exact + approximate is approximate
+            sketch = HeavyHitters(other.word_counts.capacity)
+            self.word_counts = sketch.merge(self.word_counts)
+        if isinstance(self.word_counts, HeavyHitters):
+            self.word_counts.merge(other.word_counts)
+        else:
+            self.word_counts.update(other.word_counts)
+        self.emoji_counts.update(other.emoji_counts)
+        if separate_chat:
+            self.conversations.merge_chat(other.conversations, id_map)
+        else:
+            self.conversations.merge(other.conversations, id_map)
+        return self
+
+    def message_lengths(self):
+        """LengthStats over every message"""
+        lengths = LengthStats().merge(self.unattributed_lengths)
+        for author_lengths in self.author_lengths:
+            lengths.merge(author_lengths)
+        return lengths
+
+    def activity_per_user(self):
+        """Per-author activity as (hours, weekdays, days) dicts keyed by author name.
+
+        hours and weekdays map each author to a list of 24 and 7 counts
+        (Monday first); days maps each author to {ISO date: count} for the
+        days they posted on, in date order.
+        """
+        hours, weekdays, days = {}, {}, {}
+        # Authors share most days, so each date is formatted once
+        iso_dates = {}
+        for author_id, author in enumerate(self.authors):
+            hours[author] = self.author_hours[author_id * 24:(author_id + 1) * 24].tolist()
+            weekday_counts = [0] * 7
+            author_days = {}
+            for day, count in sorted(self.author_days[author_id].items()):
+                # date.fromordinal(1) is a Monday
+                weekday_counts[(day + 6) % 7] += count
+                iso = iso_dates.get(day)
+                if iso is None:
+                    iso = iso_dates[day] = date.fromordinal(day).isoformat()
+                author_days[iso] = count
+            weekdays[author] = weekday_counts
+            days[author] = author_days
+        return hours, weekdays, days
+
+    def top_words(self, n=20):
+        """The n most common non-stopword words as (word, count) pairs"""
+        # most_common() is a stable sort, so filtering afterwards keeps the
+        # tie order of filtering first
+        candidates = self.word_counts.most_common(n + len(STOPWORDS))
+        return [(w, c) for w, c in candidates if w not in STOPWORDS][:n]
+
+    def to_summary(self, top_n=20):
+        """Build the summary dict returned by main.analyze()"""
+        total = self.total
+        per_user = Counter(dict(zip(self.authors, self.author_counts)))
+        per_day = Counter({date.fromordinal(day).isoformat(): count for day, count in self.day_counts.items()})
+        per_hour = Counter({hour: self.hour_counts[hour] for hour in self.hour_order})
+        per_weekday = Counter({WEEKDAY_NAMES[d]: self.weekday_counts[d] for d in self.weekday_order})
+        active_periods = {PERIOD_NAMES[p]: self.period_counts[p] for p in self.period_order}
+        first_date = date.fromordinal(self.first_day) if self.first_day is not None else None
+        last_date = date.fromordinal(self.last_day) if self.last_day is not None else None
+        hours_per_user, weekdays_per_user, days_per_user = self.activity_per_user()
+        conversations = self.conversations.to_summary(self.authors)
+        media_count = self.media_count
+        emoji_count = self.emoji_count
+        link_count = self.link_count
+        question_count = self.question_count
+
+        # Calculate statistics
+        avg_message_length = self.total_length / total if total else 0
+        total_days = (last_date - first_date).days + 1 if first_date and last_date else 1
+        messages_per_day_avg = total / total_days if total_days > 0 else 0
+
+        # Determine most active user
+        most_active_user = per_user.most_common(1)[0] if per_user else (None, 0)
+
+        # Calculate user participation percentage
+        user_percentages = {}
+        if total > 0:
+            for user, count in per_user.items():
+                user_percentages[user] = (count / total) * 100
+
+        # Determine most active time period
+        most_active_period = max(active_periods.items(), key=lambda x: x[1]) if active_periods else (None, 0)
+
+        # Determine most active day of week
+        most_active_day = max(per_weekday.items(), key=lambda x: x[1]) if per_weekday else (None, 0)
+
+        # Generate insights
+        insights = []
+        if total > 0:
+            insights.append(f"📊 Analyzed {total:,} messages across {total_days} days")
+            insights.append(f"💬 Average of {messages_per_day_avg:.1f} messages per day")
+            if most_active_user[0]:
+                insights.append(f"🏆 {most_active_user[0]} is the most active with {most_active_user[1]:,} messages ({user_percentages.get(most_active_user[0], 0):.1f}%)")
+            if most_active_period[0]:
+                insights.append(f"⏰ Most active time: {most_active_period[0]} ({most_active_period[1]:,} messages)")
+            if most_active_day[0]:
+                insights.append(f"📅 Most active day: {most_active_day[0]} ({most_active_day[1]:,} messages)")
+            if media_count > 0:
+                insights.append(f"🖼️ {media_count:,} media files shared")
+            if link_count > 0:
+                insights.append(f"🔗 {link_count:,} links shared")
+            if question_count > 0:
+                insights.append(f"❓ {question_count:,} questions asked")
+            if emoji_count > 0:
+                favourite = self.emoji_counts.most_common(1)[0][0]
+                insights.append(f"😊 {emoji_count:,} emojis used, {favourite} most often")
+            if conversations['sessions']:
+                starter, started = next(iter(conversations['sessions_started_per_user'].items()))
+                insights.append(f"🗣️ {conversations['sessions']:,} conversations, {starter} started {started:,} of them")
+            insights.append(f"📝 Average message length: {avg_message_length:.0f} characters")
+
+        summary = {
+            'total_messages': total,
+            'per_user': per_user,
+            'per_day': per_day,
+            'per_hour': per_hour,
+            'per_weekday': per_weekday,
+            'hours_per_user': hours_per_user,
+            'weekdays_per_user': weekdays_per_user,
+            'days_per_user': days_per_user,
+            'top_words': self.top_words(top_n),
+            'top_emojis': self.emoji_counts.most_common(top_n),
+            'emojis_per_user': dict(zip(self.authors, self.author_emoji_counts)),
+            'media_count': media_count,
+            'media_bytes': self.media_bytes,
+            'media_per_user': {author: {'count': count, 'bytes': nbytes} for author, count, nbytes
+                               in zip(self.authors, self.author_media_counts, self.author_media_bytes)},
+            'emoji_count': emoji_count,
+            'link_count': link_count,
+            'question_count': question_count,
+            'avg_message_length': round(avg_message_length, 1),
+            'message_length': self.message_lengths().to_dict(),
+            'message_length_per_user': {author: lengths.to_dict()
+                                        for author, lengths in zip(self.authors, self.author_lengths)},
+            'longest_message': self.longest_message,
+            'longest_message_length': self.longest_message_length,
+            'first_date': first_date.isoformat() if first_date else None,
+            'last_date': last_date.isoformat() if last_date else None,
+            'total_days': total_days,
+            'messages_per_day_avg': round(messages_per_day_avg, 2),
+            'user_percentages': user_percentages,
+            'active_periods': active_periods,
+            'most_active_user': most_active_user[0] if most_active_user[0] else None,
+            'most_active_period': most_active_period[0] if most_active_period[0] else None,
+            'most_active_day': most_active_day[0] if most_active_day[0] else None,
+            'insights': insights
+        }
+        summary.update(conversations)
+        if isinstance(self.word_counts, HeavyHitters):
+            # Each top word count is a lower bound; the true count is at most count + error
+            summary['top_words_approximate'] = True
+            summary['top_words_error'] = self.word_counts.error
+        return summary
+
+    # -- serialization -------------------------------------------------
+
+    def to_bytes(self):
+        """Serialize to a compact, zlib-compressed binary blob"""
+        out = []
+        out.append(struct.pack(
+            '<9q',
+            self.total, self.total_length, self.media_count, self.emoji_count,
+            self.link_count, self.question_count, self.longest_message_length,
+            self.first_day or 0, self.last_day or 0,
+        ))
+        _pack_strings(out, [self.longest_message])
+        _pack_strings(out, self.authors)
+        _pack_ints(out, self.author_counts)
+        _pack_ints(out, self.author_emoji_counts)
+        _pack_ints(out, list(self.day_counts))
+        _pack_ints(out, list(self.day_counts.values()))
+        for counts, order in ((self.hour_counts, self.hour_order),
+                              (self.weekday_counts, self.weekday_order),
+                              (self.period_counts, self.period_order)):
+            _pack_ints(out, counts)
+            _pack_ints(out, order)
+        _pack_strings(out, list(self.word_counts))
+        _pack_ints(out, list(self.word_counts.values()))
+        sketch = self.word_counts if isinstance(self.word_counts, HeavyHitters) else None
+        out.append(struct.pack('<3q', sketch is not None, sketch.capacity if sketch else 0, sketch.error if sketch else 0))
+        _pack_strings(out, list(self.emoji_counts))
+        _pack_ints(out, list(self.emoji_counts.values()))
+        for lengths in [self.unattributed_lengths, *self.author_lengths]:
+            _pack_lengths(out, lengths)
+        _pack_ints(out, [self.media_bytes])
+        _pack_ints(out, self.author_media_counts)
+        _pack_ints(out, self.author_media_bytes)
+        _pack_ints(out, self.author_hours)
+        for author_days in self.author_days:
+            _pack_ints(out, list(author_days))
+            _pack_ints(out, list(author_days.values()))
+        _pack_conversations(out, self.conversations)
+        return _MAGIC + zlib.compress(b''.join(out))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Load a ChatStats written by to_bytes()"""
+        if blob[:4] != _MAGIC:
+            raise ValueError("Not a serialized ChatStats blob")
+        buf = memoryview(zlib.decompress(blob[4:]))
+        stats = cls()
+        (stats.total, stats.total_length, stats.media_count, stats.emoji_count,
+         stats.link_count, stats.question_count, stats.longest_message_length,
+         first_day, last_day) = struct.unpack_from('<9q', buf)
+        stats.first_day = first_day or None
+        stats.last_day = last_day or None
+        pos = struct.calcsize('<9q')
+        (stats.longest_message,), pos = _unpack_strings(buf, pos)
+        stats.authors, pos = _unpack_strings(buf, pos)
+        stats.author_ids = {author: i for i, author in enumerate(stats.authors)}
+        stats.author_counts, pos = _unpack_ints(buf, pos)
+        stats.author_emoji_counts, pos = _unpack_ints(buf, pos)
+        days, pos = _unpack_ints(buf, pos)
+        day_values, pos = _unpack_ints(buf, pos)
+        stats.day_counts = dict(zip(days, day_values))
+        stats.hour_counts, pos = _unpack_ints(buf, pos)
+        order, pos = _unpack_ints(buf, pos)
+        stats.hour_order = list(order)
+        stats.weekday_counts, pos = _unpack_ints(buf, pos)
+        order, pos = _unpack_ints(buf, pos)
+        stats.weekday_order = list(order)
+        stats.period_counts, pos = _unpack_ints(buf, pos)
+        order, pos = _unpack_ints(buf, pos)
+        stats.period_order = list(order)
+        words, pos = _unpack_strings(buf, pos)
+        word_values, pos = _unpack_ints(buf, pos)
+        is_sketch, capacity, error = struct.unpack_from('<3q', buf, pos)
+        pos += struct.calcsize('<3q')
+        if is_sketch:
+            stats.word_counts = HeavyHitters(capacity)
+            dict.update(stats.word_counts, zip(words, word_values))
+            stats.word_counts.error = error
+        else:
+            stats.word_counts = Counter(dict(zip(words, word_values)))
+        emojis, pos = _unpack_strings(buf, pos)
+        emoji_values, pos = _unpack_ints(buf, pos)
+        stats.emoji_counts = Counter(dict(zip(emojis, emoji_values)))
+        stats.unattributed_lengths, pos = _unpack_lengths(buf, pos)
+        stats.author_lengths = []
+        for _ in stats.authors:
+            lengths, pos = _unpack_lengths(buf, pos)
+            stats.author_lengths.append(lengths)
+        (stats.media_bytes,), pos = _unpack_ints(buf, pos)
+        stats.author_media_counts, pos = _unpack_ints(buf, pos)
+        stats.author_media_bytes, pos = _unpack_ints(buf, pos)
+        stats.author_hours, pos = _unpack_ints(buf, pos)
+        stats.author_days = []
+        for _ in stats.authors:
+            days, pos = _unpack_ints(buf, pos)
+            day_values, pos = _unpack_ints(buf, pos)
+            stats.author_days.append(dict(zip(days, day_values)))
+        stats.conversations, pos = _unpack_conversations(buf, pos)
+        return stats
+
+
+def _pack_ints(out, values):
+    out.append(struct.pack(f'<I{len(values)}q', len(values), *values))
+
+
+def _unpack_ints(buf, pos):
+    (n,) = struct.unpack_from('<I', buf, pos)
+    pos += 4
+    values = array('q', struct.unpack_from(f'<{n}q', buf, pos))
+    return values, pos + 8 * n
+
+
+def _pack_lengths(out, lengths):
+    header, sums, used, counts = lengths.to_state()
+    _pack_ints(out, header)
+    _pack_strings(out, sums)
+    _pack_ints(out, used)
+    _pack_ints(out, counts)
+
+
+def _unpack_lengths(buf, pos):
+    header, pos = _unpack_ints(buf, pos)
+    sums, pos = _unpack_strings(buf, pos)
+    used, pos = _unpack_ints(buf, pos)
+    counts, pos = _unpack_ints(buf, pos)
+    return LengthStats.from_state(header, sums, used, counts), pos
+
+
+def _pack_conversations(out, conversations):
+    head = conversations.head
+    last = conversations.last_time
+    _pack_ints(out, [head is not None, *(head or (0, 0)),
+                     last is not None, last or 0, conversations.last_author or 0])
+    _pack_ints(out, list(conversations.started))
+    _pack_ints(out, list(conversations.started.values()))
+    _pack_ints(out, list(conversations.latencies))
+    for latencies in conversations.latencies.values():
+        _pack_ints(out, list(latencies))
+        _pack_ints(out, list(latencies.values()))
+    _pack_ints(out, [replier for replier, _ in conversations.pairs])
+    _pack_ints(out, [replied_to for _, replied_to in conversations.pairs])
+    _pack_ints(out, [n for pair in conversations.pairs.values() for n in pair])
+
+
+def _unpack_conversations(buf, pos):
+    conversations = ConversationStats()
+    (has_head, head_time, head_author, has_last, last_time, last_author), pos = _unpack_ints(buf, pos)
+    if has_head:
+        conversations.head = (head_time, head_author)
+    if has_last:
+        conversations.last_time, conversations.last_author = last_time, last_author
+    authors, pos = _unpack_ints(buf, pos)
+    counts, pos = _unpack_ints(buf, pos)
+    conversations.started = dict(zip(authors, counts))
+    authors, pos = _unpack_ints(buf, pos)
+    for author_id in authors:
+        seconds, pos = _unpack_ints(buf, pos)
+        counts, pos = _unpack_ints(buf, pos)
+        conversations.latencies[author_id] = dict(zip(seconds, counts))
+    repliers, pos = _unpack_ints(buf, pos)
+    replied_to, pos = _unpack_ints(buf, pos)
+    counts, pos = _unpack_ints(buf, pos)
+    size = len(counts) // len(repliers) if repliers else 0
+    for i, key in enumerate(zip(repliers, replied_to)):
+        conversations.pairs[key] = counts[i * size:(i + 1) * size]
+    return conversations, pos
+
+
+def _pack_strings(out, strings):
+    encoded = [s.encode('utf-8') for s in strings]
+    _pack_ints(out, [len(e) for e in encoded])
+    out.append(b''.join(encoded))
+
+
+def _unpack_strings(buf, pos):
+    lengths, pos = _unpack_ints(buf, pos)
+    strings = []
+    for n in lengths:
+        strings.append(str(buf[pos:pos + n], 'utf-8'))
+        pos += n
+    return strings, pos
@@ -0,0 +1,37 @@
+"""Batch mode: one JSON line per chat, failures isolated, combined aggregate."""
+import io
+import json
+
+from batch import find_exports, run_batch
+from benchmarks.synth import write_export
+from main import collect_stats
+from stats import ChatStats
+
+
+def test_batch_isolates_failures_and_combines(tmp_path):
+    (tmp_path / 'nested').mkdir()
+    write_export(str(tmp_path / 'a.txt'), 500, seed=1)
+    write_export(str(tmp_path / 'nested' / 'b.txt'), 800, seed=2)
+    (tmp_path / 'broken.txt').write_text('not a chat\n')
+    (tmp_path / 'notes.md').write_text('ignored\n')
+    paths = find_exports([str(tmp_path)])
+    assert [p.rsplit('/', 1)[1] for p in paths] == ['a.txt', 'broken.txt', 'b.txt']
+
+    out = io.StringIO()
+    combined, counts = run_batch(paths, out, workers=2)
+    records = {r['file']: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert counts['ok'] == 2 and counts['failed'] == 1
+    assert not records[paths[1]]['ok'] and 'No messages' in records[paths[1]]['error']
+    assert records[paths[0]]['summary']['total_messages'] == 500
+
+    first, second = collect_stats(paths[0]), collect_stats(paths[2])
+    summary = combined.to_summary()
+    assert summary['total_messages'] == first.total + second.total
+    # Separate chats: no session or reply spans the two
+    assert summary['sessions'] == first.to_summary()['sessions'] + second.to_summary()['sessions']
+    replies = {user: times['replies'] for user, times in summary['response_time_per_user'].items()}
+    for stats in (first, second):
+        for user, times in stats.to_summary()['response_time_per_user'].items():
+            replies[user] -= times['replies']
+    assert set(replies.values()) == {0}
+    assert summary == ChatStats().merge_chat(first).merge_chat(second).to_summary()
@@ -0,0 +1,92 @@
+"""Range and user queries from the count cube match re-analyzing those messages."""
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.synth import write_export
+from count_cube import CountCube
+from main import collect_stats
+from message_store import messages_between, open_store
+from stats import ChatStats
+
+
+def test_queries_match_filtered_messages(tmp_path):
+    write_export(str(tmp_path / 'chat.txt'), 3000, seed=8)
+    collect_stats(str(tmp_path / 'chat.txt'), store_dir=str(tmp_path / 'store'))
+    with open_store(str(tmp_path / 'store')) as store:
+        cube = CountCube.from_store(store)
+        first = date.fromordinal(cube.first_day)
+        ranges = [(None, None), (first + timedelta(3), first + timedelta(40)),
+                  (first - timedelta(10), first), (first + timedelta(cube.n_days + 5), None)]
+        for start, end in ranges:
+            for author in [None] + store.authors[:2]:
+                lo = datetime.combine(start, datetime.min.time()) if start else None
+                hi = datetime.combine(end + timedelta(1), datetime.min.time()) if end else None
+                expected = ChatStats().update(messages_between(store, lo, hi, author)).to_summary()
+                result = cube.query(start, end, author)
+                assert result['total_messages'] == expected['total_messages']
+                for key in ('per_day', 'per_hour', 'per_weekday', 'active_periods'):
+                    assert result[key] == dict(expected[key])
+                assert result['per_user'] == {user: n for user, n in expected['per_user'].items() if n}
+
+
+def test_cube_cache_bounded_by_bytes(tmp_path):
+    from count_cube import CubeCache
+    write_export(str(tmp_path / 'chat.txt'), 500, seed=3)
+    collect_stats(str(tmp_path / 'chat.txt'), store_dir=str(tmp_path / 'store'))
+    with open_store(str(tmp_path / 'store')) as store:
+        cube = CountCube.from_store(store)
+    cache = CubeCache(2 * cube.nbytes)
+    builds = []
+    for key in ('a', 'b', 'a', 'c', 'a', 'b'):
+        cache.get(key, lambda: builds.append(key) or cube)
+    # 'b' was least recently used when 'c' came in, and had to be rebuilt
+    assert builds == ['a', 'b', 'c', 'b'] and cache.nbytes <= 2 * cube.nbytes
+    too_big = CubeCache(cube.nbytes - 1)
+    assert too_big.get('a', lambda: cube) is cube and too_big.nbytes == 0
+
+
+def test_evicted_store_is_not_served_from_cache(tmp_path, monkeypatch):
+    import app
+    from count_cube import CubeCache
+    from retention import Retention
+    digest = 'a' * 64
+    write_export(str(tmp_path / 'chat.txt'), 500, seed=5)
+    collect_stats(str(tmp_path / 'chat.txt'), store_dir=str(tmp_path / 'stores' / digest),
+                  store_source={'sha256': digest})
+    monkeypatch.setattr(app, 'STORES_DIR', str(tmp_path / 'stores'))
+    monkeypatch.setattr(app, 'cube_cache', CubeCache(64 * 1024 * 1024))
+    client = app.app.test_client()
+    assert client.get(f'/api/summary?chat={digest}').status_code == 200
+    assert app.cube_cache.nbytes > 0
+
+    # A sweep of the stores' retention drops the cached cube with the store
+    retention = Retention(str(tmp_path / 'stores'), ttl_seconds=60, directories=True,
+                          on_evict=lambda name, reason, size: app.forget_chat(name))
+    retention.scan()
+    retention.sweep(now=time.time() + 120)
+    assert app.cube_cache.nbytes == 0
+    assert client.get(f'/api/summary?chat={digest}').status_code == 404
+
+
+def test_per_day_series_revalidated_and_dropped_with_store(tmp_path, monkeypatch):
+    import shutil
+    import app
+    from count_cube import CubeCache
+    digest = 'b' * 64
+    write_export(str(tmp_path / 'chat.txt'), 500, seed=6)
+    collect_stats(str(tmp_path / 'chat.txt'), store_dir=str(tmp_path / 'stores' / digest),
+                  store_source={'sha256': digest})
+    monkeypatch.setattr(app, 'STORES_DIR', str(tmp_path / 'stores'))
+    monkeypatch.setattr(app, 'cube_cache', CubeCache(64 * 1024 * 1024))
+    client = app.app.test_client()
+    url = f'/api/per_day?chat={digest}&points=50'
+    response = client.get(url)
+    assert response.status_code == 200 and response.get_json()['counts']
+    assert 'no-cache' in response.headers['Cache-Control']
+    assert any(key[0] == digest for key in app._per_day_cache)
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    # Removed by another process's sweep: neither the process nor the browser keeps serving it
+    shutil.rmtree(tmp_path / 'stores' / digest)
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 404
+    assert not any(key[0] == digest for key in app._per_day_cache)
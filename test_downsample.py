@@ -0,0 +1,24 @@
+"""LTTB downsampling of the messages-per-day chart series."""
+from datetime import date, timedelta
+
+from downsample import downsample_days, lttb
+
+
+def test_lttb_keeps_ends_and_spikes():
+    xs = list(range(1000))
+    ys = [i % 7 for i in xs]
+    ys[321], ys[654] = 500, -500
+    kept = lttb(xs, ys, 40)
+    assert len(kept) == 40 and kept == sorted(set(kept))
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 321 in kept and 654 in kept
+    assert lttb(xs[:10], ys[:10], 40) == list(range(10))
+
+
+def test_downsample_days():
+    first = date(2020, 1, 1)
+    per_day = {(first + timedelta(i * 2)).isoformat(): i for i in range(500)}
+    dates, counts = downsample_days(per_day, 50)
+    assert len(dates) == 50 and dates == sorted(dates)
+    assert all(per_day[day] == count for day, count in zip(dates, counts))
+    assert downsample_days(per_day, 500) == (sorted(per_day), [per_day[day] for day in sorted(per_day)])
@@ -0,0 +1,43 @@
+"""Emoji sequences are counted once each, and other scripts are not emoji."""
+import pytest
+
+from emojis import count_emojis, emoji_counter, find_emojis, normalize
+
+
+@pytest.mark.parametrize('text,expected', [
+    ('hi 😂😂', 2),
+    ('ok 👍🏽 done', 1),  # skin tone modifier
+    ('family 👨\u200d👩\u200d👧 here', 1),  # ZWJ sequence
+    ('👩🏽\u200d💻', 1),  # skin tone inside a ZWJ sequence
+    ('❤\ufe0f\u200d🔥 🏳\ufe0f\u200d🌈', 2),  # selectors inside ZWJ sequences
+    ('🇮🇳🇺🇸', 2),  # flags
+    ('🏴\U000e0067\U000e0062\U000e0073\U000e0063\U000e0074\U000e007f', 1),  # subdivision flag
+    ('key 1\ufe0f\u20e3 #\ufe0f\u20e3', 2),  # keycaps
+    ('❤ and ❤\ufe0f', 2),
+    ('© 2020 ™', 0),  # text presentation symbols
+    ('©\ufe0f', 1),
+    ('Привет мир', 0),
+    ('今天晚上一起吃饭吗', 0),
+    ('naïve café → ✓', 0),
+    ('plain ascii 123 #*', 0),
+])
+def test_count_emojis(text, expected):
+    assert count_emojis(text) == expected
+
+
+def test_emoji_counter_normalizes_selectors():
+    counts = emoji_counter(['❤\ufe0f ❤', '1\u20e3 1\ufe0f\u20e3', 'no emoji'])
+    assert counts == {'❤': 2, '1\ufe0f\u20e3': 2}
+    assert normalize(find_emojis('🏳\ufe0f\u200d🌈')[0]) == '🏳\u200d🌈'
+
+
+def test_stats_emoji_tables():
+    from main import iter_messages
+    from stats import ChatStats
+    lines = ['01/01/2024, 10:00 - Ann: привет 😂 👍🏽\n',
+             '01/01/2024, 10:01 - Bob: 😂\n',
+             '01/01/2024, 10:02 - Ann: 中文 only\n']
+    summary = ChatStats().update(iter_messages(lines)).to_summary()
+    assert summary['emoji_count'] == 3
+    assert summary['top_emojis'] == [('😂', 2), ('👍🏽', 1)]
+    assert summary['emojis_per_user'] == {'Ann': 2, 'Bob': 1}
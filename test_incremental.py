@@ -0,0 +1,50 @@
+"""Incremental analysis must match a full re-analysis of the grown export."""
+from main import analyze
+from incremental import analyze_incremental
+from benchmarks.synth import generate_lines
+
+
+def _write(path, lines):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(lines)
+
+
+def test_append_parses_only_the_tail(tmp_path):
+    lines = list(generate_lines(3000, seed=9))
+    export, state = str(tmp_path / 'chat.txt'), str(tmp_path / 'chat.state')
+    split = next(i for i in range(2000, len(lines)) if lines[i][0].isdigit())
+
+    _write(export, lines[:split])
+    summary, info = analyze_incremental(export, state, top_n=15)
+    assert info['mode'] == 'full'
+    assert summary == analyze(export, top_n=15)
+
+    _write(export, lines)
+    summary, info = analyze_incremental(export, state, top_n=15)
+    assert info['mode'] == 'append'
+    assert info['new_messages'] == 3000 - sum(1 for line in lines[:split] if line[0].isdigit())
+    assert summary == analyze(export, top_n=15)
+
+    summary, info = analyze_incremental(export, state, top_n=15)
+    assert info['mode'] == 'unchanged' and info['new_messages'] == 0
+    assert summary == analyze(export, top_n=15)
+
+
+def test_anchor_and_fallback(tmp_path):
+    lines = list(generate_lines(1500, seed=4))
+    export, state = str(tmp_path / 'chat.txt'), str(tmp_path / 'chat.state')
+    _write(export, lines[:1000])
+    analyze_incremental(export, state)
+
+    # The head changed (e.g. re-exported with a different first line), but
+    # the old tail is still there: resume right after it
+    _write(export, ['Messages are end-to-end encrypted.\n'] + lines)
+    _, info = analyze_incremental(export, state)
+    assert info['mode'] == 'anchor'
+
+    # An unrelated export is analyzed from scratch
+    other = list(generate_lines(200, seed=99))
+    _write(export, other)
+    summary, info = analyze_incremental(export, state, top_n=5)
+    assert info['mode'] == 'full'
+    assert summary == analyze(export, top_n=5)
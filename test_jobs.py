@@ -0,0 +1,116 @@
+"""JobQueue and the /jobs routes: polling, back-pressure, failures and expiry."""
+import threading
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, QueueFull
+
+
+def wait_for(job, *statuses):
+    deadline = time.time() + 10
+    while job.status not in statuses:
+        assert time.time() < deadline, job.status
+        time.sleep(0.01)
+    return job
+
+
+def poll(client, job_id, *statuses):
+    deadline = time.time() + 10
+    while True:
+        payload = client.get(f'/jobs/{job_id}').get_json()
+        if payload['status'] in statuses:
+            return payload
+        assert time.time() < deadline, payload
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def app_client(tmp_path, monkeypatch):
+    import app
+    from report_cache import ReportCache
+    for name in ('reports', 'stores'):
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(app, 'REPORTS_DIR', str(tmp_path / 'reports'))
+    monkeypatch.setattr(app, 'STORES_DIR', str(tmp_path / 'stores'))
+    monkeypatch.setattr(app, 'report_cache', ReportCache(str(tmp_path / 'cache'), str(tmp_path / 'reports')))
+    queue = JobQueue(workers=1, max_queued=1)
+    monkeypatch.setattr(app, 'job_queue', queue)
+    yield app, app.app.test_client()
+    queue.shutdown()
+
+
+def upload(client):
+    with open('sample_chat.txt', 'rb') as f:
+        return client.post('/jobs', data={'file': (f, 'sample_chat.txt'), 'top_n': '5'})
+
+
+def test_submit_poll_result():
+    queue = JobQueue(workers=1)
+    release = threading.Event()
+    job = queue.submit(lambda x: release.wait(10) and x * 2, 21)
+    assert wait_for(job, RUNNING).result is None and queue.metrics()['running'] == 1
+    release.set()
+    assert wait_for(job, DONE, FAILED).status == DONE
+    assert queue.get(job.id).result == 42 and queue.get(job.id).duration >= 0
+    assert queue.metrics()['completed'] == 1 and queue.get('unknown') is None
+    queue.shutdown()
+
+
+def test_job_routes_end_to_end(app_client):
+    app, client = app_client
+    response = upload(client)
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+    assert poll(client, job_id, DONE, FAILED)['status'] == DONE
+    report = client.get(f'/jobs/{job_id}/result')
+    assert report.status_code == 200 and b'report_' in report.data
+    assert client.get('/jobs/unknown').status_code == 404
+
+
+def test_full_queue_answers_503(app_client):
+    app, client = app_client
+    release = threading.Event()
+    try:
+        running = app.job_queue.submit(release.wait, 10)
+        wait_for(running, RUNNING)
+        waiting = app.job_queue.submit(release.wait, 10)
+        assert waiting.status == QUEUED
+        response = upload(client)
+        assert response.status_code == 503 and 'retry' in response.get_json()['error']
+        assert app.job_queue.metrics()['rejected'] == 1
+        with pytest.raises(QueueFull):
+            app.job_queue.submit(release.wait, 10)
+    finally:
+        release.set()
+    wait_for(waiting, DONE)
+
+
+def test_failed_job_shows_error_page(app_client, monkeypatch):
+    app, client = app_client
+
+    def broken(*args):
+        raise ValueError('No messages found in the export')
+
+    monkeypatch.setattr(app, 'analyze_upload', broken)
+    job_id = upload(client).get_json()['id']
+    payload = poll(client, job_id, DONE, FAILED)
+    assert payload['status'] == FAILED and 'No messages found' in payload['error']
+    response = client.get(f'/jobs/{job_id}/result')
+    assert response.status_code == 400 and b'No messages found' in response.data
+
+
+def test_finished_jobs_expire():
+    queue = JobQueue(workers=1, retention_seconds=60)
+    release = threading.Event()
+    finished = wait_for(queue.submit(lambda: None), DONE)
+    running = wait_for(queue.submit(release.wait, 10), RUNNING)
+    finished.finished_at -= 30
+    queue.submit(lambda: None)
+    assert queue.get(finished.id) is finished
+    finished.finished_at -= 60
+    queue.submit(lambda: None)
+    # Expired once finished retention_seconds ago; unfinished jobs are kept
+    assert queue.get(finished.id) is None and queue.get(running.id) is running
+    release.set()
+    queue.shutdown()
@@ -0,0 +1,49 @@
+"""Streaming length percentiles: exact for short messages, within one bucket otherwise."""
+import math
+import random
+
+from length_stats import N_BUCKETS, LengthStats, bucket_bounds, bucket_index
+
+
+def nearest_rank(values, q):
+    values = sorted(values)
+    return values[max(1, math.ceil(q / 100 * len(values))) - 1]
+
+
+def test_buckets_cover_lengths():
+    for length in list(range(5000)) + [2 ** 20 + 12345, 2 ** 30]:
+        index = bucket_index(length)
+        low, high = bucket_bounds(index)
+        assert index == N_BUCKETS - 1 or low <= length <= high
+
+
+def test_percentiles_and_merge():
+    rng = random.Random(3)
+    short = [rng.randint(1, 127) for _ in range(5000)]
+    long = [int(rng.lognormvariate(6, 1.5)) for _ in range(5000)]
+    for values in (short, long):
+        stats = LengthStats()
+        for n in values:
+            stats.add(n)
+        for q in (50, 90, 99):
+            expected = nearest_rank(values, q)
+            tolerance = 0 if expected < 128 else expected / 32
+            assert abs(stats.percentile(q) - expected) <= tolerance
+        assert stats.max == max(values)
+        assert math.isclose(stats.stdev, (sum((n - stats.mean) ** 2 for n in values) / len(values)) ** 0.5)
+
+        halves = LengthStats(), LengthStats()
+        for i, n in enumerate(values):
+            halves[i % 2].add(n)
+        merged = halves[0].merge(halves[1])
+        assert merged.to_dict() == stats.to_dict()
+
+
+def test_summary_length_tables():
+    from main import analyze
+    summary = analyze('sample_chat.txt')
+    lengths = summary['message_length']
+    assert lengths['count'] == summary['total_messages']
+    assert lengths['max'] == summary['longest_message_length']
+    assert set(summary['message_length_per_user']) == set(summary['per_user'])
+    assert analyze('sample_chat.txt', backend='pandas')['message_length_per_user'] == summary['message_length_per_user']
@@ -0,0 +1,84 @@
+"""Screenshot OCR pipeline, with a fake engine standing in for Tesseract."""
+import pytest
+
+import ocr
+from main import analyze
+
+SCREENS = [
+    '01/01/2024, 10:00 - Ann: morning\n01/01/2024, 10:01 - Bob: hi there\n',
+    '\n01/01/2024, 10:01 - Bob: hi there\n01/01/2024, 10:02 - Ann: lunch?\n',  # scrolled by one line
+    '01/01/2024, 10:03 - Bob: sure\n',
+]
+
+
+def fake_ocr(image_path):
+    """'OCR' a screenshot stand-in that holds its text as UTF-8"""
+    with open(image_path, encoding='utf-8') as f:
+        return f.read()
+
+
+def failing_ocr(image_path):
+    raise AssertionError('cached images must not be OCR\'d again')
+
+
+@pytest.fixture
+def screenshots(tmp_path):
+    paths = []
+    for i, text in enumerate(SCREENS):
+        path = tmp_path / f'shot{i}.png'
+        path.write_text(text, encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+def test_parallel_cached_ocr_keeps_order(screenshots, tmp_path):
+    cache = ocr.OcrCache(str(tmp_path / 'cache'))
+    texts = ocr.ocr_images(screenshots, workers=2, cache=cache, engine=fake_ocr)
+    assert texts == SCREENS
+    assert ocr.ocr_images(screenshots[::-1], workers=2, cache=cache, engine=failing_ocr) == SCREENS[::-1]
+
+
+def test_stitch_drops_scrolled_overlap():
+    assert ocr.stitch_texts(SCREENS).splitlines() == [
+        '01/01/2024, 10:00 - Ann: morning',
+        '01/01/2024, 10:01 - Bob: hi there',
+        '01/01/2024, 10:02 - Ann: lunch?',
+        '01/01/2024, 10:03 - Bob: sure',
+    ]
+
+
+def test_stitch_keeps_message_boundaries():
+    from main import iter_messages
+    text = ('01/01/2024, 10:00 - Ann: first\nstill first\n\nafter a blank line\n'
+            '01/01/2024, 10:01 - Bob: ok\n')
+    stitched = ocr.stitch_texts([text])
+    assert list(iter_messages(stitched.splitlines())) == list(iter_messages(text.splitlines()))
+    assert '\n\n' in stitched
+
+
+def test_stitch_keeps_repeated_lines_without_timestamp():
+    first = '01/01/2024, 10:00 - Ann: list:\nmilk\n'
+    second = 'milk\n01/01/2024, 10:01 - Bob: got it\n'
+    # 'milk' twice is content; only runs with a timestamped message line are overlap
+    assert ocr.stitch_texts([first, second]).splitlines() == [
+        '01/01/2024, 10:00 - Ann: list:', 'milk', 'milk', '01/01/2024, 10:01 - Bob: got it']
+    scrolled = 'milk\n01/01/2024, 10:01 - Bob: got it\n01/01/2024, 10:02 - Ann: thanks\n'
+    assert ocr.stitch_texts([first + '01/01/2024, 10:01 - Bob: got it\n', scrolled]).splitlines() == [
+        '01/01/2024, 10:00 - Ann: list:', 'milk', '01/01/2024, 10:01 - Bob: got it',
+        '01/01/2024, 10:02 - Ann: thanks']
+
+
+def test_analyze_screenshots(screenshots, monkeypatch):
+    monkeypatch.setattr(ocr, 'ENGINE', fake_ocr)
+    summary = analyze(screenshots, is_image=True)
+    assert summary['total_messages'] == 4
+    assert summary['per_user'] == {'Ann': 2, 'Bob': 2}
+
+
+def test_binarize_inverts_dark_mode():
+    light = [0] * 256
+    light[20], light[240] = 100, 900  # dark text on a light background
+    dark = [0] * 256
+    dark[20], dark[240] = 900, 100  # light text on a dark background
+    assert ocr.binarize_table(light)[20] == 0 and ocr.binarize_table(light)[240] == 255
+    assert ocr.binarize_table(dark)[20] == 255 and ocr.binarize_table(dark)[240] == 0
@@ -0,0 +1,96 @@
+"""Chunked, multi-process analysis must match the serial path exactly."""
+from main import (SNIFF_LINES, analyze, detect_format, find_chunk_boundaries, iter_file_range, iter_lines,
+                  iter_messages, iter_messages_mmap)
+from benchmarks.synth import generate_lines
+
+
+def _write_chat(path, newline='\n'):
+    lines = ['Some header line without a timestamp\n']
+    for i, line in enumerate(generate_lines(3000, seed=11)):
+        lines.append(line)
+        if i % 97 == 0:
+            lines.append('\n')
+            lines.append('orphan line after a blank\n')
+    path.write_text(''.join(lines).replace('\n', newline), encoding='utf-8', newline='')
+    return str(path)
+
+
+def _ordered(summary):
+    """Summary with Counters/dicts flattened to lists so key order is compared too"""
+    return {k: list(v.items()) if hasattr(v, 'items') else v for k, v in summary.items()}
+
+
+def test_parallel_matches_serial(tmp_path):
+    for newline in ('\n', '\r\n'):
+        path = _write_chat(tmp_path / 'chat.txt', newline)
+        serial = analyze(path, top_n=50)
+        parallel = analyze(path, top_n=50, workers=4)
+        assert _ordered(parallel) == _ordered(serial)
+
+
+def test_chunks_start_on_message_lines(tmp_path):
+    path = _write_chat(tmp_path / 'chat.txt')
+    boundaries = find_chunk_boundaries(path, 8)
+    assert boundaries[0] == 0 and len(boundaries) > 2
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert boundaries[-1] == len(data)
+    for offset in boundaries[1:-1]:
+        assert data[offset - 1:offset] == b'\n'
+        assert data[offset:offset + 1].isdigit()
+
+    ranged = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        ranged.extend(iter_file_range(path, start, end))
+    assert ranged == list(iter_lines(path))
+
+
+def test_mmap_reader_matches_line_reader(tmp_path):
+    path = _write_chat(tmp_path / 'chat.txt', '\r\n')
+    with open(path, 'ab') as f:
+        f.write(b'12/31/2023, 23:59 - Ann: bad \xff byte\r\n\r\n'
+                b'12/31/2023, 23:59 - Bob: \xe2\x80\x94 dash\r\ntail line')
+    fmt = detect_format(list(iter_lines(path))[:SNIFF_LINES])
+    expected_unparsed, unparsed = [], []
+    expected = list(iter_messages(iter_lines(path), expected_unparsed))
+    assert list(iter_messages_mmap(path, fmt, unparsed)) == expected
+    assert unparsed == expected_unparsed
+
+    boundaries = find_chunk_boundaries(path, 5)
+    ranged = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        ranged.extend(iter_messages_mmap(path, fmt, start=start, end=end))
+    assert ranged == expected
+
+    # A lone CR is a line break to the text reader; the mmap reader defers to it
+    (tmp_path / 'cr.txt').write_bytes(b'01/01/2024, 10:00 - Ann: one\rtwo\n01/01/2024, 10:01 - Bob: hi\n')
+    cr = str(tmp_path / 'cr.txt')
+    assert list(iter_messages_mmap(cr, fmt)) == list(iter_messages(iter_lines(cr)))
+
+
+def test_mmap_reader_releases_pages(tmp_path, monkeypatch):
+    import main
+    path = _write_chat(tmp_path / 'chat.txt', '\n')
+    with open(path, 'a', encoding='utf-8') as f:
+        # A long run of lines the bytes pattern doesn't match
+        f.writelines(f'continuation {i}\n' for i in range(3000))
+        f.write('12/31/2023, 23:59 - Ann: last\n')
+    fmt = detect_format(list(iter_lines(path))[:SNIFF_LINES])
+    expected = list(iter_messages(iter_lines(path)))
+    released = []
+    release = main._release
+    monkeypatch.setattr(main, '_release', lambda buf, start, end: released.append(end) or release(buf, start, end))
+    # Windows smaller than a page and than a line exercise every cut
+    for every in (1, 7, 4096):
+        monkeypatch.setattr(main, 'RELEASE_EVERY', every)
+        assert list(iter_messages_mmap(path, fmt)) == expected
+    assert released
+
+    # \r\n split across scan windows is not a lone \r
+    import mmap
+    for data, lone in ((b'ab\r\ncd\r\n', False), (b'ab\r\ncd\rx\n', True), (b'ab\r', True)):
+        (tmp_path / 'cr.txt').write_bytes(data)
+        with open(tmp_path / 'cr.txt', 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for every in (1, 2, 3, 100):
+                monkeypatch.setattr(main, 'RELEASE_EVERY', every)
+                assert main._has_lone_cr(buf, 0, len(data)) == lone, (data, every)
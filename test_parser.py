@@ -1,33 +1,86 @@
 #!/usr/bin/env python
-"""Quick test script to check if parsing works"""
+"""Parsing regression tests against summaries recorded with the original
+line-by-line analyze(), plus a quick script to check if parsing works."""
+import json
+import os
+
 from main import parse_line, analyze
 
-# Test with sample file
-print("Testing parser with sample_chat.txt...")
-try:
-    summary = analyze('sample_chat.txt', top_n=10)
-    print(f"\n[OK] Success! Parsed {summary['total_messages']} messages")
-    print(f"Users: {list(summary['per_user'].keys())}")
-    print(f"Top words: {summary['top_words'][:5]}")
-except Exception as e:
-    print(f"\n[ERROR] Error: {e}")
-
-# Test individual line parsing
-print("\n" + "="*60)
-print("Testing individual line parsing...")
-test_lines = [
-    "12/09/2025, 21:02 - Alice: Hey! How are you?",
-    "12/09/2025, 21:03 - Bob: I'm fine, thanks! :)",
-    "[12/09/2025, 9:02 PM] Alice: iOS format test",
-    "12-09-2025 21:02 Name: Alternative format",
-]
-
-for line in test_lines:
-    result = parse_line(line)
-    if result:
-        dt, author, msg = result
-        print(f"[OK] Parsed: {line[:50]}...")
-        print(f"  -> Date: {dt}, Author: {author}, Message: {msg[:30]}...")
-    else:
-        print(f"[FAIL] Failed: {line}")
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_CHAT = os.path.join(HERE, 'sample_chat.txt')
+
+# A chat with orphan lines before the first message, multi-line messages,
+# a blank line, system lines, mixed Android/iOS layouts and a line that
+# only looks like a timestamp
+MULTILINE_CHAT = """\
+Export header line that belongs to no message
+another orphan before the first message
+12/09/2025, 21:02 - Messages and calls are end-to-end encrypted. No one outside of this chat can read them.
+12/09/2025, 21:02 - Alice: Hey! How are you?
+I wrote a second line
+and a third with a link https://example.com/x
+12/09/2025, 21:03 - Bob: I'm fine, thanks! :) What about you?
+
+12/09/2025, 21:04 - Alice: Doing good. Check this out 😂😂
+12/09/2025, 21:05 - Alice: <Media omitted>
+[13/09/2025, 9:10:11 AM] Charlie: Good morning everyone! 🌅
+[13/09/2025, 9:12:00 PM] Alice: late reply
+  indented continuation
+13/09/2025, 23:59 - Bob added Dave
+14/09/2025, 00:01 - Dave: who is this? www.example.org
+not a timestamp: 99/99/9999, 25:61 - Eve: nope
+14/09/2025, 07:30 - Charlie: ok
+"""
+
+
+def baseline(name):
+    """Summary recorded for a fixture (insights left out; they gained entries since)"""
+    with open(os.path.join(HERE, 'test_parser_baseline.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)[name]
+
+
+def as_recorded(summary):
+    """The summary as it went through JSON, without keys added after the baseline"""
+    expected_keys = baseline('sample_chat.txt')
+    return {key: value for key, value in json.loads(json.dumps(summary)).items() if key in expected_keys}
+
+
+def test_sample_chat_matches_baseline():
+    assert as_recorded(analyze(SAMPLE_CHAT, top_n=10)) == baseline('sample_chat.txt')
+
+
+def test_multiline_and_orphan_lines_match_baseline(tmp_path):
+    path = tmp_path / 'multiline_chat.txt'
+    path.write_text(MULTILINE_CHAT, encoding='utf-8')
+    assert as_recorded(analyze(str(path), top_n=10)) == baseline('multiline_chat.txt')
+
+
+if __name__ == '__main__':
+    # Test with sample file
+    print("Testing parser with sample_chat.txt...")
+    try:
+        summary = analyze(SAMPLE_CHAT, top_n=10)
+        print(f"\n[OK] Success! Parsed {summary['total_messages']} messages")
+        print(f"Users: {list(summary['per_user'].keys())}")
+        print(f"Top words: {summary['top_words'][:5]}")
+    except Exception as e:
+        print(f"\n[ERROR] Error: {e}")
+
+    # Test individual line parsing
+    print("\n" + "="*60)
+    print("Testing individual line parsing...")
+    test_lines = [
+        "12/09/2025, 21:02 - Alice: Hey! How are you?",
+        "12/09/2025, 21:03 - Bob: I'm fine, thanks! :)",
+        "[12/09/2025, 9:02 PM] Alice: iOS format test",
+        "12-09-2025 21:02 Name: Alternative format",
+    ]
 
+    for line in test_lines:
+        result = parse_line(line)
+        if result:
+            dt, author, msg = result
+            print(f"[OK] Parsed: {line[:50]}...")
+            print(f"  -> Date: {dt}, Author: {author}, Message: {msg[:30]}...")
+        else:
+            print(f"[FAIL] Failed: {line}")
@@ -0,0 +1,32 @@
+"""Profiling must not change results, and /metrics must expose what it records."""
+from main import analyze
+from profiling import MetricsRegistry, Profile
+from benchmarks.synth import write_export
+
+
+def test_profile_in_summary(tmp_path):
+    path = write_export(str(tmp_path / 'chat.txt'), 500, seed=3)
+    plain = analyze(path)
+    summary = analyze(path, profile=True)
+    profile = summary.pop('profile')
+    assert summary == plain
+    assert profile['counters']['messages'] == 500
+    assert profile['counters']['pattern_1'] == 500
+    assert profile['counters']['lines'] == 500 + profile['counters'].get('lines_without_timestamp', 0)
+    assert {'sniff', 'read', 'parse', 'aggregate', 'collect', 'summarize'} <= set(profile['stages'])
+
+
+def test_metrics_render():
+    profile = Profile()
+    with profile.stage('parse'):
+        pass
+    profile.count('pattern_2', 3)
+    registry = MetricsRegistry()
+    registry.record_profile(profile)
+    registry.observe('upload_seconds', 0.2)
+    text = registry.render({'jobs_queued': 1})
+    assert 'chat_analyzer_stage_seconds_count{stage="parse"} 1' in text
+    assert 'chat_analyzer_upload_seconds_bucket{le="0.25"} 1' in text
+    assert 'chat_analyzer_upload_seconds_bucket{le="0.1"} 0' in text
+    assert 'chat_analyzer_pattern_hits_total{pattern="2"} 3' in text
+    assert 'chat_analyzer_jobs_queued 1' in text
@@ -0,0 +1,89 @@
+"""ReportCache: memory LRU, disk tier and report files that were cleaned up."""
+import os
+
+from main import collect_stats, summarize_stats
+from report_cache import ReportCache, cache_key
+
+
+def put(cache, reports_dir, key, stats, top_n=10):
+    html_name, csv_name = f'{key}.html', f'{key}.csv'
+    for name in (html_name, csv_name):
+        (reports_dir / name).write_text('report')
+    summary = summarize_stats(stats, top_n)
+    cache.put(key, stats, top_n, summary, html_name, csv_name)
+    return summary
+
+
+def test_key_separates_word_capacity():
+    assert cache_key('ab', 10) == cache_key('ab', 10, None)
+    assert len({cache_key('ab', 10), cache_key('ab', 10, 500), cache_key('ab', 10, 1000), cache_key('ab', 5)}) == 4
+
+
+def test_memory_lru_and_disk_reload(tmp_path):
+    stats = collect_stats('sample_chat.txt')
+    cache = ReportCache(str(tmp_path / 'cache'), str(tmp_path), max_entries=2)
+    summaries = {key: put(cache, tmp_path, key, stats, top_n) for key, top_n in (('a', 3), ('b', 5))}
+    assert cache.get('a')['summary'] == summaries['a']
+    summaries['c'] = put(cache, tmp_path, 'c', stats)
+    # 'b' was least recently used and left memory, but is reloaded from disk
+    assert list(cache._memory) == ['a', 'c']
+    entry = cache.get('b')
+    assert entry['summary'] == summaries['b'] and entry['reports_ok']
+    assert list(cache._memory) == ['c', 'b']
+
+    # A new process only has the disk tier
+    restarted = ReportCache(str(tmp_path / 'cache'), str(tmp_path))
+    for key, summary in summaries.items():
+        assert restarted.get(key)['summary'] == summary
+    assert restarted.get('missing') is None
+
+
+def test_disk_eviction_least_recently_used(tmp_path, monkeypatch):
+    stats = collect_stats('sample_chat.txt')
+    cache = ReportCache(str(tmp_path / 'cache'), str(tmp_path), max_entries=1)
+    put(cache, tmp_path, 'a', stats)
+    entry_bytes = sum(os.path.getsize(path) for path in cache._paths('a'))
+    assert cache._disk_bytes == entry_bytes
+    cache.max_disk_bytes = 2 * entry_bytes
+    put(cache, tmp_path, 'b', stats)
+    cache.get('a')  # from disk, which marks it used
+    # Trimmed from the in-memory index, without listing the directory
+    monkeypatch.setattr(os, 'listdir', None)
+    put(cache, tmp_path, 'c', stats)
+    monkeypatch.undo()
+    assert sorted(name for name in os.listdir(tmp_path / 'cache')) == ['a.json', 'a.stats', 'c.json', 'c.stats']
+    assert cache.get('b') is None and cache._disk_bytes == 2 * entry_bytes
+
+
+def test_disk_index_loaded_at_startup(tmp_path):
+    stats = collect_stats('sample_chat.txt')
+    cache = ReportCache(str(tmp_path / 'cache'), str(tmp_path), max_entries=1)
+    for key in ('a', 'b'):
+        put(cache, tmp_path, key, stats)
+    entry_bytes = cache._disk_bytes // 2
+    os.utime(cache._paths('b')[0], (1, 1))
+    os.utime(cache._paths('a')[0], (2, 2))
+    restarted = ReportCache(str(tmp_path / 'cache'), str(tmp_path), max_disk_bytes=2 * entry_bytes)
+    assert list(restarted._disk) == ['b', 'a'] and restarted._disk_bytes == 2 * entry_bytes
+    put(restarted, tmp_path, 'c', stats)
+    assert restarted.get('b') is None and restarted.get('a') is not None
+
+
+def test_regenerates_missing_reports(tmp_path, monkeypatch):
+    import app
+    reports_dir = tmp_path / 'reports'
+    reports_dir.mkdir()
+    cache = ReportCache(str(tmp_path / 'cache'), str(reports_dir))
+    monkeypatch.setattr(app, 'REPORTS_DIR', str(reports_dir))
+    monkeypatch.setattr(app, 'report_cache', cache)
+    summary = put(cache, reports_dir, 'a', collect_stats('sample_chat.txt'))
+    os.remove(reports_dir / 'a.html')
+    assert not cache.get('a')['reports_ok']
+
+    cached_summary, html_name, csv_name = app.cached_analysis('a')
+    assert cached_summary == summary
+    assert (reports_dir / html_name).exists() and (reports_dir / csv_name).exists()
+    # The entry now points at the new files, on disk as well
+    assert cache.get('a')['reports_ok'] and cache.get('a')['html_name'] == html_name
+    restarted = ReportCache(str(tmp_path / 'cache'), str(reports_dir)).get('a')
+    assert restarted['reports_ok'] and (restarted['html_name'], restarted['csv_name']) == (html_name, csv_name)
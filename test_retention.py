@@ -0,0 +1,98 @@
+"""Retention: TTL and quota eviction from the in-memory index."""
+import os
+import time
+
+from retention import Retention
+
+
+def write(directory, name, size, mtime=None):
+    path = directory / name
+    path.write_bytes(b'x' * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_expired_then_over_quota(tmp_path):
+    now = time.time()
+    write(tmp_path, 'old.html', 100, now - 7200)
+    write(tmp_path, 'older.csv', 50, now - 9000)
+    (tmp_path / 'cache').mkdir()
+    retention = Retention(str(tmp_path), ttl_seconds=3600, max_bytes=250)
+    retention.scan()
+    for i in range(3):
+        write(tmp_path, f'new{i}.html', 100)
+        retention.add(f'new{i}.html')
+    assert retention.metrics()['entries'] == 5 and retention.metrics()['bytes'] == 450
+
+    assert retention.sweep(now) == (3, 250)
+    assert sorted(os.listdir(tmp_path)) == ['cache', 'new1.html', 'new2.html']
+    metrics = retention.metrics()
+    assert (metrics['evicted_expired'], metrics['bytes_reclaimed_expired']) == (2, 150)
+    assert (metrics['evicted_quota'], metrics['bytes_reclaimed_quota']) == (1, 100)
+    assert metrics['entries'] == 2 and metrics['bytes'] == 200
+
+    # Files removed by someone else are dropped without counting as reclaimed
+    os.remove(tmp_path / 'new1.html')
+    assert retention.sweep(now + 7200) == (2, 200)
+    assert retention.metrics()['evicted_expired'] == 3
+
+
+def test_background_sweep(tmp_path):
+    retention = Retention(str(tmp_path), ttl_seconds=0, interval=0.01)
+    write(tmp_path, 'a.html', 10)
+    retention.add('a.html')
+    retention.start()
+    try:
+        deadline = time.time() + 5
+        while os.path.exists(tmp_path / 'a.html') and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        retention.stop()
+    assert not os.path.exists(tmp_path / 'a.html')
+    assert retention.metrics()['sweeps'] >= 1
+
+
+def test_directories_and_rescan(tmp_path):
+    store = tmp_path / 'stores' / 'abc'
+    store.mkdir(parents=True)
+    write(store, 'messages.txt', 300)
+    write(store, 'meta.json', 20)
+    (tmp_path / 'stores' / '.store_partial').mkdir()
+    stores = Retention(str(tmp_path / 'stores'), ttl_seconds=3600, max_bytes=100, directories=True)
+    stores.scan()
+    assert stores.metrics()['entries'] == 1 and stores.metrics()['bytes'] == 320
+    assert stores.sweep() == (1, 320)
+    assert os.listdir(tmp_path / 'stores') == ['.store_partial']
+
+    (tmp_path / 'ocr').mkdir()
+    cache = Retention(str(tmp_path / 'ocr'), ttl_seconds=3600, rescan=True)
+    write(tmp_path / 'ocr', 'key.txt', 10)
+    write(tmp_path / 'ocr', '.tmp123.tmp', 10)
+    cache.sweep()
+    assert cache.metrics()['entries'] == 1 and cache.metrics()['bytes'] == 10
+    cache.sweep(time.time() + 7200)
+    assert os.listdir(tmp_path / 'ocr') == ['.tmp123.tmp']
+
+
+def test_evictions_exported_as_counters(tmp_path):
+    from profiling import MetricsRegistry
+    registry = MetricsRegistry()
+
+    def count_eviction(name, reason, size):
+        assert name in ('old.html', 'a.html', 'b.html')
+        registry.inc('reports_evicted_total', reason=reason)
+        registry.inc('reports_reclaimed_bytes_total', size, reason=reason)
+
+    now = time.time()
+    retention = Retention(str(tmp_path), ttl_seconds=3600, max_bytes=100, on_evict=count_eviction)
+    write(tmp_path, 'old.html', 30, now - 7200)
+    write(tmp_path, 'a.html', 80)
+    write(tmp_path, 'b.html', 80)
+    retention.scan()
+    retention.sweep(now)
+    text = registry.render({'reports_stored': retention.metrics()['entries']})
+    assert '# TYPE chat_analyzer_reports_evicted_total counter' in text
+    assert 'chat_analyzer_reports_evicted_total{reason="expired"} 1' in text
+    assert 'chat_analyzer_reports_evicted_total{reason="quota"} 1' in text
+    assert 'chat_analyzer_reports_reclaimed_bytes_total{reason="quota"} 80' in text
+    assert '# TYPE chat_analyzer_reports_stored gauge' in text and 'chat_analyzer_reports_stored 1' in text
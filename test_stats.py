@@ -0,0 +1,174 @@
+"""ChatStats: merging and binary serialization must not change the summary."""
+import argparse
+import pickle
+
+import pytest
+
+from main import collect_stats, iter_messages
+from stats import ChatStats
+from benchmarks.synth import generate_lines
+
+
+def test_merge_equals_single_pass():
+    lines = list(generate_lines(2000, seed=5))
+    whole = ChatStats().update(iter_messages(lines))
+    assert lines[700][0].isdigit()  # split on a message start
+    first = ChatStats().update(iter_messages(lines[:700]))
+    second = ChatStats().update(iter_messages(lines[700:]))
+    merged = first.merge(second)
+    assert merged.to_summary(30) == whole.to_summary(30)
+    assert list(merged.to_summary()['per_user']) == list(whole.to_summary()['per_user'])
+
+
+def test_binary_round_trip():
+    stats = collect_stats('sample_chat.txt')
+    blob = stats.to_bytes()
+    assert len(blob) < len(pickle.dumps(stats))
+    assert ChatStats.from_bytes(blob).to_summary(10) == stats.to_summary(10)
+
+
+def test_empty_round_trip():
+    assert ChatStats.from_bytes(ChatStats().to_bytes()).total == 0
+
+
+def test_message_store_reuse(tmp_path):
+    from main import analyze
+    from message_store import open_store
+    store_dir = str(tmp_path / 'store')
+    expected = analyze('sample_chat.txt', top_n=10)
+    assert analyze('sample_chat.txt', top_n=10, store_dir=store_dir) == expected
+    store = open_store(store_dir)
+    assert len(store) == expected['total_messages']
+    store.close()
+    # Second run loads the store instead of parsing
+    assert analyze('sample_chat.txt', top_n=10, store_dir=store_dir) == expected
+
+
+def test_store_columns_written_in_chunks(tmp_path, monkeypatch):
+    import message_store
+    monkeypatch.setattr(message_store, 'FLUSH_EVERY', 7)
+    lines = list(generate_lines(500, seed=4))
+    writer = message_store.StoreWriter(str(tmp_path / 'store'))
+    expected = ChatStats().update(writer.capture(iter_messages(lines)))
+    assert len(writer._timestamps) < 7
+    with writer.finish() as store:
+        assert len(store) == expected.total and len(store.offsets) == expected.total + 1
+        assert ChatStats().update(store.iter_messages()).to_summary() == expected.to_summary()
+
+
+def test_approximate_top_words_bounds():
+    lines = list(generate_lines(5000, seed=8, vocabulary=20000, word_skew=1.1))
+    exact = ChatStats().update(iter_messages(lines))
+    first = ChatStats(word_capacity=500).update(iter_messages(lines[:2500]))
+    second = ChatStats(word_capacity=500).update(iter_messages(lines[2500:]))
+    approx = first.merge(second)
+    error = approx.word_counts.error
+    assert 0 < error <= exact.total_length  # pruning happened
+    assert len(approx.word_counts) <= 1000
+    for word, count in approx.top_words(20):
+        assert count <= exact.word_counts[word] <= count + error
+    assert [w for w, _ in approx.top_words(5)] == [w for w, _ in exact.top_words(5)]
+    summary = ChatStats.from_bytes(approx.to_bytes()).to_summary(10)
+    assert summary['top_words_approximate'] and summary['top_words_error'] == error
+    assert summary['top_words'] == approx.to_summary(10)['top_words']
+
+
+def test_word_capacity_must_be_positive(monkeypatch):
+    import app
+    from main import positive_int
+    assert positive_int('500') == 500
+    for value in ('0', '-3', 'many'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            positive_int(value)
+    for capacity in (0, -1, '500'):
+        monkeypatch.setitem(app.app.config, 'WORD_CAPACITY', capacity)
+        with pytest.raises(ValueError, match='WORD_CAPACITY'):
+            app.word_capacity()
+
+
+def test_activity_matrices():
+    lines = [
+        '01/01/2024, 09:15 - Ann: morning\n',
+        '01/01/2024, 09:40 - Bob: hi\n',
+        '01/01/2024, 23:05 - Ann: late\n',
+        '06/01/2024, 09:00 - Ann: saturday\n',
+        '06/01/2024, 10:00 - Messages are end-to-end encrypted\n',
+    ]
+    summary = ChatStats().update(iter_messages(lines)).to_summary()
+    assert summary['hours_per_user']['Ann'][9] == 2 and summary['hours_per_user']['Ann'][23] == 1
+    assert sum(summary['hours_per_user']['Bob']) == 1
+    assert summary['weekdays_per_user'] == {'Ann': [2, 0, 0, 0, 0, 1, 0], 'Bob': [1, 0, 0, 0, 0, 0, 0]}
+    assert summary['days_per_user'] == {'Ann': {'2024-01-01': 2, '2024-01-06': 1}, 'Bob': {'2024-01-01': 1}}
+
+    from vectorized import collect_stats_vectorized
+    vectorized = collect_stats_vectorized(iter_messages(lines)).to_summary()
+    for key in ('hours_per_user', 'weekdays_per_user', 'days_per_user'):
+        assert vectorized[key] == summary[key]
+
+
+def test_conversations_any_split():
+    lines = [
+        '01/01/2024, 09:00 - Ann: anyone up?\n',
+        '01/01/2024, 09:02 - Bob: yes\n',
+        '01/01/2024, 09:02 - Bob: barely\n',
+        '01/01/2024, 09:20 - Cat: same\n',
+        '01/01/2024, 09:30 - Messages are end-to-end encrypted\n',
+        '01/01/2024, 11:00 - Bob: lunch?\n',
+        '01/01/2024, 11:45 - Ann: sure\n',
+        '02/01/2024, 08:00 - Cat: morning\n',
+    ]
+    whole = ChatStats().update(iter_messages(lines))
+    summary = whole.to_summary()
+    assert summary['sessions'] == 3
+    assert summary['sessions_started_per_user'] == {'Ann': 1, 'Bob': 1, 'Cat': 1}
+    assert summary['response_time_per_user']['Ann'] == {
+        'replies': 1, 'median_seconds': 2700, 'p90_seconds': 2700, 'mean_seconds': 2700.0}
+    assert [(p['from'], p['to'], p['count']) for p in summary['replies_per_pair']] == [
+        ('Ann', 'Bob', 1), ('Bob', 'Ann', 1), ('Cat', 'Bob', 1)]
+    assert summary['replies_per_pair'][0]['within']['60m'] == 1
+
+    keys = ('sessions', 'sessions_started_per_user', 'response_time_per_user', 'replies_per_pair')
+    for split in range(len(lines) + 1):
+        merged = ChatStats().update(iter_messages(lines[:split]))
+        merged = ChatStats.from_bytes(merged.to_bytes()).merge(ChatStats().update(iter_messages(lines[split:])))
+        assert {k: merged.to_summary()[k] for k in keys} == {k: summary[k] for k in keys}
+
+    from vectorized import collect_stats_vectorized
+    for batch_size in (1, 3, 100):
+        vectorized = collect_stats_vectorized(iter_messages(lines), batch_size=batch_size).to_summary()
+        assert {k: vectorized[k] for k in keys} == {k: summary[k] for k in keys}
+
+
+def test_merge_chat_keeps_chats_apart():
+    ann = ChatStats().update(iter_messages(['01/01/2024, 09:00 - Ann: hi\n', '01/01/2024, 09:05 - Bob: hey\n']))
+    cat = ChatStats().update(iter_messages(['01/01/2024, 09:06 - Cat: yo\n']))
+    summary = ChatStats().merge_chat(ann).merge_chat(cat).to_summary()
+    assert summary['sessions'] == 2
+    assert summary['sessions_started_per_user'] == {'Ann': 1, 'Cat': 1}
+    assert [(p['from'], p['to']) for p in summary['replies_per_pair']] == [('Bob', 'Ann')]
+    # Continuing after separate chats starts a session too
+    combined = ChatStats().merge_chat(ann).merge_chat(cat).update(iter_messages(['01/01/2024, 09:07 - Bob: ok\n']))
+    assert combined.to_summary()['sessions'] == 3
+
+    from vectorized import collect_stats_vectorized
+    vectorized = collect_stats_vectorized(iter_messages(['01/01/2024, 09:07 - Bob: ok\n']),
+                                          ChatStats().merge_chat(ann).merge_chat(cat))
+    assert vectorized.to_summary()['sessions'] == 3
+
+
+def test_pandas_backend_matches_python(tmp_path):
+    from main import analyze
+    from benchmarks.synth import REALISTIC
+    system = ['Messages and calls are end-to-end encrypted. No one outside of this chat can read them.',
+              'Alice added Heidi', 'Bob left', 'Charlie changed the group description', 'Eve created group "Trip"']
+    lines = []
+    for i, line in enumerate(generate_lines(3000, seed=11, multiline_rate=0.1, **REALISTIC)):
+        lines.append(line[:-1] + '?\n' if i % 53 == 0 else line)
+        if i % 97 == 0 and ' - ' in line:
+            lines.append(line.split(' - ', 1)[0] + ' - ' + system[i % len(system)] + '\n')
+    path = tmp_path / 'chat.txt'
+    path.write_text(''.join(lines), encoding='utf-8')
+    expected = analyze(str(path))
+    assert expected['total_messages'] > 3000 and expected['sessions'] > 1
+    assert all(expected[key] for key in ('media_count', 'link_count', 'emoji_count', 'question_count'))
+    assert analyze(str(path), backend='pandas') == expected
@@ -0,0 +1,140 @@
+"""Compatibility tests: the timestamp engine must reproduce parse_line's
+historical (dateutil-based) output for every supported export format."""
+from datetime import datetime
+
+import pytest
+
+from main import parse_line, detect_format, compile_line_parser
+from timestamps import parse_date, parse_time, to_datetime
+from benchmarks.synth import FORMATS, REALISTIC, generate_lines
+
+# (line, expected parse_line output) recorded from the dateutil implementation
+COMPAT_CASES = [
+    # Android 12h: dd/mm/yyyy, h:mm am/pm - Name: Message
+    ("12/09/2025, 9:02 pm - Alice: Hey! How are you?", (datetime(2025, 9, 12, 21, 2), 'Alice', 'Hey! How are you?')),
+    ("12/09/2025, 12:15 AM - Bob: late night", (datetime(2025, 9, 12, 0, 15), 'Bob', 'late night')),
+    ("01/02/25, 12:30 PM - Charlie: noon", (datetime(2025, 2, 1, 12, 30), 'Charlie', 'noon')),
+    # Android 24h: dd/mm/yyyy, hh:mm - Name: Message
+    ("12/09/2025, 21:02 - Alice: Hey! How are you?", (datetime(2025, 9, 12, 21, 2), 'Alice', 'Hey! How are you?')),
+    ("09/13/2025, 08:05 - Bob: month first", (datetime(2025, 9, 13, 8, 5), 'Bob', 'month first')),
+    ("1/2/24, 7:45 - Alice: short date", (datetime(2024, 2, 1, 7, 45), 'Alice', 'short date')),
+    # iOS: [dd/mm/yyyy, hh:mm:ss AM/PM] Name: Message
+    ("[12/09/2025, 9:02:15 PM] Alice: iOS format test", (datetime(2025, 9, 12, 21, 2, 15), 'Alice', 'iOS format test')),
+    ("[12/09/2025, 21:02:15] Bob: iOS 24h", (datetime(2025, 9, 12, 21, 2, 15), 'Bob', 'iOS 24h')),
+    ("[3/4/25, 10:00:00 AM] Charlie: narrow no-break space", (datetime(2025, 4, 3, 10, 0), 'Charlie', 'narrow no-break space')),
+    # mm/dd/yyyy, hh:mm - Name: Message
+    ("12/31/2025, 23:59 - Alice: new year's eve", (datetime(2025, 12, 31, 23, 59), 'Alice', "new year's eve")),
+    # No separator: dd/mm/yyyy hh:mm Name: Message
+    ("12-09-2025 21:02 Name: Alternative format", (datetime(2025, 9, 12, 21, 2), 'Name', 'Alternative format')),
+    ("12-09-2025 21:02:30 Bob: with seconds", (datetime(2025, 9, 12, 21, 2, 30), 'Bob', 'with seconds')),
+    # Dots: dd.mm.yyyy, hh:mm - Name: Message
+    ("12.09.2025, 21:02 - Alice: dotted", (datetime(2025, 9, 12, 21, 2), 'Alice', 'dotted')),
+    ("31.12.99, 00:00 - Bob: old", (datetime(1999, 12, 31, 0, 0), 'Bob', 'old')),
+    # Arabic-Indic and Persian digits
+    ("١٢/٠٩/٢٠٢٥, ٢١:٠٢ - Alice: أهلا", (datetime(2025, 9, 12, 21, 2), 'Alice', 'أهلا')),
+    ("۱۲/۰۹/۲۵, ۹:۰۲ pm - Bob: سلام", (datetime(2025, 9, 12, 21, 2), 'Bob', 'سلام')),
+    # System messages and invalid timestamps
+    ("12/09/2025, 21:02 - Messages and calls are end-to-end encrypted.", (datetime(2025, 9, 12, 21, 2), None, 'Messages and calls are end-to-end encrypted.')),
+    ("12/09/2025, 21:02 - You added Bob", (datetime(2025, 9, 12, 21, 2), None, 'You added Bob')),
+    ("31/02/2025, 10:00 - Alice: no such day", (None, 'Alice', 'no such day')),
+    ("12/09/2025, 25:00 - Alice: no such hour", (None, 'Alice', 'no such hour')),
+    ("just a continuation line", None),
+]
+
+
+@pytest.mark.parametrize('line, expected', COMPAT_CASES)
+def test_parse_line_compat(line, expected):
+    assert parse_line(line) == expected
+
+
+@pytest.mark.parametrize('line, expected', COMPAT_CASES)
+def test_specialised_parser_compat(line, expected):
+    parse = compile_line_parser(detect_format([line]))
+    assert parse(line) == expected
+
+
+def test_date_cache_and_swap():
+    assert parse_date('12/09/2025') == parse_date('12/09/2025')
+    assert parse_date('09/13/2025').isoformat() == '2025-09-13'
+    assert parse_date('01/02/2025', dayfirst=False).isoformat() == '2025-01-02'
+    assert parse_date('13/13/2025') is None
+
+
+def test_parse_time():
+    assert parse_time('9:02') == (9, 2, 0)
+    assert parse_time('21:02:33') == (21, 2, 33)
+    assert parse_time('12:00 AM') == (0, 0, 0)
+    assert parse_time('12:30pm') == (12, 30, 0)
+    assert parse_time('24:00') is None
+
+
+def test_matches_dateutil():
+    dtparser = pytest.importorskip('dateutil.parser')
+    for sep in '/-.':
+        for year in ('2025', '25', '99'):
+            for first in range(0, 32):
+                for second in range(0, 32):
+                    date = f'{first:02d}{sep}{second:02d}{sep}{year}'
+                    try:
+                        expected = dtparser.parse(f'{date} 10:00', dayfirst=True)
+                    except Exception:
+                        try:
+                            expected = dtparser.parse(f'{date} 10:00')
+                        except Exception:
+                            expected = None
+                    assert to_datetime(date, '10:00') == expected, date
+
+
+@pytest.mark.parametrize('fmt', list(FORMATS))
+def test_synthetic_formats(fmt):
+    lines = list(generate_lines(300, seed=2, fmt=fmt, **REALISTIC))
+    parse = compile_line_parser(detect_format(lines))
+    messages = [line for line in lines if parse_line(line)]
+    assert len(messages) == 300
+    assert [parse(line) for line in messages] == [parse_line(line) for line in messages]
+
+
+def test_month_first_detection(tmp_path):
+    from main import iter_messages, iter_messages_mmap
+    lines = ["09/13/2025, 08:05 - Bob: month first\n",
+             "01/02/2025, 10:00 - Alice: ambiguous\n",
+             "13/09/2025, 08:05 - Bob: impossible month-first, so day-first\n"]
+    fmt = detect_format(lines[:2])
+    assert fmt.pattern_index == 1 and not fmt.dayfirst
+    parse = compile_line_parser(fmt)
+    assert parse(lines[0]) == parse_line(lines[0])
+    assert parse(lines[2]) == parse_line(lines[2])
+    # Ambiguous dates follow the detected order, unlike parse_line's day-first
+    assert parse(lines[1])[0] == datetime(2025, 1, 2, 10, 0)
+    assert parse_line(lines[1])[0] == datetime(2025, 2, 1, 10, 0)
+    # Unambiguous or day-first samples keep parse_line's order
+    assert detect_format(lines[1:]).dayfirst and detect_format(lines[1:2]).dayfirst
+
+    path = tmp_path / 'chat.txt'
+    path.write_text(''.join(lines), encoding='utf-8')
+    expected = list(iter_messages(lines, parse=parse))
+    assert [dt for dt, _, _ in expected] == [datetime(2025, 9, 13, 8, 5), datetime(2025, 1, 2, 10, 0),
+                                             datetime(2025, 9, 13, 8, 5)]
+    assert list(iter_messages_mmap(str(path), fmt)) == expected
+
+
+def test_shadowed_pattern_falls_back(tmp_path):
+    from main import TIMESTAMP_PATTERNS, LineFormat, iter_messages, iter_messages_mmap
+    lines = ["12-09-2025 21:02 Name: Alternative format\n",
+             "12-09-2025 21:05 Bob: no separator\n",
+             # Also matched by the no-separator pattern, but the Android pattern comes first
+             "12/09/2025 21:06 - Alice: with separator\n"]
+    fmt = detect_format(lines)
+    assert fmt.pattern_index == 4
+    assert TIMESTAMP_PATTERNS[4].match(lines[2]).group('rest') == '- Alice: with separator'
+    parse = compile_line_parser(fmt)
+    assert [parse(line) for line in lines] == [parse_line(line) for line in lines]
+    assert parse(lines[2])[1:] == ('Alice', 'with separator')
+
+    # mm/dd/yyyy lines always match the Android pattern as well
+    us = "12/31/2025, 23:59 - Alice: new year's eve"
+    assert compile_line_parser(LineFormat(3, False, False, False))(us) == parse_line(us)
+
+    path = tmp_path / 'chat.txt'
+    path.write_text(''.join(lines), encoding='utf-8')
+    assert list(iter_messages_mmap(str(path), fmt)) == list(iter_messages(lines))
@@ -0,0 +1,84 @@
+"""Uploads are decoded part by part as the body arrives."""
+import hashlib
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.test import encode_multipart
+
+from benchmarks.synth import generate_lines
+from main import collect_line_stats, collect_stats, iter_lines
+from upload_stream import MultipartStream, UploadError
+
+CHAT = ''.join(generate_lines(2000, seed=5)).replace('\n', '\r\n').encode('utf-8') + b'\xff trailing\r\n'
+
+
+def make_body(files, fields=()):
+    data = {name: FileStorage(io.BytesIO(content), filename) for name, (content, filename) in files}
+    boundary, body = encode_multipart({**data, **dict(fields)}, boundary='b0undary')
+    return io.BytesIO(body), boundary.encode()
+
+
+def test_text_part_streams_into_parser(tmp_path):
+    (tmp_path / 'chat.txt').write_bytes(CHAT)
+    # The file comes before the form field, as the upload form sends it
+    body, boundary = make_body([('file', (CHAT, 'chat.txt'))], [('top', '7')])
+    form = MultipartStream(body, boundary, chunk_size=97)
+    parts = iter(form)
+    part = next(parts)
+    assert (part.name, part.filename) == ('file', 'chat.txt')
+    unparsed, expected_unparsed = [], []
+    stats = collect_line_stats(iter_lines(part), unparsed)
+    assert stats.to_summary() == collect_stats(str(tmp_path / 'chat.txt'), unparsed_lines=expected_unparsed).to_summary()
+    assert unparsed == expected_unparsed
+    assert part.size == len(CHAT) and part.hexdigest() == hashlib.sha256(CHAT).hexdigest()
+    assert list(parts) == [] and form.fields == {'top': '7'}
+
+
+def test_unread_parts_are_skipped_and_limits_apply():
+    body, boundary = make_body([('file', (b'x' * 5000, 'a.png'))], [('top', '3')])
+    form = MultipartStream(body, boundary, chunk_size=64)
+    assert [part.filename for part in form] == ['a.png']
+    assert form.fields == {'top': '3'}
+
+    body, boundary = make_body([('file', (b'x' * 5000, 'a.png'))])
+    part = next(iter(MultipartStream(body, boundary)))
+    part.max_size = 4096
+    with pytest.raises(RequestEntityTooLarge):
+        part.read()
+
+
+def test_truncated_body():
+    body, boundary = make_body([('file', (CHAT, 'chat.txt'))])
+    truncated = io.BytesIO(body.getvalue()[:len(CHAT) // 2])
+    part = next(iter(MultipartStream(truncated, boundary)))
+    with pytest.raises(UploadError):
+        part.read()
+
+
+def test_text_upload_is_parsed_without_saving(tmp_path, monkeypatch):
+    import app
+    from report_cache import ReportCache
+    for name in ('reports', 'stores'):
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(app, 'REPORTS_DIR', str(tmp_path / 'reports'))
+    monkeypatch.setattr(app, 'STORES_DIR', str(tmp_path / 'stores'))
+    monkeypatch.setattr(app, 'report_cache', ReportCache(str(tmp_path / 'cache'), str(tmp_path / 'reports')))
+
+    def no_saving(stream, path):
+        raise AssertionError('a .txt upload must not be saved')
+
+    monkeypatch.setattr(app, 'hash_and_save', no_saving)
+    client = app.app.test_client()
+    digest = hashlib.sha256(CHAT).hexdigest()
+    pages = []
+    for _ in range(2):
+        response = client.post('/upload', data={'file': (io.BytesIO(CHAT), 'chat.txt'), 'top': '7'})
+        assert response.status_code == 200
+        pages.append(response.data)
+    # The second upload is answered from the cache, with the same reports
+    assert pages[0] == pages[1]
+    assert os.listdir(tmp_path / 'stores') == [digest]
+    assert app.report_cache.get(app.cache_key(digest, 7, app.app.config['WORD_CAPACITY'])) is not None
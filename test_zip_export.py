@@ -0,0 +1,68 @@
+""".zip exports are analyzed in place, with media sizes from the central directory."""
+import os
+import zipfile
+
+import pytest
+
+from main import analyze
+
+CHAT = (
+    '01/01/2024, 10:00 - Ann: morning\n'
+    '01/01/2024, 10:01 - Bob: IMG-20240101-WA0001.jpg (file attached)\n'
+    '01/01/2024, 10:02 - Ann: IMG-20240101-WA0002.jpg (file attached)\n'
+    'look at this\n'
+    '01/01/2024, 10:03 - Ann: <Media omitted>\n'
+    '01/01/2024, 10:04 - Bob: PTT-20240101-WA0003.opus (file attached)\n'
+)
+
+
+def make_export(path, chat_name='WhatsApp Chat with Bob.txt'):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(chat_name, CHAT)
+        archive.writestr('IMG-20240101-WA0001.jpg', b'x' * 1000)
+        archive.writestr('IMG-20240101-WA0002.jpg', b'x' * 2500)
+        archive.writestr('PTT-20240101-WA0003.opus', b'x' * 300)
+        archive.writestr('unreferenced.webp', b'x' * 99)
+
+
+def test_zip_matches_text_and_counts_media(tmp_path):
+    make_export(tmp_path / 'chat.zip')
+    (tmp_path / 'chat.txt').write_text(CHAT, encoding='utf-8')
+    summary = analyze(str(tmp_path / 'chat.zip'))
+    text = analyze(str(tmp_path / 'chat.txt'))
+    assert summary['total_messages'] == text['total_messages'] == 5
+    assert summary['media_count'] == text['media_count'] == 4
+    assert summary['media_bytes'] == 3800 and text['media_bytes'] == 0
+    assert summary['media_per_user'] == {'Ann': {'count': 2, 'bytes': 2500}, 'Bob': {'count': 2, 'bytes': 1300}}
+    assert analyze(str(tmp_path / 'chat.zip'), backend='pandas')['media_per_user'] == summary['media_per_user']
+
+
+def test_ios_chat_member_preferred(tmp_path):
+    make_export(tmp_path / 'ios.zip', chat_name='export/_chat.txt')
+    assert analyze(str(tmp_path / 'ios.zip'))['total_messages'] == 5
+
+
+def test_zip_without_chat(tmp_path):
+    with zipfile.ZipFile(tmp_path / 'photos.zip', 'w') as archive:
+        archive.writestr('IMG-1.jpg', b'x')
+    with pytest.raises(Exception, match='No chat .txt'):
+        analyze(str(tmp_path / 'photos.zip'))
+
+
+def test_zip_upload_registers_no_store(tmp_path, monkeypatch):
+    import app
+    from report_cache import ReportCache
+    from retention import Retention
+    for name in ('reports', 'stores'):
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(app, 'REPORTS_DIR', str(tmp_path / 'reports'))
+    monkeypatch.setattr(app, 'STORES_DIR', str(tmp_path / 'stores'))
+    monkeypatch.setattr(app, 'report_cache', ReportCache(str(tmp_path / 'cache'), str(tmp_path / 'reports')))
+    stores = Retention(str(tmp_path / 'stores'), directories=True)
+    monkeypatch.setitem(app.retentions, 'stores', stores)
+    make_export(tmp_path / 'chat.zip')
+    with open(tmp_path / 'chat.zip', 'rb') as f:
+        response = app.app.test_client().post('/upload', data={'file': (f, 'chat.zip')})
+    assert response.status_code == 200
+    # A .zip is analyzed in place, without a message store to index
+    assert os.listdir(tmp_path / 'stores') == [] and stores.metrics()['entries'] == 0
@@ -0,0 +1,142 @@
+"""Timestamp engine for WhatsApp export lines.
+
+Thousands of consecutive messages share the same date string, so date
+strings are converted once and memoized in a bounded LRU cache. Times are
+built from integer slices of the time string instead of going through
+dateutil or a loop of strptime attempts.
+
+The rules follow what dateutil.parser.parse(..., dayfirst=True) did for the
+patterns in main.TIMESTAMP_PATTERNS: the preferred day/month order is used
+unless it is impossible, in which case the other order is tried, and
+two-digit years resolve to within 50 years of today. Digits of other
+scripts (e.g. Arabic-Indic ١٢/٠٩/٢٠٢٥) are read like ASCII digits.
+"""
+import re
+import unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+
+# Distinct date strings kept in the cache (one per calendar day in a chat)
+DATE_CACHE_SIZE = 8192
+
+_DATE_SEP = re.compile(r'[\/\-.]')
+_THIS_YEAR = datetime.now().year
+_CENTURY = _THIS_YEAR // 100 * 100
+
+
+def ascii_digits(text):
+    """Replace non-ASCII digits in text with their ASCII equivalents"""
+    if text.isascii():
+        return text
+    return ''.join(str(unicodedata.digit(c, c)) if c.isdigit() else c for c in text)
+
+
+def expand_year(year):
+    """Resolve a two-digit year to the century within 50 years of today"""
+    year += _CENTURY
+    if year >= _THIS_YEAR + 50:
+        year -= 100
+    elif year < _THIS_YEAR - 50:
+        year += 100
+    return year
+
+
+def _build_date(first, second, year, dayfirst):
+    """Build a date from the two leading fields, preferring the given order"""
+    if dayfirst:
+        day, month = first, second
+    else:
+        month, day = first, second
+    if month > 12 and day <= 12:
+        # Preferred order is impossible, so the fields must be swapped
+        day, month = month, day
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _parse_date(date_str, dayfirst):
+    date_str = ascii_digits(date_str)
+    if not date_str.isascii():
+        return None
+    parts = _DATE_SEP.split(date_str)
+    if len(parts) != 3:
+        return None
+    first, second, year = parts
+    if not (first.isdigit() and second.isdigit() and year.isdigit()):
+        return None
+    year_num = int(year)
+    if len(year) <= 2:
+        year_num = expand_year(year_num)
+    if year_num < 1:
+        return None
+    return _build_date(int(first), int(second), year_num, dayfirst)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_dayfirst(date_str):
+    """Convert a dd/mm/yyyy-style date string to a date (or None)"""
+    return _parse_date(date_str, True)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_monthfirst(date_str):
+    """Convert a mm/dd/yyyy-style date string to a date (or None)"""
+    return _parse_date(date_str, False)
+
+
+def parse_date(date_str, dayfirst=True):
+    """Convert a WhatsApp date string to a date, or None if it is invalid"""
+    if dayfirst:
+        return parse_date_dayfirst(date_str)
+    return parse_date_monthfirst(date_str)
+
+
+def parse_time(time_str):
+    """Convert 'H:MM', 'HH:MM:SS' or '9:02 PM' style times to (hour, minute, second).
+
+    Returns None when the time is out of range.
+    """
+    if not time_str.isascii():
+        time_str = ascii_digits(time_str)
+    meridiem = time_str[-2:].upper()
+    if meridiem == 'AM' or meridiem == 'PM':
+        time_str = time_str[:-2].rstrip()
+    else:
+        meridiem = None
+    colon = time_str.find(':')
+    if colon < 1 or not time_str.isascii():
+        return None
+    try:
+        hour = int(time_str[:colon])
+        minute = int(time_str[colon + 1:colon + 3])
+        second = int(time_str[colon + 4:colon + 6]) if len(time_str) > colon + 3 else 0
+    except ValueError:
+        return None
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    if meridiem == 'PM' and hour < 12:
+        hour += 12
+    elif meridiem == 'AM' and hour == 12:
+        hour = 0
+    return hour, minute, second
+
+
+def to_datetime(date_str, time_str, dayfirst=True):
+    """Combine a date string and a time string into a datetime (or None)"""
+    d = parse_date_dayfirst(date_str) if dayfirst else parse_date_monthfirst(date_str)
+    if d is None:
+        return None
+    t = parse_time(time_str)
+    if t is None:
+        return None
+    return datetime(d.year, d.month, d.day, t[0], t[1], t[2])
+
+
+def cache_info():
+    """Hit/miss statistics of the date caches, for diagnostics"""
+    return {
+        'dayfirst': parse_date_dayfirst.cache_info()._asdict(),
+        'monthfirst': parse_date_monthfirst.cache_info()._asdict(),
+    }
@@ -0,0 +1,150 @@
+"""Incremental reading of multipart/form-data uploads.
+
+werkzeug's form parser spools every uploaded file to a temporary file
+before the view runs, and the analysis then reads it back from disk. Here
+the request body is decoded as it arrives instead: each uploaded file is a
+binary stream of its own part of the body, so a chat .txt can be fed to
+the line parser while it is still being received (and hashed on the way
+for the report cache) instead of being saved to a temporary file first.
+Only what is parsed from it, the message store, is written to disk.
+"""
+import hashlib
+import io
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import NEED_DATA, Data, Epilogue, Field, File, MultipartDecoder
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """The request body is not a well-formed multipart upload"""
+
+
+class UploadPart(io.BufferedIOBase):
+    """One uploaded file, readable as a binary stream while it arrives.
+
+    Set ``max_size`` before reading to reject files larger than that many
+    bytes with RequestEntityTooLarge. ``size`` and hexdigest() (SHA-256)
+    cover the bytes read so far, so they are final once the part has been
+    read to the end.
+    """
+
+    def __init__(self, next_event, name, filename, max_size=None):
+        self.name = name
+        self.filename = filename
+        self.max_size = max_size
+        self.size = 0
+        self._next_event = next_event
+        self._buffer = b''
+        self._done = False
+        self._sha256 = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        event = self._next_event()
+        if not isinstance(event, Data):
+            raise UploadError('Malformed upload: file data expected')
+        self._done = not event.more_data
+        self.size += len(event.data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge()
+        self._sha256.update(event.data)
+        return event.data
+
+    def read1(self, size=-1):
+        while not self._buffer and not self._done:
+            self._buffer = self._fill()
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = [self._buffer]
+            self._buffer = b''
+            while not self._done:
+                chunks.append(self._fill())
+            return b''.join(chunks)
+        chunks = []
+        while size > 0:
+            data = self.read1(size)
+            if not data:
+                break
+            chunks.append(data)
+            size -= len(data)
+        return b''.join(chunks)
+
+    def skip(self):
+        """Consume the rest of the part without buffering it"""
+        self._buffer = b''
+        while not self._done:
+            self._fill()
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+
+class MultipartStream:
+    """The file parts of a multipart/form-data body read from ``stream``.
+
+    Iterating yields an UploadPart per file as soon as its headers have
+    arrived; when the next one is requested, whatever the caller didn't
+    read of the previous part is skipped. Plain form fields are collected
+    into ``fields`` as they go past, so fields sent after the files are
+    only there once iteration has finished.
+    """
+
+    def __init__(self, stream, boundary, chunk_size=CHUNK_SIZE, max_form_memory_size=None, max_parts=None):
+        self._read = stream.read
+        self._decoder = MultipartDecoder(boundary, max_form_memory_size, max_parts=max_parts)
+        self._chunk_size = chunk_size
+        self._max_form_memory_size = max_form_memory_size
+        self._eof = False
+        self.fields = {}
+
+    def _next_event(self):
+        try:
+            event = self._decoder.next_event()
+            while event is NEED_DATA:
+                if self._eof:
+                    raise UploadError('The upload ended before it was complete')
+                data = self._read(self._chunk_size)
+                if data:
+                    self._decoder.receive_data(data)
+                else:
+                    self._eof = True
+                    self._decoder.receive_data(None)
+                event = self._decoder.next_event()
+        except ValueError as e:
+            raise UploadError(f'Malformed upload: {e}')
+        return event
+
+    def _read_field(self, name):
+        chunks, size = [], 0
+        while True:
+            event = self._next_event()
+            if not isinstance(event, Data):
+                raise UploadError('Malformed upload: field data expected')
+            size += len(event.data)
+            if self._max_form_memory_size is not None and size > self._max_form_memory_size:
+                raise RequestEntityTooLarge()
+            chunks.append(event.data)
+            if not event.more_data:
+                self.fields[name] = b''.join(chunks).decode('utf-8', 'replace')
+                return
+
+    def __iter__(self):
+        while True:
+            event = self._next_event()
+            if isinstance(event, Epilogue):
+                return
+            if isinstance(event, File):
+                part = UploadPart(self._next_event, event.name, event.filename)
+                yield part
+                part.skip()
+            elif isinstance(event, Field):
+                self._read_field(event.name)
@@ -0,0 +1,255 @@
+"""Vectorized NumPy/pandas analysis backend.
+
+Messages are parsed into columnar batches (timestamps as int64 seconds,
+author codes, message lengths) and aggregated with bincount/unique and
+pandas string operations instead of per-message Counter updates. The
+result is an ordinary ChatStats, so the summary, merging and serialization
+behave exactly like the pure-Python backend.
+
+Select it with analyze(..., backend='pandas') or ``--backend pandas``.
+"""
+from array import array
+
+try:
+    import numpy as np
+    import pandas as pd
+    VECTORIZED_AVAILABLE = True
+except Exception:
+    VECTORIZED_AVAILABLE = False
+
+from conversation import REPLY_BUCKETS, SESSION_GAP, PAIR_SIZE
+from emojis import EMOJI_RE, normalize as normalize_emoji
+from length_stats import EXACT_LIMIT, N_BUCKETS, bucket_index
+from stats import ChatStats, HOUR_PERIODS, WORD_RE
+
+# Messages buffered per batch; bounds the text held in memory at once
+BATCH_SIZE = 100000
+
+# Timestamp sentinel for messages whose date could not be parsed
+NO_TIME = -1
+
+
+def collect_stats_vectorized(messages, stats=None, batch_size=BATCH_SIZE):
+    """Aggregate (datetime, author, message) tuples into a ChatStats in columnar batches"""
+    if not VECTORIZED_AVAILABLE:
+        raise Exception("The pandas backend needs numpy and pandas. Please install: pip install pandas")
+    if stats is None:
+        stats = ChatStats()
+    intern = stats.intern_author
+    timestamps, authors, texts = [], [], []
+    for dt, author, message in messages:
+        if dt:
+            timestamps.append(dt.toordinal() * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second)
+        else:
+            timestamps.append(NO_TIME)
+        authors.append(intern(author) if author else -1)
+        texts.append(message)
+        if len(texts) >= batch_size:
+            _add_batch(stats, timestamps, authors, texts)
+            timestamps, authors, texts = [], [], []
+    if texts:
+        _add_batch(stats, timestamps, authors, texts)
+    return stats
+
+
+def _first_seen(values):
+    """Unique values with their counts, ordered by first occurrence"""
+    uniq, first, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.argsort(first, kind='stable')
+    return uniq[order].tolist(), counts[order].tolist()
+
+
+def _add_slots(counts, order, values):
+    for slot, count in zip(*_first_seen(values)):
+        if not counts[slot]:
+            order.append(slot)
+        counts[slot] += count
+
+
+def _add_lengths(target, lengths, buckets):
+    """Fold an array of message lengths (and their histogram buckets) into a LengthStats"""
+    target.count += int(lengths.size)
+    target.total += int(lengths.sum())
+    target.total_sq += int((lengths * lengths).sum())
+    low, high = int(lengths.min()), int(lengths.max())
+    if target.min is None or low < target.min:
+        target.min = low
+    if target.max is None or high > target.max:
+        target.max = high
+    counts = np.bincount(buckets, minlength=N_BUCKETS)
+    histogram = target.histogram
+    for index in np.flatnonzero(counts).tolist():
+        histogram[index] += int(counts[index])
+
+
+def _add_activity(stats, codes, days, hours):
+    """Fold timed messages into the per-author hour and day matrices"""
+    attributed = codes >= 0
+    if not attributed.any():
+        return
+    codes, days, hours = codes[attributed], days[attributed], hours[attributed]
+    n_authors = len(stats.authors)
+    counts = np.bincount(codes * 24 + hours, minlength=n_authors * 24)
+    author_hours = stats.author_hours
+    for cell in np.flatnonzero(counts).tolist():
+        author_hours[cell] += int(counts[cell])
+    # Sparse author x day: count each (day, author) pair present in the batch
+    first_day = int(days.min())
+    keys, counts = np.unique((days - first_day) * n_authors + codes, return_counts=True)
+    author_days = stats.author_days
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        day_counts = author_days[key % n_authors]
+        day = first_day + key // n_authors
+        day_counts[day] = day_counts.get(day, 0) + count
+
+
+def _add_conversations(stats, timestamps, codes):
+    """Follow the batch's timed messages through stats.conversations, as ConversationStats.add() would"""
+    attributed = codes >= 0
+    if not attributed.any():
+        return
+    timestamps, codes = timestamps[attributed], codes[attributed]
+    conversations = stats.conversations
+    previous_times = np.empty_like(timestamps)
+    previous_times[1:] = timestamps[:-1]
+    previous_codes = np.empty_like(codes)
+    previous_codes[1:] = codes[:-1]
+    starts_chat = conversations.last_time is None
+    if not starts_chat:
+        previous_times[0] = conversations.last_time
+        previous_codes[0] = conversations.last_author
+    else:
+        # The head is settled later, by merge() or as the first session
+        conversations._start(int(timestamps[0]), int(codes[0]))
+    conversations.last_time, conversations.last_author = int(timestamps[-1]), int(codes[-1])
+    if starts_chat:
+        timestamps, codes = timestamps[1:], codes[1:]
+        previous_times, previous_codes = previous_times[1:], previous_codes[1:]
+    gaps = timestamps - previous_times
+
+    new_session = gaps > SESSION_GAP
+    started = conversations.started
+    per_author = np.bincount(codes[new_session])
+    for author_id in np.flatnonzero(per_author).tolist():
+        started[author_id] = started.get(author_id, 0) + int(per_author[author_id])
+
+    reply = ~new_session & (codes != previous_codes)
+    if not reply.any():
+        return
+    repliers, replied_to = codes[reply], previous_codes[reply]
+    latencies = np.maximum(gaps[reply], 0)
+    # Exact per-replier histograms: count each (replier, latency) pair in the batch
+    keys, counts = np.unique(repliers * (SESSION_GAP + 1) + latencies, return_counts=True)
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        author_id, seconds = divmod(key, SESSION_GAP + 1)
+        author_latencies = conversations.latencies.setdefault(author_id, {})
+        author_latencies[seconds] = author_latencies.get(seconds, 0) + count
+
+    n_authors = len(stats.authors)
+    keys, inverse, counts = np.unique(repliers * n_authors + replied_to, return_inverse=True, return_counts=True)
+    totals = np.zeros(keys.size, dtype=np.int64)
+    np.add.at(totals, inverse, latencies)
+    n_buckets = PAIR_SIZE - 2
+    cells, cell_counts = np.unique(inverse * n_buckets + np.searchsorted(REPLY_BUCKETS, latencies),
+                                   return_counts=True)
+    pairs = []
+    for key, count, total in zip(keys.tolist(), counts.tolist(), totals.tolist()):
+        key = divmod(key, n_authors)
+        pair = conversations.pairs.get(key)
+        if pair is None:
+            pair = conversations.pairs[key] = array('q', bytes(8 * PAIR_SIZE))
+        pair[0] += count
+        pair[1] += total
+        pairs.append(pair)
+    for cell, count in zip(cells.tolist(), cell_counts.tolist()):
+        index, bucket = divmod(cell, n_buckets)
+        pairs[index][2 + bucket] += count
+
+
+def _add_batch(stats, timestamps, authors, texts):
+    ts = np.asarray(timestamps, dtype=np.int64)
+    codes = np.asarray(authors, dtype=np.int64)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+
+    stats.total += len(texts)
+    stats.total_length += int(lengths.sum())
+
+    # Lengths below EXACT_LIMIT are their own bucket; the rare long ones go through bucket_index()
+    buckets = lengths.copy()
+    long_messages = np.flatnonzero(lengths >= EXACT_LIMIT)
+    if long_messages.size:
+        buckets[long_messages] = [bucket_index(n) for n in lengths[long_messages].tolist()]
+    unattributed = np.flatnonzero(codes < 0)
+    if unattributed.size:
+        _add_lengths(stats.unattributed_lengths, lengths[unattributed], buckets[unattributed])
+
+    known = codes[codes >= 0]
+    if known.size:
+        per_author = np.bincount(known, minlength=len(stats.authors))
+        author_counts = stats.author_counts
+        for author_id in np.flatnonzero(per_author).tolist():
+            author_counts[author_id] += int(per_author[author_id])
+        # Group the batch by author once instead of masking per author
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        for author_id in np.flatnonzero(per_author).tolist():
+            start, end = np.searchsorted(sorted_codes, [author_id, author_id + 1])
+            rows = order[start:end]
+            _add_lengths(stats.author_lengths[author_id], lengths[rows], buckets[rows])
+
+    timed_rows = ts != NO_TIME
+    timed = ts[timed_rows]
+    if timed.size:
+        days = timed // 86400
+        hours = (timed % 86400) // 3600
+        day_counts = stats.day_counts
+        for day, count in zip(*_first_seen(days)):
+            day_counts[day] = day_counts.get(day, 0) + count
+        _add_slots(stats.hour_counts, stats.hour_order, hours)
+        # date.fromordinal(1) is a Monday
+        _add_slots(stats.weekday_counts, stats.weekday_order, (days + 6) % 7)
+        _add_slots(stats.period_counts, stats.period_order, np.asarray(HOUR_PERIODS)[hours])
+        first_day, last_day = int(days.min()), int(days.max())
+        if stats.first_day is None or first_day < stats.first_day:
+            stats.first_day = first_day
+        if stats.last_day is None or last_day > stats.last_day:
+            stats.last_day = last_day
+        _add_activity(stats, codes[timed_rows], days, hours)
+        _add_conversations(stats, timed, codes[timed_rows])
+
+    # np.argmax returns the first maximum, so the earliest longest message wins
+    longest = int(np.argmax(lengths))
+    if lengths[longest] > stats.longest_message_length:
+        message = texts[longest]
+        stats.longest_message_length = int(lengths[longest])
+        stats.longest_message = message[:100] + "..." if len(message) > 100 else message
+
+    series = pd.Series(texts, dtype=object)
+    lower = series.str.lower()
+    media = (lower.str.contains('media omitted', regex=False) | lower.str.contains('image omitted', regex=False)
+             | lower.str.contains('<attached: ', regex=False) | lower.str.contains('(file attached)', regex=False))
+    links = (lower.str.contains('http://', regex=False) | lower.str.contains('https://', regex=False)
+             | lower.str.contains('www.', regex=False))
+    stats.media_count += int(media.sum())
+    media_codes = codes[media.to_numpy(dtype=bool)]
+    media_codes = media_codes[media_codes >= 0]
+    if media_codes.size:
+        per_author = np.bincount(media_codes)
+        for author_id in np.flatnonzero(per_author).tolist():
+            stats.author_media_counts[author_id] += int(per_author[author_id])
+    stats.link_count += int(links.sum())
+    stats.question_count += int(series.str.contains('?', regex=False).sum())
+
+    # Emoji need per-message attribution, but only non-ASCII messages can have any
+    emoji_counts, author_emoji_counts = stats.emoji_counts, stats.author_emoji_counts
+    for i in np.flatnonzero(~series.map(str.isascii).to_numpy(dtype=bool)).tolist():
+        found = EMOJI_RE.findall(texts[i])
+        if found:
+            stats.emoji_count += len(found)
+            emoji_counts.update(map(normalize_emoji, found))
+            if codes[i] >= 0:
+                author_emoji_counts[codes[i]] += len(found)
+
+    # One pass over the whole batch: '\n' is not a word character
+    text = '\n'.join(texts)
+    stats.word_counts.update(WORD_RE.findall(text.lower()))
@@ -0,0 +1,71 @@
+"""WhatsApp "export with media" archives (.zip) read in place.
+
+The chat text (``_chat.txt`` on iOS, ``WhatsApp Chat with NAME.txt`` on
+Android) is decompressed as a stream straight into the line parser, and
+media is never extracted: the sizes of the attached files come from the
+archive's central directory, so media bytes per user are exact without
+reading any media data.
+"""
+import io
+import os
+import re
+import zipfile
+
+# Attachment references in exports with media:
+#   iOS      <attached: 00000012-PHOTO-2024-01-01-10-00-00.jpg>
+#   Android  IMG-20240101-WA0001.jpg (file attached)
+ATTACHMENT_RE = re.compile(r'<attached: ([^>]+)>|(\S+\.\w+) \(file attached\)')
+
+
+def is_zip_export(filepath):
+    return isinstance(filepath, (str, os.PathLike)) and str(filepath).lower().endswith('.zip')
+
+
+def find_chat_member(archive):
+    """Name of the chat text inside an open ZipFile"""
+    texts = [info for info in archive.infolist()
+             if not info.is_dir() and info.filename.lower().endswith('.txt')]
+    for info in texts:
+        if os.path.basename(info.filename) == '_chat.txt':
+            return info.filename
+    for info in texts:
+        if os.path.basename(info.filename).startswith('WhatsApp Chat'):
+            return info.filename
+    if texts:
+        # Otherwise the largest text file is the chat
+        return max(texts, key=lambda info: info.file_size).filename
+    raise Exception("No chat .txt file found in the .zip archive. Please upload a WhatsApp chat export.")
+
+
+def iter_zip_lines(filepath):
+    """Yield the lines of the chat text inside a .zip export, decompressing as it goes"""
+    try:
+        archive = zipfile.ZipFile(filepath)
+    except zipfile.BadZipFile:
+        raise Exception("The uploaded .zip file is not a valid archive")
+    with archive, archive.open(find_chat_member(archive)) as raw:
+        yield from io.TextIOWrapper(raw, encoding='utf-8', errors='ignore')
+
+
+def media_sizes(filepath):
+    """Uncompressed size of every non-text file in the archive, by file name"""
+    with zipfile.ZipFile(filepath) as archive:
+        return {os.path.basename(info.filename): info.file_size for info in archive.infolist()
+                if not info.is_dir() and not info.filename.lower().endswith('.txt')}
+
+
+def attached_files(message):
+    """Names of the files a message says are attached"""
+    if '<attached: ' not in message and '(file attached)' not in message:
+        return []
+    return [ios or android for ios, android in ATTACHMENT_RE.findall(message)]
+
+
+def track_attachments(messages, sizes, found):
+    """Pass messages through, appending (author, bytes) to found for each attachment in sizes"""
+    for dt, author, message in messages:
+        for name in attached_files(message):
+            size = sizes.get(name)
+            if size is not None:
+                found.append((author, size))
+        yield dt, author, message